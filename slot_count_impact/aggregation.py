@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+# Statistics computed over each metric's per-second series, besides the
+# headline "value" stored under the metric's own name
+STATS = ["p50", "p95", "p99", "max", "steady"]
+QUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+# Tags identifying one reporting JVM, whose cumulative counters are
+# differenced independently
+COUNTER_SERIES_TAGS = ("tm_id",)
+
+
+def counter_rate(frame, field, series_tags=COUNTER_SERIES_TAGS):
+    """
+    Converts a cumulative counter into its per-second rate of increase,
+    differencing each series (TaskManager) on its own. A counter going
+    backwards was reset (e.g. TaskManager restart) and counts from zero.
+    Returns: frame with field replaced by the rate; the first point of each
+    series is dropped
+    """
+    tags = [t for t in series_tags if t in frame]
+    frame = frame.sort_values([*tags, "time"])
+    values = pd.to_numeric(frame[field], errors="coerce")
+    keys = [frame[t] for t in tags] if tags else np.zeros(len(frame))
+    delta = values.groupby(keys).diff()
+    delta = delta.where(delta >= 0, values)
+    elapsed = frame["time"].groupby(keys).diff() / 1000
+    rate = delta / elapsed.where(elapsed > 0)
+    return frame.assign(**{field: rate})[rate.notna()]
+
+def long_frame(series, metrics, metric_to_field, by=(), counter_metrics=()):
+    """
+    Stacks the aggregated field of every metric into one long frame.
+    counter_metrics: metrics reported as cumulative counters, stacked as rates
+    Returns: DataFrame with columns metric, *by, second, value
+    """
+    parts = []
+    for metric_label, measurement in metrics.items():
+        frame = series[measurement]
+        field = metric_to_field[metric_label]
+        if field not in frame:
+            continue
+        if metric_label in counter_metrics:
+            frame = counter_rate(frame, field)
+        part = pd.DataFrame({
+            "second": frame["time"].to_numpy() // 1000,
+            "value": pd.to_numeric(frame[field], errors="coerce").to_numpy(),
+        })
+        part.insert(0, "metric", metric_label)
+        for i, tag in enumerate(by):
+            part.insert(1 + i, tag, frame[tag].to_numpy() if tag in frame else None)
+        parts.append(part)
+
+    if not parts:
+        empty = pd.DataFrame(columns=["metric", *by])
+        return empty.assign(second=pd.Series(dtype="int64"), value=pd.Series(dtype="float64"))
+    return pd.concat(parts, ignore_index=True).dropna(subset=["value"])
+
+def per_second(long, mean_metrics, by=(), max_metrics=()):
+    """
+    Combines the series of each metric per second: summed across series,
+    averaged for metrics in mean_metrics, or the largest for metrics in
+    max_metrics.
+    Returns: Series of per-second values indexed by (metric, *by, second)
+    """
+    grouped = long.groupby(["metric", *by, "second"], sort=True)["value"].agg(["sum", "mean", "max"])
+    metric = grouped.index.get_level_values("metric")
+    values = np.where(metric.isin(list(mean_metrics)), grouped["mean"], grouped["sum"])
+    values = np.where(metric.isin(list(max_metrics)), grouped["max"], values)
+    return pd.Series(values, index=grouped.index, dtype="float64")
+
+def ratios(seconds, derived, by=()):
+    """
+    Derives per-second ratio series, e.g. CPU time per record.
+    derived: name -> (numerator metric, denominator metric, scale)
+    Returns: Series indexed like per_second() for the derived names
+    """
+    parts = []
+    for name, (numerator, denominator, scale) in derived.items():
+        if numerator not in seconds.index.get_level_values("metric") or \
+                denominator not in seconds.index.get_level_values("metric"):
+            continue
+        num = seconds.xs(numerator, level="metric")
+        den = seconds.xs(denominator, level="metric")
+        ratio = (num * scale / den.where(den > 0)).dropna()
+        parts.append(pd.concat({name: ratio}, names=["metric"]))
+    if not parts:
+        return seconds.iloc[:0]
+    return pd.concat(parts).reorder_levels(["metric", *by, "second"])
+
+def group_values(values, metric, by):
+    """
+    Returns: the values of one metric, indexed by the by tags alone
+    """
+    part = values[values.index.get_level_values("metric") == metric]
+    return part.droplevel("metric") if by else part.reset_index(drop=True)
+
+def aggregate_window(series, metrics, metric_to_field, mean_metrics, start,
+                     warmup_seconds=0, by=(), counter_metrics=(), derived=None, max_metrics=(),
+                     optional_metrics=()):
+    """
+    Aggregates every metric of a run window in one vectorized pass.
+    series: dict of measurement -> raw DataFrame (epoch-ms "time" column)
+    start: window start in epoch seconds, used to trim the warm-up
+    by: tag columns to break the statistics down by (e.g. "tm_id")
+    counter_metrics: cumulative counters, aggregated as per-second rates
+    max_metrics: metrics taken from their largest series every second
+    optional_metrics: metrics only some runs report (no data is not zero)
+    derived: name -> (numerator, denominator, scale) ratio metrics; their
+    headline value is the ratio of the two headline values
+    Returns: DataFrame indexed by (metric, *by) with columns value + STATS.
+    Metrics without data get value 0 (or None for mean, max, optional and
+    derived metrics) and no stats.
+    """
+    derived = derived or {}
+    keys = ["metric", *by]
+    long = long_frame(series, metrics, metric_to_field, by, counter_metrics)
+    seconds = per_second(long, mean_metrics, by, max_metrics)
+    seconds = pd.concat([seconds, ratios(seconds, derived, by)])
+    grouped = seconds.groupby(level=keys, sort=False)
+
+    stats = grouped.quantile(list(QUANTILES.values())).unstack()
+    stats = stats.reindex(columns=list(QUANTILES.values()))
+    stats.columns = list(QUANTILES)
+    stats["max"] = grouped.max()
+    steady = seconds[seconds.index.get_level_values("second") >= start + warmup_seconds]
+    stats["steady"] = steady.groupby(level=keys, sort=False).mean()
+
+    # Headline value: mean of the per-second series, except for mean metrics
+    # which average every raw point
+    stats["value"] = grouped.mean()
+    raw_mean = long.groupby(keys, sort=False)["value"].mean()
+    is_mean = stats.index.get_level_values("metric").isin(list(mean_metrics))
+    stats.loc[is_mean, "value"] = raw_mean.reindex(stats.index[is_mean])
+    for name, (numerator, denominator, scale) in derived.items():
+        is_derived = stats.index.get_level_values("metric") == name
+        if not is_derived.any():
+            continue
+        num = group_values(stats["value"], numerator, by)
+        den = group_values(stats["value"], denominator, by)
+        ratio = num * scale / den.where(den > 0)
+        stats.loc[is_derived, "value"] = ratio.reindex(group_values(stats["value"], name, by).index).to_numpy()
+
+    stats = stats[["value", *STATS]]
+    if by:
+        return stats
+    result = stats.reindex([*metrics, *derived]).astype(object)
+    empty = result["value"].isna()
+    no_zero = {*mean_metrics, *max_metrics, *optional_metrics, *derived}
+    result.loc[empty, "value"] = [None if m in no_zero else 0 for m in result.index[empty]]
+    return result.where(result.notna(), None)
+
+def skew(breakdown):
+    """
+    Spread of each metric's headline value across the groups of a breakdown
+    (e.g. TaskManagers): the max/mean ratio (1 when perfectly even) and the
+    Gini coefficient (0 when even, towards 1 when one group carries all).
+    breakdown: aggregate_window(..., by=...) result
+    Returns: DataFrame indexed by metric with columns max_mean, gini, groups
+    """
+    values = breakdown["value"].astype("float64").dropna().reset_index(level="metric")
+    values = values.sort_values(["metric", "value"])
+    grouped = values.groupby("metric", sort=False)["value"]
+
+    n = grouped.transform("count")
+    rank = grouped.cumcount() + 1
+    # Gini of sorted x_1..x_n: sum((2i - n - 1) * x_i) / (n * sum(x))
+    weighted = ((2 * rank - n - 1) * values["value"]).groupby(values["metric"], sort=False).sum()
+    total = grouped.sum()
+    count = grouped.count()
+    mean = total / count
+
+    result = pd.DataFrame({
+        "max_mean": grouped.max() / mean.where(mean != 0),
+        "gini": weighted / (count * total).where(total != 0),
+        "groups": count,
+    })
+    result.index.name = "metric"
+    return result
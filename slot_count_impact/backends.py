@@ -0,0 +1,137 @@
+"""
+Everything the runner and the extractor reach outside of this process
+through: the clock, the Kubernetes cluster and the metrics database. The
+defaults talk to the real thing (kubectl and InfluxDB 1.x); simulator.py
+swaps in deterministic stand-ins with use(). Callers look the backends up
+at call time (backends.cluster.apply(...)) so a swap applies everywhere.
+"""
+import json
+import os
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from influxdb import InfluxDBClient
+
+import readiness
+
+# InfluxDB 1.8 connection settings (or a line_protocol_sink.py instance)
+INFLUX_HOST = os.environ.get("INFLUX_HOST", "192.168.1.216")
+INFLUX_PORT = int(os.environ.get("INFLUX_PORT", 8086))
+INFLUX_DB = "flink_metrics"
+INFLUX_TIMEOUT = 30  # seconds, per request
+
+# kubectl binary, overridable to point the runner at a fake cluster
+KUBECTL = os.environ.get("KUBECTL", "kubectl")
+
+# Owner of the fields the runner sets through server-side apply
+FIELD_MANAGER = "slot-count-impact"
+
+
+class Clock:
+    """
+    Wall-clock time.
+    """
+
+    def now(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def now_iso(self):
+        return datetime.fromtimestamp(self.now(), timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class KubectlCluster:
+    """
+    FlinkDeployments and pods managed through kubectl. With replay, readiness
+    is read from a recorded watch stream (see readiness.record_events)
+    instead of watching the cluster.
+    """
+
+    def __init__(self, kubectl=KUBECTL, replay=None):
+        self.kubectl = kubectl
+        self.replay = replay
+
+    def apply(self, resources, dry_run=False):
+        """
+        Server-side applies resources (manifest dicts) in one request, read from
+        stdin. Applying a changed spec to an existing deployment updates it
+        in place. dry_run: only validate them against the cluster's schemas
+        """
+        command = [self.kubectl, "apply", "--server-side", f"--field-manager={FIELD_MANAGER}",
+                   "--force-conflicts", "-f", "-"]
+        if dry_run:
+            command.append("--dry-run=server")
+        manifest_list = {"apiVersion": "v1", "kind": "List", "items": list(resources)}
+        subprocess.run(command, input=json.dumps(manifest_list), text=True, check=True)
+
+    def delete(self, name, namespace=None):
+        command = [self.kubectl, "delete", "flinkdeployment", name]
+        if namespace:
+            command += ["-n", namespace]
+        subprocess.run(command, check=True)
+
+    def wait_until_ready(self, name, replicas, namespace=None, timeout=300, spec_applied=None):
+        events = readiness.replay_events(self.replay) if self.replay else None
+        return readiness.wait_until_ready(self.kubectl, name, replicas, namespace=namespace, timeout=timeout,
+                                          events=events, spec_applied=spec_applied)
+
+    def taskmanager_pods(self, name, namespace=None):
+        """
+        Returns: names of the TaskManager pods of a FlinkDeployment
+        """
+        command = [self.kubectl, "get", "pods", "-l", f"component=taskmanager,app={name}", "-o", "json"]
+        if namespace:
+            command += ["-n", namespace]
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        return [pod["metadata"]["name"] for pod in json.loads(result.stdout)["items"]]
+
+    def cadvisor_scrapes(self):
+        """
+        Yields: the cAdvisor exposition of every node, through the API server
+        """
+        nodes = json.loads(subprocess.run(
+            [self.kubectl, "get", "nodes", "-o", "json"], capture_output=True, text=True, check=True
+        ).stdout)["items"]
+        for node in nodes:
+            name = node["metadata"]["name"]
+            yield subprocess.run(
+                [self.kubectl, "get", "--raw", f"/api/v1/nodes/{name}/proxy/metrics/cadvisor"],
+                capture_output=True, text=True, check=True
+            ).stdout
+
+
+class InfluxMetrics:
+    """
+    The InfluxDB 1.x database the Flink reporter writes to.
+    """
+
+    def __init__(self, host=INFLUX_HOST, port=INFLUX_PORT, database=INFLUX_DB, timeout=INFLUX_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.database = database
+        self.timeout = timeout
+
+    def client(self, pool_size=10):
+        return InfluxDBClient(host=self.host, port=self.port, database=self.database,
+                              timeout=self.timeout, pool_size=pool_size)
+
+
+clock = Clock()
+cluster = KubectlCluster()
+metrics = InfluxMetrics()
+
+
+def use(**backends):
+    """
+    Replaces backends for the whole process, e.g. use(clock=..., cluster=...).
+    """
+    for name, backend in backends.items():
+        if name not in ("clock", "cluster", "metrics"):
+            raise ValueError(f"Unknown backend: {name}")
+        globals()[name] = backend
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+import aggregation
+
+# Job-level checkpoint gauges reported by the JobManager. A checkpoint is
+# counted whenever numberOfCompletedCheckpoints changes; the last* gauges
+# then describe it. lastCheckpointSize is what was persisted to the
+# checkpoint storage (incremental with RocksDB), lastCheckpointFullSize the
+# full state size.
+CHECKPOINT_MEASUREMENTS = {
+    "completed": "jobmanager_job_numberOfCompletedCheckpoints",
+    "failed": "jobmanager_job_numberOfFailedCheckpoints",
+    "duration_ms": "jobmanager_job_lastCheckpointDuration",
+    "size_bytes": "jobmanager_job_lastCheckpointSize",
+    "full_size_bytes": "jobmanager_job_lastCheckpointFullSize",
+}
+
+TIMELINE_COLUMNS = ["checkpoint", "time", "duration_ms", "size_bytes", "full_size_bytes"]
+
+
+def gauge(series, key):
+    frame = series.get(CHECKPOINT_MEASUREMENTS[key])
+    if frame is None or frame.empty or "value" not in frame:
+        return pd.DataFrame({"time": pd.Series(dtype="int64"), key: pd.Series(dtype="float64")})
+    frame = pd.DataFrame({"time": frame["time"].astype("int64"),
+                          key: pd.to_numeric(frame["value"], errors="coerce")})
+    return frame.dropna().sort_values("time").drop_duplicates("time", keep="last")
+
+def timeline(series):
+    """
+    Rebuilds the checkpoints completed within a run window from the
+    JobManager's checkpoint gauges.
+    series: dict of measurement -> raw DataFrame (epoch-ms "time" column)
+    Returns: DataFrame with one row per checkpoint and TIMELINE_COLUMNS
+    (time in epoch ms)
+    """
+    completed = gauge(series, "completed")
+    # The first point only tells what had completed before the window
+    changed = completed["completed"].ne(completed["completed"].shift()) & (completed["completed"] > 0)
+    changed.iloc[:1] = False
+    checkpoints = completed[changed].rename(columns={"completed": "checkpoint"})
+    for key in ["duration_ms", "size_bytes", "full_size_bytes"]:
+        checkpoints = pd.merge_asof(checkpoints, gauge(series, key), on="time", direction="nearest",
+                                    tolerance=1000)
+    return checkpoints[TIMELINE_COLUMNS].reset_index(drop=True)
+
+def failed_checkpoints(series):
+    failed = gauge(series, "failed")["failed"].to_numpy()
+    if len(failed) < 2:
+        return 0
+    increments = np.diff(failed)
+    # The count restarts when the job does (e.g. an in-place upgrade)
+    return float(np.where(increments >= 0, increments, 0).sum())
+
+def summarize(checkpoints, failed=0):
+    """
+    Returns: DataFrame indexed by checkpoint metric with columns value and
+    aggregation.STATS, in the shape of get_metrics.query_run_metrics:
+    checkpoint_duration (ms per checkpoint), checkpoint_size (bytes persisted
+    per checkpoint), checkpoint_bytes (bytes persisted over the window),
+    checkpoint_state_size (full state size of the last checkpoint),
+    checkpoint_count and checkpoint_failed
+    """
+    stats = pd.DataFrame(index=pd.Index(
+        ["checkpoint_duration", "checkpoint_size", "checkpoint_bytes", "checkpoint_state_size",
+         "checkpoint_count", "checkpoint_failed"], name="metric"),
+        columns=["value", *aggregation.STATS], dtype="float64")
+    for metric, column in [("checkpoint_duration", "duration_ms"), ("checkpoint_size", "size_bytes")]:
+        values = checkpoints[column].dropna()
+        if values.empty:
+            continue
+        stats.loc[metric, "value"] = values.mean()
+        for stat, q in aggregation.QUANTILES.items():
+            stats.loc[metric, stat] = values.quantile(q)
+        stats.loc[metric, "max"] = values.max()
+    if not checkpoints["size_bytes"].dropna().empty:
+        stats.loc["checkpoint_bytes", "value"] = checkpoints["size_bytes"].sum()
+    if not checkpoints["full_size_bytes"].dropna().empty:
+        stats.loc["checkpoint_state_size", "value"] = checkpoints["full_size_bytes"].dropna().iloc[-1]
+    stats.loc["checkpoint_count", "value"] = len(checkpoints)
+    stats.loc["checkpoint_failed", "value"] = failed
+    return stats
@@ -0,0 +1,178 @@
+import os
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+import experiment
+import results_store
+from saturation_search import MAX_BACKPRESSURE, keeps_up
+
+# Relates each cell's throughput to the TaskManager resources of its config
+# (the JobManager is the same for every config and left out)
+REPORT_PATH = "logs/efficiency.csv"
+RANKING_PATH = "logs/efficiency_ranking.csv"
+PLOT_PATH = "plots/efficiency.pdf"
+
+# Resources a config is charged for, minimized on the Pareto frontier
+COST_COLUMNS = ["vcpu", "memory_gib"]
+
+
+def run_resources(runs, configs=()):
+    """
+    Returns: DataFrame aligned with runs with the total vCPU, GiB of memory
+    and slots of each run's TaskManagers, from the shape stored with the run.
+    Runs imported from the old CSVs have no TaskManager resources: those of
+    the matrix config of the same label (if any) stand in.
+    """
+    matrix = {c["label"]: experiment.shape_fields(c) for c in configs}
+
+    def stored(column):
+        fallback = runs["config"].astype(str).map(lambda label: matrix.get(label, {}).get(column))
+        return runs[column].astype("float64").fillna(fallback.astype("float64"))
+
+    return pd.DataFrame({
+        "vcpu": stored("num_tms") * stored("tm_cpu"),
+        "memory_gib": stored("num_tms") * stored("tm_memory_mb") / 1024,
+        "slots": stored("total_slots"),
+    }, index=runs.index)
+
+def cell_efficiency(runs):
+    """
+    Averages the runs of every (app, config, rate) cell and normalizes its
+    throughput by its resources (see run_resources).
+    Returns: DataFrame with one row per cell
+    """
+    runs = runs.astype({"app": str, "config": str})
+    cells = runs.groupby(["app", "config", "rate"], as_index=False).agg(
+        throughput=("throughput", "mean"),
+        input_rate=("input_rate", "mean"),
+        backpressure=("backpressure", "mean"),
+        runs=("run_id", "count"),
+        vcpu=("vcpu", "mean"),
+        memory_gib=("memory_gib", "mean"),
+        slots=("slots", "mean"),
+    )
+    cells = cells.dropna(subset=["vcpu", "memory_gib"])
+    cells["per_vcpu"] = cells["throughput"] / cells["vcpu"]
+    cells["per_gib"] = cells["throughput"] / cells["memory_gib"]
+    cells["per_slot"] = cells["throughput"] / cells["slots"]
+    cells = cells.sort_values(["app", "config", "rate"]).reset_index(drop=True)
+    cells["sustained"] = sustained(cells)
+    return cells
+
+def sustained(cells):
+    """
+    Marks the cells that keep up with their rate, as SaturationSearch judges
+    probes: backpressure stays low, and input and output rates scale with
+    the rate relative to the lowest non-backpressured rate of the app and
+    config (flat output past the knee shows no backpressure).
+    cells: sorted by app, config and rate
+    """
+    healthy = cells["backpressure"].fillna(np.inf) <= MAX_BACKPRESSURE
+    result = pd.Series(False, index=cells.index)
+    for _, group in cells[healthy].groupby(["app", "config"], sort=False):
+        baseline = group.iloc[0].rename({"rate": "rps"})
+        result[group.index] = [keeps_up(cell.rename({"rate": "rps"}), baseline) for _, cell in group.iterrows()]
+    return result
+
+def marginal_efficiency(cells):
+    """
+    Scaling efficiency from each rate to the next one of the same app and
+    config: the relative throughput gain over the relative rate increase
+    (1 scales linearly, 0 gains nothing from the extra load).
+    """
+    grouped = cells.groupby(["app", "config"], sort=False)
+    throughput_gain = cells["throughput"] / grouped["throughput"].shift() - 1
+    rate_gain = cells["rate"] / grouped["rate"].shift() - 1
+    return throughput_gain / rate_gain.where(rate_gain > 0)
+
+def pareto_frontier(cells):
+    """
+    Marks the cells no other config beats at the same app and rate: none
+    delivers at least the same throughput with no more of any resource
+    (and is strictly better on one).
+    """
+    on_frontier = pd.Series(False, index=cells.index)
+    for _, group in cells.groupby(["app", "rate"], sort=False):
+        gain = group["throughput"].to_numpy()
+        cost = group[COST_COLUMNS].to_numpy()
+        # dominates[i, j]: cell i dominates cell j
+        no_worse = (gain[:, None] >= gain[None, :]) & (cost[:, None, :] <= cost[None, :, :]).all(axis=2)
+        better = (gain[:, None] > gain[None, :]) | (cost[:, None, :] < cost[None, :, :]).any(axis=2)
+        dominated = (no_worse & better).any(axis=0)
+        on_frontier[group.index] = ~dominated
+    return on_frontier
+
+def rank_configs(cells):
+    """
+    Ranks the configs of every app by the best throughput per vCPU they
+    reach at a sustained rate (see sustained()).
+    Returns: one row per (app, config) with the rate that best is reached at
+    """
+    sustained = cells[cells["sustained"]]
+    best = sustained.loc[sustained.groupby(["app", "config"])["per_vcpu"].idxmax()]
+    best = best.sort_values(["app", "per_vcpu"], ascending=[True, False])
+    best.insert(1, "rank", best.groupby("app").cumcount() + 1)
+    columns = ["app", "rank", "config", "rate", "throughput", "per_vcpu", "per_gib", "per_slot",
+               "marginal_efficiency", "pareto"]
+    return best[columns].reset_index(drop=True)
+
+def plot_efficiency(cells, path=PLOT_PATH):
+    apps = list(dict.fromkeys(cells["app"]))
+    fig, ax = plt.subplots(1, len(apps), figsize=(3.5 * len(apps), 3), squeeze=False)
+    for idx, app in enumerate(apps):
+        app_cells = cells[cells["app"] == app]
+        s = sns.lineplot(
+            data=app_cells,
+            x="rate",
+            y="per_vcpu",
+            hue="config",
+            ax=ax[0][idx],
+            palette="husl",
+            marker="o",
+            markersize=4,
+        )
+        frontier = app_cells[app_cells["pareto"] & app_cells["sustained"]]
+        s.scatter(frontier["rate"], frontier["per_vcpu"], marker="*", s=40, color="black",
+                  zorder=3, label="Pareto")
+        s.set_xscale("log")
+        if idx == len(apps) - 1:
+            s.legend(title="Config", fontsize=7, title_fontsize=8)
+        else:
+            s.get_legend().remove()
+        s.tick_params(axis="both", labelsize=7)
+        s.set_title(app, fontsize=8)
+        s.set_xlabel("In Rate", fontsize=7)
+        s.set_ylabel("Records/s per vCPU", fontsize=7)
+
+    plt.subplots_adjust(top=0.8, bottom=0.24, left=0.12, right=0.98, hspace=0.3, wspace=0.35)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fig.savefig(path)
+    plt.close(fig)
+
+def main():
+    configs, _, _, _ = experiment.load_matrix()
+    runs = results_store.load()
+    runs = runs.join(run_resources(runs, configs))
+    unknown = sorted(set(runs.loc[runs["vcpu"].isna() | runs["memory_gib"].isna(), "config"].astype(str)))
+    if unknown:
+        print(f"⚠️ No TaskManager resources stored for {', '.join(unknown)}, left out")
+    cells = cell_efficiency(runs)
+    cells["marginal_efficiency"] = marginal_efficiency(cells)
+    cells["pareto"] = pareto_frontier(cells)
+    ranking = rank_configs(cells)
+
+    cells.to_csv(REPORT_PATH, index=False)
+    ranking.to_csv(RANKING_PATH, index=False)
+    plot_efficiency(cells)
+
+    with pd.option_context("display.width", 160, "display.float_format", "{:.2f}".format):
+        print(ranking.to_string(index=False))
+    print(f"📄 {REPORT_PATH}, {RANKING_PATH}, {PLOT_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+
+import yaml
+
+# Single source of the experiment matrix for the runner and the extractor
+MATRIX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "experiments.yaml")
+
+# Label suffix of the configs run with the profile's Flink settings
+PROFILE_SUFFIX = "-profiled"
+
+# Flink settings of the checkpointing dimensions
+CHECKPOINT_INTERVAL_KEY = "execution.checkpointing.interval"
+STATE_BACKEND_KEY = "state.backend.type"
+
+# Flink setting (1.18+) overriding the parallelism of single job vertices,
+# as comma-separated <job vertex id>:<parallelism> pairs
+PARALLELISM_OVERRIDES_KEY = "pipeline.jobvertex-parallelism-overrides"
+
+# Append-only journal of cell states, used to resume an interrupted sweep
+JOURNAL_PATH = "logs/sweep_state.jsonl"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_journal_lock = threading.Lock()
+
+
+def load_matrix(path=MATRIX_PATH):
+    """
+    Loads the experiment matrix.
+    Returns: (configs, benchmarks, rps, input_var) in the shapes the scripts
+    use: list of config dicts, benchmark -> jar URI, benchmark -> rates and
+    benchmark -> name of the rate argument. The configs listed are followed
+    by the shapes generated from the slot budgets (see expand_shapes), each
+    with its job parallelism (see derive_parallelism), then expanded by the
+    checkpointing dimensions (see expand_checkpointing). The profile's Flink
+    settings are part of every config's flink_conf, and a non-empty profile
+    marks every label with PROFILE_SUFFIX.
+    Raises: ValueError when a config's parallelism does not fit its slots
+    """
+    with open(path) as f:
+        matrix = yaml.safe_load(f)
+
+    benchmarks = {}
+    rps = {}
+    input_var = {}
+    for benchmark, spec in matrix["benchmarks"].items():
+        if not spec.get("enabled", True):
+            continue
+        benchmarks[benchmark] = spec["jar"]
+        rps[benchmark] = list(spec["rates"])
+        if "input_var" in spec:
+            input_var[benchmark] = spec["input_var"]
+    profile = matrix.get("profile") or {}
+    configs = list(matrix.get("configs") or [])
+    configs += expand_shapes(matrix.get("shapes") or {}, {c["label"] for c in configs})
+    configs = [derive_parallelism(dict(c, flink_conf={**profile, **(c.get("flink_conf") or {})})) for c in configs]
+    if profile:
+        configs = [dict(c, label=c["label"] + PROFILE_SUFFIX) for c in configs]
+    configs = expand_checkpointing(configs, matrix.get("checkpointing") or {})
+    return configs, benchmarks, rps, input_var
+
+def load_workloads(path=MATRIX_PATH):
+    """
+    Returns: dict of benchmark -> workload spec (see workload.py) of the
+    enabled benchmarks fed by the workload generator rather than by a rate
+    argument
+    """
+    with open(path) as f:
+        matrix = yaml.safe_load(f)
+    return {
+        benchmark: spec["workload"] or {}
+        for benchmark, spec in matrix["benchmarks"].items()
+        if spec.get("enabled", True) and "workload" in spec
+    }
+
+def expand_shapes(shapes, existing=()):
+    """
+    Generates the family of TaskManager shapes that split each total slot
+    budget evenly: tm<N>x<S> for every slots_per_tm S dividing the budget,
+    with N = budget / S TaskManagers of S * cpu_per_slot cpus and
+    S * memory_per_slot memory, so every shape of a budget uses the same
+    total CPU and memory. Labels in existing (configs listed by hand) are
+    left out.
+    """
+    existing = set(existing)
+    cpu_per_slot = shapes.get("cpu_per_slot", 1)
+    memory_per_slot = parse_memory_mb(shapes.get("memory_per_slot", "2048m"))
+    generated = []
+    for total in shapes.get("total_slots") or []:
+        for slots in shapes.get("slots_per_tm") or []:
+            label = f"tm{total // slots}x{slots}"
+            if total % slots or label in existing:
+                continue
+            config = {
+                "label": label,
+                "task_slots": slots,
+                "cpu": cpu_per_slot * slots,
+                "memory": f"{int(memory_per_slot * slots)}m",
+                "replicas": total // slots,
+            }
+            if shapes.get("parallelism_overrides"):
+                config["parallelism_overrides"] = dict(shapes["parallelism_overrides"])
+            generated.append(config)
+            existing.add(label)
+    return generated
+
+def derive_parallelism(config):
+    """
+    Sets the job parallelism of a config to all of its slots unless given,
+    and checks it and the per-operator overrides fit in them.
+    Returns: config
+    Raises: ValueError when they do not
+    """
+    total = config["replicas"] * config["task_slots"]
+    config.setdefault("parallelism", total)
+    overrides = config.get("parallelism_overrides") or {}
+    for vertex, parallelism in [("job", config["parallelism"]), *overrides.items()]:
+        if not 0 < parallelism <= total:
+            raise ValueError(f"Config {config['label']}: {vertex} parallelism {parallelism} "
+                             f"does not fit its {total} slots")
+    return config
+
+def expand_checkpointing(configs, checkpointing):
+    """
+    Crosses every TaskManager shape with the checkpoint intervals and state
+    backends to sweep. Each combination is a config of its own, labelled
+    e.g. tm8x1-ckpt10s-rocksdb, whose flink_conf is applied on top of the
+    base YAML. Empty dimensions keep the base YAML's setting.
+    """
+    expanded = []
+    for config in configs:
+        for interval in checkpointing.get("intervals") or [None]:
+            for backend in checkpointing.get("state_backends") or [None]:
+                variant = dict(config, flink_conf=dict(config.get("flink_conf") or {}))
+                if interval is not None:
+                    variant["label"] += f"-ckpt{interval}"
+                    variant["flink_conf"][CHECKPOINT_INTERVAL_KEY] = str(interval)
+                if backend is not None:
+                    variant["label"] += f"-{backend}"
+                    variant["flink_conf"][STATE_BACKEND_KEY] = backend
+                expanded.append(variant)
+    return expanded
+
+def parse_config_label(label):
+    """
+    Parses a config label like 'tm8x1' (also 'tm8x1-ckpt10s-rocksdb', or the
+    older 'tm8x1-40k') into structured fields.
+    Returns: dict with keys 'num_tms', 'slots_per_tm' (None when unparsable)
+    """
+    match = re.match(r"tm(\d+)x(\d+)(?:-|$)", label)
+    if match:
+        return {
+            "num_tms": int(match.group(1)),
+            "slots_per_tm": int(match.group(2))
+        }
+    return {
+        "num_tms": None,
+        "slots_per_tm": None
+    }
+
+def shape_fields(config):
+    """
+    Returns: the structured TaskManager shape of a config, as stored with
+    each run: num_tms, slots_per_tm, total_slots, parallelism, tm_cpu and
+    tm_memory_mb
+    """
+    return {
+        "num_tms": config["replicas"],
+        "slots_per_tm": config["task_slots"],
+        "total_slots": config["replicas"] * config["task_slots"],
+        "parallelism": config.get("parallelism"),
+        "tm_cpu": float(config["cpu"]),
+        "tm_memory_mb": parse_memory_mb(config["memory"]),
+    }
+
+def parse_memory_mb(memory):
+    """
+    Parses Flink memory sizes like '2048m' or '8g' into megabytes.
+    """
+    memory = str(memory).strip().lower()
+    if memory.endswith("g"):
+        return float(memory[:-1]) * 1024
+    if memory.endswith("m"):
+        return float(memory[:-1])
+    return float(memory) / (1024 * 1024)  # plain bytes
+
+def cell_id(benchmark, config, rps, repeat=0):
+    cell = f"{benchmark}/{config['label']}/{rps}"
+    return cell if repeat == 0 else f"{cell}#{repeat}"
+
+def read_journal(path=JOURNAL_PATH):
+    """
+    Returns: dict of cell id -> last recorded state
+    """
+    states = {}
+    if not os.path.exists(path):
+        return states
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line after a crash
+            states[record["cell"]] = record["state"]
+    return states
+
+def record_state(cell, state, path=JOURNAL_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = {
+        "cell": cell,
+        "state": state,
+        "time": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+    }
+    with _journal_lock, open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
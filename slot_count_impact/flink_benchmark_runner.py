@@ -1,164 +1,489 @@
-import subprocess
-import yaml
-import time
-from pathlib import Path
-from datetime import datetime, timezone
+import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import hashlib
 import os
-
-
-CONFIGS = [
-    {
-        "label": "tm8x1",
-        "task_slots": 1,
-        "cpu": 1,
-        "memory": "2048m",
-        "replicas": 8,
-        
-    },
-    {
-        "label": "tm2x4",
-        "task_slots": 4,
-        "cpu": 4,
-        "memory": "8192m",
-        "replicas": 2
-    }
-]
-
-BENCHMARKS= {
-    # "StateMachine": "local:///opt/flink/examples/streaming/StateMachineExample.jar",
-    "WindowJoin": "local:///opt/flink/examples/streaming/WindowJoin.jar",
-    # "WordCount": "local:///opt/flink/examples/streaming/WordCount.jar",
-    # "SessionWindow": "local:///opt/flink/examples/streaming/SessionWindowing.jar",
-}
-
-RPS = {
-    "StateMachine": [10000, 50000, 100000, 200000, 400000],
-    # "WindowJoin": [10, 20, 50, 100, 500],
-    "WindowJoin": [5000, 10000],
-    "WordCount": [10000, 50000, 100000, 200000, 400000],
-    "SessionWindow": [10000, 50000, 100000, 200000, 400000],
-}
-
-input_var = {
-    "StateMachine": "rps",
-    "WindowJoin": "rate",
-}
+import random
+import re
+import sys
+
+import backends
+# InfluxDB connection settings, also where the reporter is pointed
+from backends import INFLUX_HOST, INFLUX_PORT
+import experiment
+import live_metrics
+import manifests
+import pod_profiler
+import saturation_search
+import simulator
+import steady_state
+import workload
+
+
+# Experiment matrix, shared with get_metrics.py
+CONFIGS, BENCHMARKS, RPS, input_var = experiment.load_matrix()
+# Benchmarks fed by workload.py's generator at a rate profile
+WORKLOADS = experiment.load_workloads()
 
 # Path to your base YAML file
 YAML_PATH = "../example/basic.yaml"
 
-# List of benchmarking configurations
-CONFIG_LABELS = ["tm8x1", "tm2x4"]  # Add more labels if needed
-
 # Name of the FlinkDeployment resource
 FLINK_DEPLOYMENT_NAME = "basic-example"
 
-def load_yaml(path):
-    with open(path) as f:
-        return yaml.safe_load(f)
-
-def update_config(yaml_data, config, benchmark, rps):
-    conf = yaml_data["spec"]["flinkConfiguration"]
-    conf["metrics.reporter.influxdb.tags"] = f"config={config['label']}"
-    conf["taskmanager.numberOfTaskSlots"] = str(config["task_slots"])
-    
-    yaml_data["spec"]['job']["jarURI"] = BENCHMARKS[benchmark]
-    yaml_data["spec"]["job"]["args"] = [
-        "--"+input_var[benchmark],
-        str(rps)
-    ]
-
-    tm_spec = yaml_data["spec"]["taskManager"]["resource"]
-    tm_spec["cpu"] = config["cpu"]
-    tm_spec["memory"] = config["memory"]
+# What changes in the manifest from each cell of a sweep to the next
+MANIFEST_DIFFS_PATH = "logs/manifest_diffs.txt"
 
+# Allocatable resources the scheduler packs concurrent deployments into.
+# Each deployment needs its TaskManagers plus the JobManager of the base YAML.
+# The default fits a single deployment at a time; raise it to run cells in parallel.
+CLUSTER_CAPACITY = {
+    "cpu": 9,
+    "memory": "18432m",
+}
 
-def save_yaml(data, path):
-    with open(path, "w") as f:
-        yaml.safe_dump(data, f)
+# Switch rates of the same benchmark and TaskManager shape in place (job spec
+# re-applied through the operator's upgrade path) instead of a teardown and cold start
+IN_PLACE = True
+
+# End a cell's warm-up/recording as soon as the live view flags it as saturated
+# (it can always be aborted by hand through the live view's /abort endpoint)
+ABORT_SATURATED = False
+
+LIVE = live_metrics.LiveMetrics()
+
+# Samples the TaskManager pods' cgroup usage into InfluxDB while cells record
+PROFILER = pod_profiler.PodProfiler()
+
+# Namespaces deployments are spread over (round-robin). Each one needs the
+# `flink` service account and the `flink-metrics-pvc` claim used by basic.yaml,
+# and must be watched by the operator.
+NAMESPACES = ["default"]
+
+# Runs of every cell (overridable with --repeats N). With more than one, each
+# repeat gets its own deployment and the order of deployments and of the rates
+# within them is shuffled (seeded by SEED) so repeats are independent of the
+# time they ran at; see repeat_analysis.py for the statistics across them.
+REPEATS = 1
+SEED = 0
+
+def deployment_name(benchmark, config, rps, repeat=0):
+    # Must be a valid DNS-1123 name; the operator also uses it as the pods' app label.
+    # Names over manifests.MAX_NAME_LENGTH keep their start and end with a hash
+    # of the whole name; the full config label is reported in the config tag.
+    name = re.sub(r"[^-a-z0-9]+", "-", f"{benchmark}-{config['label']}-{rps}".lower())
+    name = name if repeat == 0 else f"{name}-r{repeat}"
+    if len(name) <= manifests.MAX_NAME_LENGTH:
+        return name
+    digest = hashlib.sha1(name.encode()).hexdigest()[:8]
+    suffix = f"-{rps}".lower() + ("" if repeat == 0 else f"-r{repeat}")
+    head = name[:manifests.MAX_NAME_LENGTH - len(suffix) - len(digest) - 1].rstrip("-")
+    return f"{head}-{digest}{suffix}"
+
+def job_args(benchmark, rps, source=None):
+    """
+    Returns: the job arguments of a cell: its rate for the example jars
+    generating their own input, or the (host, port) of the workload
+    generator for the benchmarks in WORKLOADS (source, by default the first
+    port the generator tries)
+    """
+    if benchmark in WORKLOADS:
+        host, port = source or (workload.WORKLOAD_HOST, workload.WORKLOAD_PORT)
+        return ["--hostname", host, "--port", str(port)]
+    return ["--" + input_var[benchmark], str(rps)]
+
+def cell_overlay(config, benchmark, rps, name=FLINK_DEPLOYMENT_NAME, namespace=None, source=None):
+    """
+    Returns: the fields a cell sets on the base manifest (see manifests.render)
+    """
+    overlay = {
+        "metadata": {"name": name},
+        "spec": {
+            "flinkConfiguration": {
+                # Extra reporter variables, which the InfluxDB reporter writes as tags
+                "metrics.reporter.influxdb.scope.variables.additional": f"config:{config['label']},deployment:{name}",
+                # Report to wherever get_metrics.py reads from (InfluxDB or the line-protocol sink)
+                "metrics.reporter.influxdb.host": INFLUX_HOST,
+                "metrics.reporter.influxdb.port": INFLUX_PORT,
+                "taskmanager.numberOfTaskSlots": str(config["task_slots"]),
+                # Profile and swept Flink settings, e.g. latency markers and the checkpoint interval
+                **config.get("flink_conf", {}),
+            },
+            "job": {
+                "jarURI": BENCHMARKS[benchmark],
+                "args": job_args(benchmark, rps, source),
+                "parallelism": config["parallelism"],
+            },
+            "taskManager": {
+                "resource": {"cpu": config["cpu"], "memory": config["memory"]},
+            },
+        },
+    }
+    if namespace:
+        overlay["metadata"]["namespace"] = namespace
+    if config.get("parallelism_overrides"):
+        overlay["spec"]["flinkConfiguration"][experiment.PARALLELISM_OVERRIDES_KEY] = ",".join(
+            f"{vertex}:{parallelism}" for vertex, parallelism in config["parallelism_overrides"].items()
+        )
+    if config.get("node_selector"):
+        overlay["spec"]["taskManager"]["podTemplate"] = {"spec": {"nodeSelector": config["node_selector"]}}
+    return overlay
 
+def render_cell(base, config, benchmark, rps, name=FLINK_DEPLOYMENT_NAME, namespace=None, source=None):
+    return manifests.render(base, cell_overlay(config, benchmark, rps, name=name, namespace=namespace, source=source))
 
-def apply_deployment(yaml_file):
-    subprocess.run(["kubectl", "apply", "-f", yaml_file], check=True)
+def apply_deployment(manifest):
+    backends.cluster.apply([manifest])
 
-def delete_deployment(yaml_file):
-    subprocess.run(["kubectl", "delete", "-f", yaml_file], check=True)
+def delete_deployment(name, namespace=None):
+    backends.cluster.delete(name, namespace)
 
-def are_taskmanagers_ready(label_selector="component=taskmanager,app=basic-example", expected_replicas=4):
-    try:
-        output = subprocess.check_output(
-            ["kubectl", "get", "pods", "-l", label_selector, "--no-headers"],
-            text=True
-        )
-        lines = output.strip().split("\n")
-        if len(lines) < expected_replicas:
-            return False  # not all replicas started yet
-
-        for line in lines:
-            columns = line.split()
-            status = columns[2]
-            ready = columns[1]
-            if status != "Running" or not ready.startswith("1/1"):
-                return False
+def wait_for_ready(name, replicas, timeout=300, namespace=None, spec_applied=None):
+    print(f"⏳ Waiting for FlinkDeployment {name} to be READY...")
+    if backends.cluster.wait_until_ready(name, replicas, namespace=namespace, timeout=timeout,
+                                         spec_applied=spec_applied):
         return True
-
-    except subprocess.CalledProcessError as e:
-        print("Failed to get pods:", e)
-        return False
-
-def wait_for_ready(name, replicas, timeout=300):
-    print("⏳ Waiting for FlinkDeployment to be READY...")
-    for _ in range(timeout // 5):
-        if are_taskmanagers_ready("component=taskmanager,app=basic-example", expected_replicas=replicas):
-            return True
-        time.sleep(5)
-    print("⚠️ Timeout waiting for FlinkDeployment to be READY.")
+    print(f"⚠️ Timeout waiting for FlinkDeployment {name} to be READY.")
     return False
 
-def run_benchmark(config, base_yaml_path, benchmark, rps):
-    print(f"\n🚀 Starting config: {config['label']}")
-    yaml_data = load_yaml(base_yaml_path)
-
-    update_config(yaml_data, config, benchmark, rps)
-
-    modified_yaml_path = f"/tmp/flink_benchmark_{config['label']}.yaml"
-    save_yaml(yaml_data, modified_yaml_path)
-
-    apply_deployment(modified_yaml_path)
-
-    start = -1
-    if wait_for_ready(FLINK_DEPLOYMENT_NAME, config["replicas"]):
-        print("⏲️ Waiting 5 minutes for stabilization.")
-        time.sleep(10 * 60)
-        print("⏲️ Record for 5 minutes")
-        start = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        time.sleep(10 * 60)
+def job_patch(manifest):
+    job = manifest["spec"]["job"]
+    return {"spec": {"job": {"args": job["args"], "parallelism": job["parallelism"]}}}
+
+def reconciled(patch):
+    """
+    Returns: predicate telling whether the operator has reconciled a
+    FlinkDeployment to the job fields of a patch
+    """
+    def check(deployment):
+        status = deployment.get("status", {}).get("reconciliationStatus", {})
+        # lastReconciledSpec is written when the upgrade starts (state
+        # UPGRADING), while the old job can still read READY/RUNNING
+        if status.get("state") != "DEPLOYED":
+            return False
+        last = status.get("lastReconciledSpec")
+        if not last:
+            return False
+        spec = json.loads(last)
+        # Newer operators wrap the spec together with resource metadata
+        spec = spec.get("spec", spec)
+        job = spec.get("job", {})
+        return all(job.get(field) == value for field, value in patch["spec"]["job"].items())
+    return check
+
+def measure(name):
+    """
+    Waits for steady state, then records a run window. Both end early when
+    the cell is aborted from the live view.
+    Returns: (window start timestamp, mean throughput, its confidence half-width)
+    """
+    def stop():
+        return LIVE.should_abort(name) or (ABORT_SATURATED and LIVE.saturated(name))
+
+    client = steady_state.influx_client()
+    print(f"⏲️ {name}: Waiting for steady state (at most {steady_state.MAX_WARMUP_SECONDS // 60} minutes).")
+    started = backends.clock.monotonic()
+    if not steady_state.wait_for_steady_state(client, name, steady_state.now_iso(), stop=stop):
+        print(f"⚠️ {name}: No steady state reached, recording anyway.")
+    print(f"⏲️ {name}: Warm-up took {backends.clock.monotonic() - started:.0f}s. Recording until throughput is stable.")
+    start = steady_state.now_iso()
+    started = backends.clock.monotonic()
+    mean, half_width = steady_state.record_until_confident(client, name, start, stop=stop)
+    if mean is not None:
+        print(f"⏲️ {name}: Recorded {backends.clock.monotonic() - started:.0f}s, throughput {mean:.2f} ± {half_width:.2f}")
+    if stop():
+        print(f"✋ {name}: Aborted early from the live view.")
+    client.close()
+    return start, mean, half_width
+
+def log_transitions(name, transitions, cold_start, teardown):
+    """
+    Reports, per in-place transition, the time saved compared to a full
+    teardown and cold start, and appends it to logs/transitions.csv.
+    """
+    log_file = "logs/transitions.csv"
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    new_file = not os.path.exists(log_file)
+    with open(log_file, "a") as f:
+        if new_file:
+            f.write("deployment,from_rps,to_rps,transition_s,redeploy_s,saved_s\n")
+        for from_rps, to_rps, seconds in transitions:
+            saved = cold_start + teardown - seconds
+            print(f"♻️ {name}: {from_rps} -> {to_rps} in {seconds:.0f}s, saved {saved:.0f}s")
+            f.write(f"{name},{from_rps},{to_rps},{seconds:.1f},{cold_start + teardown:.1f},{saved:.1f}\n")
+
+def run_benchmark(config, base_yaml_path, benchmark, rates, name=FLINK_DEPLOYMENT_NAME, namespace=None,
+                  on_result=None, repeat=0):
+    """
+    Runs one or more rates of a benchmark on one TaskManager shape. The first
+    rate is a cold start; for each later one the manifest is re-applied with
+    the new job spec, which the operator rolls out through its upgrade path
+    (upgradeMode) while the deployment is kept. Benchmarks in WORKLOADS are
+    fed by their own workload generator instead, which switches rates without
+    touching the job. Every rate is logged as soon as it is recorded.
+    rates may be a generator: on_result(rps, name, start, end, throughput,
+    half_width) is called after each rate, before the next one is drawn
+    (start is None when the deployment did not become ready).
+    repeat: index of the repeat the rates belong to (journal bookkeeping)
+    """
+    rates = iter(rates)
+    rps = next(rates)
+    print(f"\n🚀 Starting config: {config['label']} ({name})")
+    base = manifests.load_base(base_yaml_path)
+    generator, source = None, None
+    if benchmark in WORKLOADS:
+        generator = workload.SocketGenerator(name, WORKLOADS[benchmark].get("profile"), rps)
+        generator.start(steady_state.influx_client())
+        source = generator.address()
+        print(f"🚰 {name}: Workload generator on port {generator.port}")
+    manifest = render_cell(base, config, benchmark, rps, name=name, namespace=namespace, source=source)
+
+    started = backends.clock.monotonic()
+    try:
+        apply_deployment(manifest)
+    except Exception:
+        if generator is not None:
+            generator.stop()
+        raise
+
+    transitions = []
+    cell = experiment.cell_id(benchmark, config, rps, repeat)
+    try:
+        ready = wait_for_ready(name, config["replicas"], namespace=namespace)
+        cold_start = backends.clock.monotonic() - started
+
+        previous = None
+        while rps is not None:
+            cell = experiment.cell_id(benchmark, config, rps, repeat)
+            experiment.record_state(cell, experiment.RUNNING)
+            if previous is not None:
+                switched = render_cell(base, config, benchmark, rps, name=name, namespace=namespace, source=source)
+                print(f"♻️ {name}: Switching in place to {rps}\n"
+                      f"{manifests.format_diff(manifests.diff(manifest, switched))}")
+                started = backends.clock.monotonic()
+                if generator is not None:
+                    generator.set_rate(rps)
+                if switched != manifest:
+                    manifest = switched
+                    apply_deployment(manifest)
+                    ready = wait_for_ready(name, config["replicas"], namespace=namespace,
+                                           spec_applied=reconciled(job_patch(manifest)))
+                transitions.append((previous, rps, backends.clock.monotonic() - started))
+
+            start, throughput, half_width = None, None, None
+            if ready:
+                LIVE.watch(name)
+                PROFILER.watch(name, namespace)
+                start, throughput, half_width = measure(name)
+                PROFILER.unwatch(name)
+                LIVE.unwatch(name)
+            else:
+                print(f"⛔ {name}: Skipping wait due to deployment not becoming READY.")
+            end = backends.clock.now_iso()
+            if ready:
+                # A run that never became ready has no window to extract
+                log_result(benchmark, config, rps, name, start, end)
+            experiment.record_state(cell, experiment.DONE if ready else experiment.FAILED)
+            if on_result is not None:
+                # A rate that never got running is reported with start None
+                on_result(rps, name, start, end, throughput, half_width)
+
+            previous, rps = rps, next(rates, None)
+
+    except Exception:
+        experiment.record_state(cell, experiment.FAILED)
+        raise
+
+    finally:
+        print(f"🧹 Cleaning up config: {config['label']} ({name})")
+        started = backends.clock.monotonic()
+        delete_deployment(name, namespace)
+        teardown = backends.clock.monotonic() - started
+        if generator is not None:
+            generator.stop()
+
+    if transitions:
+        log_transitions(name, transitions, cold_start, teardown)
+
+
+def deployment_demand(config, jobmanager):
+    return {
+        "cpu": config["replicas"] * float(config["cpu"]) + float(jobmanager["cpu"]),
+        "memory": config["replicas"] * experiment.parse_memory_mb(config["memory"])
+                  + experiment.parse_memory_mb(jobmanager["memory"]),
+    }
 
+def fits(demand, free):
+    return all(demand[resource] <= free[resource] for resource in demand)
+
+def log_result(benchmark, config, rps, name, start, end):
+    # create logs dir if not exists
+    log_file = f"logs/{benchmark}_{config['label']}_{rps}_log.txt"
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+
+    log_entry = f"{start} - Starting config: {config['label']} deployment={name}\n"
+    log_entry += f"{end} - Finished config: {config['label']} deployment={name}\n"
+    print(log_entry.strip())
+
+    # Append to log file
+    with open(log_file, "a") as f:
+        f.write(log_entry)
+
+def chains(cells, in_place=IN_PLACE, rng=None):
+    """
+    Groups (benchmark, config, rps, repeat) cells that can share a deployment:
+    with in_place, all rates of a benchmark on one TaskManager shape within
+    one repeat. With an rng, the chains and the rates within each are shuffled.
+    Returns: list of (benchmark, config, rates, deployment name, on_result, repeat)
+    """
+    if not in_place:
+        grouped = [
+            (benchmark, config, [rps], deployment_name(benchmark, config, rps, repeat), None, repeat)
+            for benchmark, config, rps, repeat in cells
+        ]
     else:
-        print("⛔ Skipping wait due to deployment not becoming READY.")
-
-    print(f"🧹 Cleaning up config: {config['label']}")
-    delete_deployment(modified_yaml_path)
-    end = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-    return start, end
+        by_shape = {}
+        for benchmark, config, rps, repeat in cells:
+            key = (repeat, benchmark, config["label"])
+            if key not in by_shape:
+                by_shape[key] = (benchmark, config, [], deployment_name(benchmark, config, rps, repeat), None, repeat)
+            by_shape[key][2].append(rps)
+        grouped = list(by_shape.values())
+    if rng is not None:
+        for chain in grouped:
+            rng.shuffle(chain[2])
+        rng.shuffle(grouped)
+    return grouped
+
+def schedule(cells, capacity=CLUSTER_CAPACITY, base_yaml_path=YAML_PATH, in_place=IN_PLACE, rng=None):
+    """
+    Runs (benchmark, config, rps, repeat) cells as concurrent, isolated
+    deployments, first-fit packed into the declared cluster capacity. With
+    in_place, the rates sharing a TaskManager shape run one after another on
+    one deployment. Results are logged as each run finishes.
+    """
+    pending = chains(cells, in_place, rng)
+    preflight(pending, base_yaml_path)
+    run_chains(pending, capacity, base_yaml_path)
+
+def preflight(pending, base_yaml_path=YAML_PATH):
+    """
+    Renders the manifest of every cell of the chains before anything runs:
+    each is validated locally, then all of them against the cluster's
+    schemas in a single server-side dry run. What changes from one cell to
+    the next is written to MANIFEST_DIFFS_PATH.
+    """
+    base = manifests.load_base(base_yaml_path)
+    rendered = [
+        (experiment.cell_id(benchmark, config, rps, repeat), render_cell(base, config, benchmark, rps, name=name))
+        for benchmark, config, rates, name, _, repeat in pending
+        for rps in rates
+    ]
+    backends.cluster.apply([manifest for _, manifest in rendered], dry_run=True)
+
+    os.makedirs(os.path.dirname(MANIFEST_DIFFS_PATH), exist_ok=True)
+    with open(MANIFEST_DIFFS_PATH, "w") as f:
+        previous = base
+        for cell, manifest in rendered:
+            f.write(f"{cell}\n{manifests.format_diff(manifests.diff(previous, manifest))}\n")
+            previous = manifest
+    print(f"📝 {len(rendered)} manifests validated, changes between cells in {MANIFEST_DIFFS_PATH}")
+
+def run_chains(pending, capacity=CLUSTER_CAPACITY, base_yaml_path=YAML_PATH):
+    """
+    Runs chains (see chains()) concurrently, each on its own deployment,
+    first-fit packed into the declared cluster capacity.
+    """
+    jobmanager = manifests.load_base(base_yaml_path)["spec"]["jobManager"]["resource"]
+    free = {
+        "cpu": float(capacity["cpu"]),
+        "memory": experiment.parse_memory_mb(capacity["memory"]),
+    }
+    pending = list(pending)
+    running = {}
+    launched = 0
+
+    with ThreadPoolExecutor(max_workers=max(len(pending), 1)) as pool:
+        while pending or running:
+            for chain in list(pending):
+                benchmark, config, rates, name, on_result, repeat = chain
+                demand = deployment_demand(config, jobmanager)
+                if not fits(demand, free):
+                    continue
+                for resource in free:
+                    free[resource] -= demand[resource]
+                namespace = NAMESPACES[launched % len(NAMESPACES)]
+                launched += 1
+                future = pool.submit(run_benchmark, config, base_yaml_path, benchmark, rates, name, namespace,
+                                     on_result, repeat)
+                running[future] = (name, demand)
+                pending.remove(chain)
+
+            if not running:
+                benchmark, config, _, name, _, _ = pending.pop(0)
+                print(f"⛔ {name} does not fit in the cluster capacity, skipping.")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, demand = running.pop(future)
+                for resource in free:
+                    free[resource] += demand[resource]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"⚠️ {name} failed: {e}")
+
+
+def search():
+    """
+    Saturation search mode: finds the highest sustainable rate of every
+    benchmark on every config, starting from the lowest rate of the matrix.
+    """
+    searches = [
+        saturation_search.SaturationSearch(benchmark, config, min(RPS[benchmark]))
+        for benchmark in BENCHMARKS
+        for config in CONFIGS
+    ]
+    run_chains([
+        (s.benchmark, s.config, s.rates(), deployment_name(s.benchmark, s.config, "search"), s.record, 0)
+        for s in searches
+    ])
+    saturation_search.write_reports([s.report() for s in searches])
 
 
 def main():
-    
-    for benchmark in BENCHMARKS:
-        for config in CONFIGS:
-            for rps in RPS[benchmark]:
-                # create logs dir of not exists
-                log_file = f"logs/{benchmark}_{config['label']}_{rps}_log.txt"
-                os.makedirs(os.path.dirname(log_file), exist_ok=True)
-                start, end = run_benchmark(config, YAML_PATH, benchmark, rps)
-
-                log_entry = f"{start} - Starting config: {config['label']}\n"
-                log_entry += f"{end} - Finished config: {config['label']}\n"
-                print(log_entry.strip())
-
-                # Append to log file
-                with log_file.open("a") as f:
-                    f.write(log_entry)
-
-main()
+    if "--simulate" in sys.argv:
+        # Simulated cluster and metrics in accelerated time (see simulator.py)
+        simulator.install()
+    LIVE.tail(steady_state.influx_client())
+    live_metrics.serve(LIVE)
+    PROFILER.run(steady_state.influx_client())
+    print(f"📈 Live metrics on http://localhost:{live_metrics.LIVE_PORT}/")
+
+    if "--search" in sys.argv:
+        search()
+        return
+
+    repeats = int(sys.argv[sys.argv.index("--repeats") + 1]) if "--repeats" in sys.argv else REPEATS
+
+    # Resume: skip every cell the sweep journal records as done
+    states = experiment.read_journal()
+    cells = []
+    for repeat in range(repeats):
+        for benchmark in BENCHMARKS:
+            for config in CONFIGS:
+                for rps in RPS[benchmark]:
+                    if states.get(experiment.cell_id(benchmark, config, rps, repeat)) == experiment.DONE:
+                        continue
+                    cells.append((benchmark, config, rps, repeat))
+    skipped = sum(len(RPS[b]) for b in BENCHMARKS) * len(CONFIGS) * repeats - len(cells)
+    if skipped:
+        print(f"⏭️ Resuming sweep: {skipped} cells already done, {len(cells)} to run.")
+    rng = None
+    if repeats > 1:
+        print(f"🔁 {repeats} repeats per cell in shuffled order (seed {SEED})")
+        rng = random.Random(SEED)
+    schedule(cells, rng=rng)
+
+if __name__ == "__main__":
+    main()
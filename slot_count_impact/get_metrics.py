@@ -1,15 +1,27 @@
-from influxdb import InfluxDBClient
-from datetime import datetime
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 import re
-import csv
+import sys
 
-# InfluxDB 1.8 connection settings
-INFLUX_HOST = "192.168.1.216"
-INFLUX_PORT = 8086
-INFLUX_DB = "flink_metrics"
+import aggregation
+import backends
+import checkpoints
+import experiment
+import metrics_cache
+import results_store
+
+
+# Number of cells (log files) extracted concurrently
+MAX_WORKERS = 8
 
 LOG_DIR = "logs/"
 
+# Latency of the markers sources emit when metrics.latency.interval is set
+# (see the profile in experiments.yaml), one histogram per source, operator
+# and operator subtask. Markers skip the operators' processing but queue
+# with the records, so the slowest path is taken as the end-to-end latency.
+LATENCY_MEASUREMENT = "taskmanager_job_latency_source_id_operator_id_operator_subtask_index_latency"
+
 METRICS = {
     "backpressure": "taskmanager_job_task_backPressuredTimeMsPerSecond",
     "throughput": "taskmanager_job_task_numRecordsOutPerSecond",
@@ -21,235 +33,345 @@ METRICS = {
     "jvm_threads": "taskmanager_Status_JVM_Threads_Count",
     "shuffle_netty_used_segments": "taskmanager_Status_Shuffle_Netty_UsedMemorySegments",
     "remote_bytes_per_sec": "taskmanager_job_task_Shuffle_Netty_Input_numBytesInRemote",
+    # Last barrier alignment and checkpoint start delay per subtask (ns)
+    "checkpoint_alignment": "taskmanager_job_task_checkpointAlignmentTime",
+    "checkpoint_start_delay": "taskmanager_job_task_checkpointStartDelayNanos",
+    # Latency marker histograms (ms), see LATENCY_MEASUREMENT
+    "latency_p50": LATENCY_MEASUREMENT,
+    "latency_p95": LATENCY_MEASUREMENT,
+    "latency_p99": LATENCY_MEASUREMENT,
+    "latency_p999": LATENCY_MEASUREMENT,
+    # Pod resource usage sampled by pod_profiler.py
+    "pod_cpu_usage": "k8s_pod_cpu_usage_seconds",
+    "pod_cpu_periods": "k8s_pod_cpu_cfs_periods",
+    "pod_cpu_throttled_periods": "k8s_pod_cpu_cfs_throttled_periods",
+    "pod_memory_working_set": "k8s_pod_memory_working_set_bytes",
+    "pod_network_rx_bytes": "k8s_pod_network_receive_bytes",
+    "pod_network_tx_bytes": "k8s_pod_network_transmit_bytes",
+    # Records/s offered and taken in, and records queued, by workload.py
+    "offered_load": "workload_generator",
+    "achieved_load": "workload_generator",
+    "generator_backlog": "workload_generator",
 }
 
+# Declarative aggregation config: the field each metric is read from, and
+# whether its series are averaged or summed per second across TaskManagers
 METRIC_TO_FIELD = {
-    "backpressure": "mean",
+    "backpressure": "value",
     "throughput": "rate",
     "input_rate": "rate",
+    "jvm_cpu_load": "value",
     "jvm_cpu_time": "value",
     "jvm_gc_time": "value",
     "jvm_heap_used": "value",
     "jvm_threads": "value",
     "shuffle_netty_used_segments": "value",
-    "remote_bytes_per_sec": "count"
+    "remote_bytes_per_sec": "count",
+    "checkpoint_alignment": "value",
+    "checkpoint_start_delay": "value",
+    "latency_p50": "p50",
+    "latency_p95": "p95",
+    "latency_p99": "p99",
+    "latency_p999": "p999",
+    "pod_cpu_usage": "value",
+    "pod_cpu_periods": "value",
+    "pod_cpu_throttled_periods": "value",
+    "pod_memory_working_set": "value",
+    "pod_network_rx_bytes": "value",
+    "pod_network_tx_bytes": "value",
+    "offered_load": "offered",
+    "achieved_load": "achieved",
+    "generator_backlog": "backlog"
 }
 
 AGG_METRICS_MEAN = {
-    "backpressure"
+    "backpressure",
+    "checkpoint_alignment",
+    "checkpoint_start_delay"
+}
+
+# Slowest path every second
+AGG_METRICS_MAX = {
+    "latency_p50",
+    "latency_p95",
+    "latency_p99",
+    "latency_p999"
 }
 
 AGG_METRICS_SUM = {
+    "throughput",
+    "input_rate",
+    "jvm_cpu_load",
     "jvm_heap_used",
     "jvm_gc_time",
     "jvm_cpu_time",
     "jvm_threads",
     "shuffle_netty_used_segments",
-    "remote_bytes_per_sec"
+    "remote_bytes_per_sec",
+    "pod_cpu_usage",
+    "pod_cpu_periods",
+    "pod_cpu_throttled_periods",
+    "pod_memory_working_set",
+    "pod_network_rx_bytes",
+    "pod_network_tx_bytes",
+    "offered_load",
+    "achieved_load",
+    "generator_backlog"
+}
+
+# Metrics only reported when their collector ran: absent means unknown, not 0
+OPTIONAL_METRICS = {
+    "pod_cpu_usage",
+    "pod_cpu_periods",
+    "pod_cpu_throttled_periods",
+    "pod_memory_working_set",
+    "pod_network_rx_bytes",
+    "pod_network_tx_bytes",
+    "offered_load",
+    "achieved_load",
+    "generator_backlog"
+}
+
+# Cumulative counters (ns and ms since JVM start, cgroup totals since pod
+# start): aggregated as per-second rates from per-TaskManager deltas rather
+# than as raw values. pod_cpu_usage becomes cores in use.
+COUNTER_METRICS = {
+    "jvm_cpu_time",
+    "jvm_gc_time",
+    "pod_cpu_usage",
+    "pod_cpu_periods",
+    "pod_cpu_throttled_periods",
+    "pod_network_rx_bytes",
+    "pod_network_tx_bytes"
+}
+
+# Efficiency metrics derived per second: numerator * scale / denominator
+DERIVED_METRICS = {
+    "cpu_ns_per_record": ("jvm_cpu_time", "throughput", 1),
+    "gc_ms_per_1k_records": ("jvm_gc_time", "throughput", 1000),
+    # Share of CFS periods in which the TaskManager was throttled
+    "pod_cpu_throttled_ratio": ("pod_cpu_throttled_periods", "pod_cpu_periods", 1),
+    # Share of the generator's offered load the job took in
+    "achieved_load_ratio": ("achieved_load", "offered_load", 1),
+}
+
+# Seconds at the start of a run window left out of the "steady" statistic
+WARMUP_SECONDS = 60
+
+# Tag groupings every run is also broken down by, to expose hot spots across
+# TaskManagers and subtasks. Metrics not carrying the tags are left out of a
+# breakdown (JVM metrics have no subtask).
+BREAKDOWNS = {
+    "tm": ("tm_id",),
+    "subtask": ("task_name", "subtask_index"),
 }
 
 
+def is_timestamp(value):
+    try:
+        metrics_cache.to_epoch_seconds(value)
+    except ValueError:
+        return False
+    return True
+
 def parse_log_file(log_path):
+    """
+    Returns: (entries with a start and end timestamp, lines of the runs
+    logged without one, e.g. the start=-1 of runs that never became ready)
+    """
     with open(log_path, "r") as f:
         lines = f.readlines()
 
-    entries = []
+    entries, invalid = [], []
     for i in range(0, len(lines), 2):
         start_line = lines[i].strip()
         end_line = lines[i + 1].strip() if i + 1 < len(lines) else None
 
-        start_match = re.match(r"(.*?) - Starting config: (.*)", start_line)
+        # Runs scheduled next to each other also log their deployment name,
+        # which is reported as an InfluxDB tag
+        start_match = re.match(r"(.*?) - Starting config: (\S+)(?: deployment=(\S+))?", start_line)
         end_match = re.match(r"(.*?) - Finished config: (.*)", end_line) if end_line else None
 
-        if start_match and end_match:
+        if start_match and end_match and not all(map(is_timestamp, (start_match.group(1), end_match.group(1)))):
+            invalid.append(start_line)
+        elif start_match and end_match:
             entries.append({
                 "label": start_match.group(2),
+                "deployment": start_match.group(3),
                 "start": start_match.group(1),
                 "end": end_match.group(1)
             })
-    return entries
+    return entries, invalid
 
-def query_mean_metric(client, measurement, start, end):
-    query = f"""
-    SELECT MEAN("value") FROM "{measurement}"
-    WHERE time >= '{start}' AND time <= '{end}'
-    """
-    # print(query)
-    result = client.query(query)
-    points = list(result.get_points())
-    return points[0]["mean"] if points else None
-
-def query_value_sum(client, measurement, start, end):
-    query = f"""
-    SELECT SUM("value") FROM "{measurement}"
-    WHERE time >= '{start}' AND time <= '{end}'
+def load_run_series(client, start, end, metrics=METRICS, tags=None, offline=False, extra=(), refresh=False):
     """
-    # print(query)
-    result = client.query(query)
-    points = list(result.get_points())
-    return points[0]["mean"] if points else None
-
-def query_count_sum(client,measurement, start, end):
-    query = f"""
-    SELECT SUM("count") FROM "{measurement}"
-    WHERE time >= '{start}' AND time <= '{end}'
-    GROUP BY time(1s)
+    Loads the raw series of every metric of a run window (and of the extra
+    measurements) from the local cache, fetching missing chunks with a
+    single query.
     """
-    # print(query)
-    result = client.query(query)
-    points = list(result.get_points())
-    # print(points)
-
-    # Extract and average non-None "sum" values
-    values = [p["sum"] for p in points if p.get("sum") is not None]
-    avg = sum(values) / len(values) if values else 0
-
-    return avg
-
-def query_rate_sum(client,measurement, start, end):
-    query = f"""
-    SELECT SUM("rate") FROM "{measurement}"
-    WHERE time >= '{start}' AND time <= '{end}'
-    GROUP BY time(1s)
+    # Metrics read from different fields may share a measurement
+    measurements = list(dict.fromkeys([*metrics.values(), *extra]))
+    return metrics_cache.load_series(client, measurements, start, end, tags=tags, offline=offline, refresh=refresh)
+
+def aggregate_run(series, start, metrics=METRICS, by=()):
+    return aggregation.aggregate_window(
+        series, metrics, METRIC_TO_FIELD, AGG_METRICS_MEAN,
+        start=metrics_cache.to_epoch_seconds(start), warmup_seconds=WARMUP_SECONDS, by=by,
+        counter_metrics=COUNTER_METRICS, derived=DERIVED_METRICS, max_metrics=AGG_METRICS_MAX,
+        optional_metrics=OPTIONAL_METRICS
+    )
+
+def query_run_metrics(client, start, end, metrics=METRICS, tags=None, offline=False):
     """
-    # print(query)
-    result = client.query(query)
-    points = list(result.get_points())
-    # print(points)
-
-    # Extract and average non-None "sum" values
-    values = [p["sum"] for p in points if p.get("sum") is not None]
-    avg = sum(values) / len(values) if values else 0
-
-    return avg
-
-def query_value_sum(client, measurement, start, end):
-    query = f"""
-    SELECT SUM("value") FROM "{measurement}"
-    WHERE time >= '{start}' AND time <= '{end}'
-    GROUP BY time(1s)
+    Aggregates every metric of a run window locally.
+    Returns: DataFrame indexed by metric label (METRICS and DERIVED_METRICS)
+    with columns "value" and aggregation.STATS (values are None when there
+    is no data)
     """
-    # print(query)
-    result = client.query(query)
-    points = list(result.get_points())
-    # print(points)
+    series = load_run_series(client, start, end, metrics, tags=tags, offline=offline)
+    return aggregate_run(series, start, metrics)
 
-    # Extract and average non-None "sum" values
-    values = [p["sum"] for p in points if p.get("sum") is not None]
-    avg = sum(values) / len(values) if values else 0
+def with_skew(values, breakdowns):
+    """
+    Adds the <scope>_max_mean and <scope>_gini stats of every breakdown to
+    the run's metric values.
+    """
+    values = values.copy()
+    for scope, breakdown in breakdowns.items():
+        spread = aggregation.skew(breakdown).reindex(values.index)
+        values[f"{scope}_max_mean"] = spread["max_mean"].astype(object).where(spread["max_mean"].notna(), None)
+        values[f"{scope}_gini"] = spread["gini"].astype(object).where(spread["gini"].notna(), None)
+    return values
+
+def tm_series(series, metrics=METRICS):
+    """
+    Returns: per-second values of every metric per TaskManager, with columns
+    metric, tm_id, second, value
+    """
+    long = aggregation.long_frame(series, metrics, METRIC_TO_FIELD, by=("tm_id",), counter_metrics=COUNTER_METRICS)
+    return aggregation.per_second(long, AGG_METRICS_MEAN, by=("tm_id",), max_metrics=AGG_METRICS_MAX).rename("value").reset_index()
 
-    return avg
+# Experiment matrix, shared with flink_benchmark_runner.py
+CONFIGS, BENCHMARKS, RPS, input_var = experiment.load_matrix()
 
-def parse_config_label(label):
+def extract_cell(client, benchmark, config, rps, offline=False, refresh=False):
     """
-    Parses config name like 'tm8x1-40k' into structured fields.
-    Returns: dict with keys 'num_tms', 'slots_per_tm', 'input_rate'
+    Extracts one benchmark/config/rate cell: reads its log file, queries
+    every run window and writes its per-TaskManager series. Windows without
+    any data (e.g. not cached when offline) are left out rather than stored
+    as zeros.
+    Returns: (lines to print for this cell, runs for results_store.append,
+    (label, start) of the windows without data)
     """
-    match = re.match(r"tm(\d+)x(\d+)-(\d+)k", label)
-    if match:
-        return {
-            "num_tms": int(match.group(1)),
-            "slots_per_tm": int(match.group(2)),
-            "input": int(match.group(3)) * 1000
+    out = [f"  RPS: {rps}", f"    Config: {config['label']}"]
+    config_label = config["label"]
+
+    log_path = LOG_DIR + benchmark + "_" + config_label + "_" + str(rps) + "_log.txt"
+
+    entries, invalid = parse_log_file(log_path)
+    for line in invalid:
+        out.append(f"  ⚠️ Skipping a run logged without a time window: {line}")
+
+    runs = []
+    missing = []
+    for entry in entries:
+        label = entry["label"]
+        start = entry["start"]
+        end = entry["end"]
+
+        out.append(f"\n🔍 Config: {label}")
+        run = {
+            "app": benchmark,
+            "config": label,
+            "rate": rps,
+            "deployment": entry["deployment"],
+            "time_start": start,
+            "time_end": end,
+            "checkpoint_interval": config.get("flink_conf", {}).get(experiment.CHECKPOINT_INTERVAL_KEY),
+            "state_backend": config.get("flink_conf", {}).get(experiment.STATE_BACKEND_KEY),
+            "source": results_store.SOURCE_INFLUX
         }
-    else:
-        return {
-            "num_tms": None,
-            "slots_per_tm": None,
-            "input": None
-        }
-
-
-BENCHMARKS= {
-    "StateMachine": "local:///opt/flink/examples/streaming/StateMachineExample.jar",
-    "WindowJoin": "local:///opt/flink/examples/streaming/WindowJoin.jar",
-    # "WordCount": "local:///opt/flink/examples/streaming/WordCount.jar",
-    # "SessionWindow": "local:///opt/flink/examples/streaming/SessionWindowing.jar",
-}
-
-RPS = {
-    "StateMachine": [10000, 50000, 100000, 200000, 400000],
-    "WindowJoin": [1, 3, 5, 7, 9, 11, 19, 25, 50, 100, 200, 500, 1000],
-    # "WordCount": [10000, 50000, 100000, 200000, 400000],
-    # "SessionWindow": [10000, 50000, 100000, 200000, 400000],
-}
-
-CONFIGS = [
-    {
-        "label": "tm8x1",
-        "task_slots": 1,
-        "cpu": 1,
-        "memory": "2048m",
-        "replicas": 8,
-        
-    },
-    {
-        "label": "tm2x4",
-        "task_slots": 4,
-        "cpu": 4,
-        "memory": "8192m",
-        "replicas": 2
-    }
-]
-
-def main():
 
+        # Structured TaskManager shape of the config
+        run.update(experiment.shape_fields(config))
+
+        tags = {"deployment": entry["deployment"]} if entry["deployment"] else None
+        series = load_run_series(client, start, end, tags=tags, offline=offline, refresh=refresh,
+                                 extra=checkpoints.CHECKPOINT_MEASUREMENTS.values())
+        if all(series[measurement].empty for measurement in METRICS.values()):
+            out.append("  ⚠️ No data in this window, not stored")
+            missing.append((label, start))
+            continue
+        breakdowns = {scope: aggregate_run(series, start, by=by) for scope, by in BREAKDOWNS.items()}
+        values = with_skew(aggregate_run(series, start), breakdowns)
+        timeline = checkpoints.timeline(series)
+        summary = checkpoints.summarize(timeline, checkpoints.failed_checkpoints(series))
+        values = pd.concat([values, summary.reindex(columns=values.columns)]).astype(object)
+        values = values.where(values.notna(), None)
+        results_store.write_series(results_store.run_id(benchmark, label, rps, start), tm_series(series))
+        for metric_label, avg_value in values["value"].items():
+            tm_skew = values.loc[metric_label, "tm_max_mean"]
+            if avg_value is not None and tm_skew is not None:
+                out.append(f"  {metric_label.capitalize()}: {avg_value:.2f} (TM max/mean {tm_skew:.2f})")
+            elif avg_value is not None:
+                out.append(f"  {metric_label.capitalize()}: {avg_value:.2f}")
+            else:
+                out.append(f"  {metric_label.capitalize()}: No data")
+        runs.append((run, values, breakdowns, timeline))
+    return out, runs, missing
+
+def sweep_cells():
+    cells = []
     for benchmark in BENCHMARKS.keys():
-        print(f"Processing benchmark: {benchmark}")
         for rps in RPS[benchmark]:
-            print(f"  RPS: {rps}")
             for config in CONFIGS:
-                print(f"    Config: {config['label']}")
-                config_label = config["label"] 
-
-                log_path = LOG_DIR + benchmark + "_" + config_label + "_" + str(rps) + "_log.txt"
-
-                entries = parse_log_file(log_path)
-                output_csv = LOG_DIR + benchmark + "_" + config_label + "_" + str(rps) + "_results.csv"
-
-                client = InfluxDBClient(host=INFLUX_HOST, port=INFLUX_PORT, database=INFLUX_DB)
-                # Prepare header
-                metric_names = list(METRICS.keys())
-                fieldnames = ["config", "num_tms", "slots_per_tm", "input"] + metric_names + ["time_start", "time_end"]
-                
-                with open(output_csv, "w", newline="") as f:
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    writer.writeheader()
-
-                    for entry in entries:
-                        label = entry["label"]
-                        start = entry["start"]
-                        end = entry["end"]
-
-                        print(f"\n🔍 Config: {label}")
-                        row = {
-                            "config": label,
-                            "time_start": start,
-                            "time_end": end
-                        }
-
-                        # Parse and add structured config values
-                        row.update(parse_config_label(label))
-
-                        for metric_label, measurement in METRICS.items():
-                            
-                            # avg_value = query_avg_metric(client, measurement, start, end)
-                            # elif metric_label == "throughput" or metric_label == "input_rate":
-                            if metric_label in ["throughput", "input_rate"]:
-                                avg_value = query_rate_sum(client, measurement, start, end)
-                            elif metric_label == "remote_bytes_per_sec":
-                                avg_value = query_count_sum(client, measurement, start, end)
-                            elif metric_label in AGG_METRICS_MEAN:
-                                avg_value = query_mean_metric(client, measurement, start, end)
-                            else:
-                                avg_value = query_value_sum(client, measurement, start, end)
-                            if avg_value is not None:
-                                print(f"  {metric_label.capitalize()}: {avg_value:.2f}")
-                                row[metric_label] = avg_value
-                            else:
-                                print(f"  {metric_label.capitalize()}: No data")
-                                row[metric_label] = None
-                        writer.writerow(row)
+                cells.append((benchmark, config, rps))
+    return cells
+
+def main(offline=False, refresh=False):
+    # One client (and its pooled HTTP session) shared by all workers.
+    # Offline runs only aggregate what is already in the metrics cache,
+    # refreshing runs fetch every chunk again.
+    client = None
+    if not offline:
+        client = backends.metrics.client(pool_size=MAX_WORKERS)
+
+    store = results_store.connect()
+    cells = sweep_cells()
+    failed = []
+    missing = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = [pool.submit(extract_cell, client, *cell, offline=offline, refresh=refresh) for cell in cells]
+
+        # Report in sweep order, whatever order the cells complete in
+        current_benchmark = None
+        for (benchmark, config, rps), future in zip(cells, futures):
+            if benchmark != current_benchmark:
+                print(f"Processing benchmark: {benchmark}")
+                current_benchmark = benchmark
+            try:
+                out, runs, empty = future.result()
+                print("\n".join(out))
+                results_store.append(store, runs)
+                missing += [(benchmark, label, rps, start) for label, start in empty]
+            except Exception as e:
+                print(f"  ⚠️ Failed {benchmark} {config['label']} {rps}: {e}")
+                failed.append((benchmark, config["label"], rps))
+
+    store.close()
+    if client is not None:
+        client.close()
+
+    if missing:
+        print(f"\n⚠️ {len(missing)} run windows had no data and were not stored"
+              f"{' (not in the metrics cache)' if offline else ''}:")
+        for benchmark, label, rps, start in missing:
+            print(f"  {benchmark} {label} {rps} from {start}")
+
+    if failed:
+        print(f"\n⛔ {len(failed)} of {len(cells)} cells failed:")
+        for benchmark, label, rps in failed:
+            print(f"  {benchmark} {label} {rps}")
 
 if __name__ == "__main__":
-    main()
+    main(offline="--offline" in sys.argv, refresh="--refresh" in sys.argv)
@@ -0,0 +1,433 @@
+"""
+Local stand-in for the InfluxDB 1.x HTTP API used by the benchmark.
+
+Accepts the line protocol the Flink InfluxDB reporter sends to /write and
+stores it in an append-only columnar layout, memory-mapped on read:
+
+    <root>/<measurement>/<hour>/time.i8           int64 ns timestamps
+    <root>/<measurement>/<hour>/tags.i4           int32 tag-set ids
+    <root>/<measurement>/<hour>/fields/<f>.f8     float64 values (NaN if absent)
+    <root>/tagsets.jsonl                          tag-set id -> tags
+
+/query answers the subset of InfluxQL that get_metrics.py and the runner
+issue. Run it with `python line_protocol_sink.py [port]` and point both
+metrics.reporter.influxdb.host and INFLUX_HOST at this machine.
+"""
+import json
+import math
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote, unquote
+
+import numpy as np
+
+SINK_DIR = "sink/"
+SINK_PORT = 8086
+
+NS_PER_HOUR = 3600 * 10 ** 9
+PRECISION_NS = {"n": 1, "ns": 1, "u": 10 ** 3, "ms": 10 ** 6, "s": 10 ** 9, "m": 60 * 10 ** 9, "h": 3600 * 10 ** 9}
+
+
+def split_unescaped(text, sep):
+    """
+    Splits on sep outside of double quotes and not preceded by a backslash.
+    """
+    if "\\" not in text and '"' not in text:
+        return text.split(sep)
+    parts, current, quoted, i = [], [], False, 0
+    while i < len(text):
+        c = text[i]
+        if c == "\\" and i + 1 < len(text):
+            current.append(text[i:i + 2])
+            i += 2
+            continue
+        if c == '"':
+            quoted = not quoted
+        if c == sep and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(c)
+        i += 1
+    parts.append("".join(current))
+    return parts
+
+def unescape(text):
+    return re.sub(r"\\(.)", r"\1", text) if "\\" in text else text
+
+def parse_field_value(raw):
+    """
+    Returns: the numeric value of a field, or None for string fields
+    """
+    if raw.endswith("i") or raw.endswith("u"):
+        return float(raw[:-1])
+    if raw in ("t", "T", "true", "True", "TRUE"):
+        return 1.0
+    if raw in ("f", "F", "false", "False", "FALSE"):
+        return 0.0
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+def parse_lines(body, precision="ns", now_ns=None):
+    """
+    Parses a line-protocol body.
+    Returns: list of (measurement, tags tuple, fields dict, timestamp ns)
+    """
+    scale = PRECISION_NS[precision or "ns"]
+    points = []
+    for line in body.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = split_unescaped(line, " ")
+        parts = [p for p in parts if p]
+        key, field_set = parts[0], parts[1]
+        if len(parts) > 2:
+            timestamp = int(parts[2]) * scale
+        else:
+            timestamp = now_ns if now_ns is not None else int(datetime.now(timezone.utc).timestamp() * 10 ** 9)
+
+        key_parts = split_unescaped(key, ",")
+        measurement = unescape(key_parts[0])
+        tags = []
+        for pair in key_parts[1:]:
+            tag, value = split_unescaped(pair, "=")[:2]
+            tags.append((unescape(tag), unescape(value)))
+
+        fields = {}
+        for pair in split_unescaped(field_set, ","):
+            field, raw = pair.split("=", 1)
+            value = parse_field_value(raw)
+            if value is not None:
+                fields[unescape(field)] = value
+        if fields:
+            points.append((measurement, tuple(sorted(tags)), fields, timestamp))
+    return points
+
+
+def read_column(path, dtype, rows):
+    """
+    Memory-maps the first `rows` entries of a column file; missing trailing
+    entries (a field not written for the latest rows) read as NaN.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    size = os.path.getsize(path) // itemsize if os.path.exists(path) else 0
+    available = min(size, rows)
+    column = np.memmap(path, dtype=dtype, mode="r", shape=(available,)) if available else np.empty(0, dtype)
+    if available == rows:
+        return column
+    return np.concatenate([column, np.full(rows - available, np.nan, dtype)])
+
+
+class ColumnStore:
+    """
+    Append-only columnar store partitioned by measurement and hour.
+    """
+
+    def __init__(self, root=SINK_DIR):
+        self.root = root
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.tagsets = {}
+        self.tagset_list = []
+        os.makedirs(root, exist_ok=True)
+        self.tagsets_path = os.path.join(root, "tagsets.jsonl")
+        if os.path.exists(self.tagsets_path):
+            with open(self.tagsets_path) as f:
+                for line in f:
+                    tags = tuple(tuple(pair) for pair in json.loads(line))
+                    self.tagsets[tags] = len(self.tagset_list)
+                    self.tagset_list.append(dict(tags))
+
+    def partition_dir(self, measurement, hour):
+        return os.path.join(self.root, quote(measurement, safe=""), str(hour))
+
+    def row_count(self, directory):
+        if directory not in self.rows:
+            path = os.path.join(directory, "time.i8")
+            self.rows[directory] = os.path.getsize(path) // 8 if os.path.exists(path) else 0
+            self.truncate(directory, self.rows[directory])
+        return self.rows[directory]
+
+    def truncate(self, directory, rows):
+        """
+        Cuts every column of a partition back to its row count: an append
+        interrupted before its timestamps were written leaves values behind
+        that the next append would otherwise land after.
+        """
+        fields_dir = os.path.join(directory, "fields")
+        names = os.listdir(fields_dir) if os.path.isdir(fields_dir) else []
+        paths = [(os.path.join(directory, "time.i8"), 8), (os.path.join(directory, "tags.i4"), 4)]
+        paths += [(os.path.join(fields_dir, name), 8) for name in names]
+        for path, itemsize in paths:
+            if os.path.exists(path) and os.path.getsize(path) > rows * itemsize:
+                os.truncate(path, rows * itemsize)
+
+    def tagset_id(self, tags):
+        if tags not in self.tagsets:
+            self.tagsets[tags] = len(self.tagset_list)
+            self.tagset_list.append(dict(tags))
+            with open(self.tagsets_path, "a") as f:
+                f.write(json.dumps(list(tags)) + "\n")
+        return self.tagsets[tags]
+
+    def append(self, points):
+        """
+        Appends parsed points, one bulk write per partition and column.
+        Timestamps are written last: they define how many rows readers see.
+        """
+        partitions = {}
+        for measurement, tags, fields, timestamp in points:
+            partitions.setdefault((measurement, timestamp // NS_PER_HOUR), []).append((tags, fields, timestamp))
+
+        with self.lock:
+            for (measurement, hour), rows in partitions.items():
+                directory = self.partition_dir(measurement, hour)
+                os.makedirs(os.path.join(directory, "fields"), exist_ok=True)
+                existing = self.row_count(directory)
+
+                names = sorted({name for _, fields, _ in rows for name in fields})
+                for name in names:
+                    path = os.path.join(directory, "fields", quote(name, safe="") + ".f8")
+                    stored = os.path.getsize(path) // 8 if os.path.exists(path) else 0
+                    values = np.array([fields.get(name, np.nan) for _, fields, _ in rows], dtype="f8")
+                    with open(path, "ab") as f:
+                        if stored < existing:
+                            np.full(existing - stored, np.nan, "f8").tofile(f)
+                        values.tofile(f)
+
+                tag_ids = np.array([self.tagset_id(tags) for tags, _, _ in rows], dtype="i4")
+                with open(os.path.join(directory, "tags.i4"), "ab") as f:
+                    tag_ids.tofile(f)
+                times = np.array([timestamp for _, _, timestamp in rows], dtype="i8")
+                with open(os.path.join(directory, "time.i8"), "ab") as f:
+                    times.tofile(f)
+                self.rows[directory] = existing + len(rows)
+
+    def scan(self, measurement, start_ns, end_ns, tag_filter):
+        """
+        Reads the rows of a measurement with start_ns <= time < end_ns whose
+        tags match every (tag, value) of tag_filter.
+        Returns: (times, tag ids, dict of field -> values), sorted by time
+        """
+        base = os.path.join(self.root, quote(measurement, safe=""))
+        hours = sorted(int(h) for h in os.listdir(base)) if os.path.isdir(base) else []
+        matching = [
+            i for i, tags in enumerate(self.tagset_list)
+            if all(tags.get(tag) == value for tag, value in tag_filter)
+        ]
+
+        parts = []
+        for hour in hours:
+            if (hour + 1) * NS_PER_HOUR <= start_ns or hour * NS_PER_HOUR >= end_ns:
+                continue
+            directory = os.path.join(base, str(hour))
+            with self.lock:
+                rows = self.row_count(directory)
+            t = read_column(os.path.join(directory, "time.i8"), "i8", rows)
+            ids = read_column(os.path.join(directory, "tags.i4"), "i4", rows)
+            mask = (t >= start_ns) & (t < end_ns) & np.isin(ids, matching)
+            field_dir = os.path.join(directory, "fields")
+            fields = {
+                unquote(re.sub(r"\.f8$", "", file_name)): read_column(os.path.join(field_dir, file_name), "f8", rows)[mask]
+                for file_name in os.listdir(field_dir)
+            }
+            parts.append((t[mask], ids[mask], fields))
+
+        if not parts:
+            return np.empty(0, "i8"), np.empty(0, "i4"), {}
+        names = sorted({name for _, _, fields in parts for name in fields})
+        times = np.concatenate([t for t, _, _ in parts])
+        order = np.argsort(times, kind="stable")
+        columns = {
+            name: np.concatenate([f.get(name, np.full(len(t), np.nan)) for t, _, f in parts])[order]
+            for name in names
+        }
+        return times[order], np.concatenate([ids for _, ids, _ in parts])[order], columns
+
+
+STATEMENT = re.compile(
+    r"""SELECT\s+(?:(?P<star>\*)|(?P<agg>\w+)\("(?P<field>[^"]+)"\))\s+FROM\s+"(?P<measurement>[^"]+)"\s+"""
+    r"""WHERE\s+(?P<where>.+?)(?:\s+GROUP\s+BY\s+time\((?P<interval>\d+)(?P<unit>ms|s|m|h)\))?"""
+    r"""(?:\s+fill\((?P<fill>\w+)\))?\s*$""",
+    re.IGNORECASE | re.DOTALL,
+)
+TIME_CONDITION = re.compile(r"""time\s*(>=|>|<=|<)\s*(?:'([^']+)'|(\d+)(ns|u|ms|s|m|h)?)""", re.IGNORECASE)
+TAG_CONDITION = re.compile(r""""([^"]+)"\s*=\s*'([^']*)'""")
+AGGREGATES = {
+    "sum": np.sum,
+    "mean": np.mean,
+    "count": len,
+    "max": np.max,
+    "min": np.min,
+}
+
+
+def to_ns(iso):
+    moment = datetime.fromisoformat(iso.replace("Z", "+00:00"))
+    return int(moment.timestamp()) * 10 ** 9 + moment.microsecond * 1000
+
+def format_time(ns, epoch):
+    if epoch:
+        return int(ns // PRECISION_NS[epoch])
+    moment = datetime.fromtimestamp(ns // 10 ** 9, timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S") + ("Z" if ns % 10 ** 9 == 0 else f".{ns % 10 ** 9:09d}".rstrip("0") + "Z")
+
+def parse_where(where):
+    start_ns, end_ns = 0, 2 ** 62
+    for op, iso, number, unit in TIME_CONDITION.findall(where):
+        ns = to_ns(iso) if iso else int(number) * PRECISION_NS[unit or "ns"]
+        if op == ">=":
+            start_ns = max(start_ns, ns)
+        elif op == ">":
+            start_ns = max(start_ns, ns + 1)
+        elif op == "<=":
+            end_ns = min(end_ns, ns + 1)
+        else:
+            end_ns = min(end_ns, ns)
+    tag_filter = [(tag, value) for tag, value in TAG_CONDITION.findall(where) if tag != "time"]
+    return start_ns, end_ns, tag_filter
+
+def execute(store, statement, epoch=None):
+    """
+    Runs one supported InfluxQL statement.
+    Returns: the statement's entry of an InfluxDB /query response
+    """
+    match = STATEMENT.match(statement.strip())
+    if not match:
+        if re.match(r"\s*(CREATE|SHOW)\s", statement, re.IGNORECASE):
+            return {}
+        return {"error": f"unsupported statement: {statement.strip()}"}
+
+    measurement = match["measurement"]
+    start_ns, end_ns, tag_filter = parse_where(match["where"])
+    times, tag_ids, fields = store.scan(measurement, start_ns, end_ns, tag_filter)
+    if not len(times):
+        return {}
+
+    if match["star"]:
+        tag_keys = sorted({key for i in np.unique(tag_ids).tolist() for key in store.tagset_list[i]})
+        columns = {"time": [format_time(int(t), epoch) for t in times.tolist()]}
+        for key in tag_keys:
+            lookup = [store.tagset_list[i].get(key) for i in range(len(store.tagset_list))]
+            columns[key] = [lookup[i] for i in tag_ids.tolist()]
+        for key, values in fields.items():
+            columns[key] = [None if math.isnan(v) else v for v in values.tolist()]
+        names = ["time"] + sorted(set(columns) - {"time"})
+        values = [list(row) for row in zip(*(columns[name] for name in names))]
+        return {"series": [{"name": measurement, "columns": names, "values": values}]}
+
+    agg = match["agg"].lower()
+    column_name = agg
+    if agg not in AGGREGATES:
+        return {"error": f"unsupported aggregate: {match['agg']}"}
+    values = fields.get(match["field"], np.full(len(times), np.nan))
+    present = ~np.isnan(values)
+    times, values = times[present], values[present]
+
+    if not match["interval"]:
+        if not len(values):
+            return {}
+        row = [format_time(start_ns if start_ns else 0, epoch), float(AGGREGATES[agg](values))]
+        return {"series": [{"name": measurement, "columns": ["time", column_name], "values": [row]}]}
+
+    interval = int(match["interval"]) * PRECISION_NS[match["unit"].lower()]
+    buckets = times // interval
+    rows = []
+    if len(buckets):
+        unique, first = np.unique(buckets, return_index=True)
+        bounds = list(first) + [len(buckets)]
+        results = {
+            int(bucket): float(AGGREGATES[agg](values[bounds[i]:bounds[i + 1]]))
+            for i, bucket in enumerate(unique)
+        }
+    else:
+        results = {}
+    if (match["fill"] or "").lower() == "none":
+        keys = sorted(results)
+    else:
+        first_bucket = start_ns // interval if start_ns else (min(results) if results else 0)
+        last_bucket = (end_ns - 1) // interval if end_ns < 2 ** 62 else (max(results) if results else -1)
+        keys = range(first_bucket, last_bucket + 1)
+    for bucket in keys:
+        rows.append([format_time(bucket * interval, epoch), results.get(bucket)])
+    if not rows:
+        return {}
+    return {"series": [{"name": measurement, "columns": ["time", column_name], "values": rows}]}
+
+
+def serve(store, port=SINK_PORT):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def params(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            body = b""
+            if self.command == "POST":
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                    params.update({k: v[0] for k, v in parse_qs(body.decode()).items()})
+            return url.path, params, body
+
+        def reply(self, status, body=None):
+            self.send_response(status)
+            self.send_header("X-Influxdb-Version", "1.8-sink")
+            if body is None:
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            data = json.dumps(body).encode()
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def handle_request(self):
+            path, params, body = self.params()
+            if path == "/ping":
+                self.reply(204)
+            elif path == "/write":
+                try:
+                    store.append(parse_lines(body.decode(), params.get("precision", "ns")))
+                except (ValueError, IndexError, KeyError) as e:
+                    self.reply(400, {"error": f"unable to parse: {e}"})
+                    return
+                self.reply(204)
+            elif path == "/query":
+                statements = [s for s in params.get("q", "").split(";") if s.strip()]
+                results = []
+                for i, statement in enumerate(statements):
+                    result = execute(store, statement, params.get("epoch"))
+                    result["statement_id"] = i
+                    results.append(result)
+                self.reply(200, {"results": results})
+            else:
+                self.reply(404, {"error": "not found"})
+
+        do_GET = handle_request
+        do_POST = handle_request
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else SINK_PORT
+    server = serve(ColumnStore(SINK_DIR), port)
+    print(f"📥 Line-protocol sink listening on :{port}, storing in {SINK_DIR}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import collections
+import html
+import json
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import backends
+import steady_state
+from get_metrics import METRICS
+
+# Seconds of per-second aggregates kept per deployment and metric
+RING_SECONDS = 300
+POLL_SECONDS = 2
+
+# Live view on http://<runner host>:LIVE_PORT/ (JSON at /metrics.json)
+LIVE_PORT = 8765
+
+# A deployment is flagged as saturated when its mean backpressure over the
+# last SATURATION_WINDOW_SECONDS exceeds SATURATION_BACKPRESSURE (ms per second)
+SATURATION_WINDOW_SECONDS = 30
+SATURATION_BACKPRESSURE = 800.0
+
+
+class LiveMetrics:
+    """
+    Rolling per-second aggregates of every METRICS measurement for the
+    deployments currently running, tailed from InfluxDB into bounded ring
+    buffers. Deployments can be flagged for an early abort.
+    """
+
+    def __init__(self, ring_seconds=RING_SECONDS):
+        self.ring_seconds = ring_seconds
+        self.lock = threading.Lock()
+        self.rings = {}
+        self.last_second = {}
+        self.aborted = set()
+
+    def watch(self, name):
+        with self.lock:
+            self.rings[name] = {
+                m: collections.deque(maxlen=self.ring_seconds) for m in METRICS
+            }
+            self.last_second[name] = int(backends.clock.now())
+            self.aborted.discard(name)
+
+    def unwatch(self, name):
+        with self.lock:
+            self.rings.pop(name, None)
+            self.last_second.pop(name, None)
+
+    def push(self, name, metric_label, second, value):
+        with self.lock:
+            ring = self.rings.get(name, {}).get(metric_label)
+            if ring is not None and (not ring or second > ring[-1][0]):
+                ring.append((second, value))
+
+    def abort(self, name):
+        with self.lock:
+            self.aborted.add(name)
+
+    def should_abort(self, name):
+        with self.lock:
+            return name in self.aborted
+
+    def saturated(self, name):
+        with self.lock:
+            return name in self.rings and self.is_saturated(self.rings[name])
+
+    def is_saturated(self, rings):
+        window = [v for _, v in list(rings["backpressure"])[-SATURATION_WINDOW_SECONDS:]]
+        return len(window) == SATURATION_WINDOW_SECONDS and statistics.fmean(window) > SATURATION_BACKPRESSURE
+
+    def snapshot(self):
+        """
+        Returns: dict of deployment -> {"saturated", "aborted", "metrics":
+        metric -> {"last", "mean_10s", "max", "series": [[second, value], ...]}}
+        """
+        with self.lock:
+            view = {}
+            for name, rings in self.rings.items():
+                metrics = {}
+                for metric_label, ring in rings.items():
+                    values = [v for _, v in ring]
+                    metrics[metric_label] = {
+                        "last": values[-1] if values else None,
+                        "mean_10s": statistics.fmean(values[-10:]) if values else None,
+                        "max": max(values) if values else None,
+                        "series": [list(point) for point in ring],
+                    }
+                view[name] = {
+                    "saturated": self.is_saturated(rings),
+                    "aborted": name in self.aborted,
+                    "metrics": metrics,
+                }
+            return view
+
+    def render_text(self):
+        lines = []
+        for name, view in self.snapshot().items():
+            flags = " SATURATED" if view["saturated"] else ""
+            flags += " ABORTED" if view["aborted"] else ""
+            lines.append(f"{name}{flags}")
+            for metric_label, stats in view["metrics"].items():
+                if stats["last"] is None:
+                    lines.append(f"  {metric_label:<28} -")
+                else:
+                    lines.append(f"  {metric_label:<28} last {stats['last']:>14.2f}"
+                                 f"  10s {stats['mean_10s']:>14.2f}  max {stats['max']:>14.2f}")
+        return "\n".join(lines) or "No running deployments"
+
+    def poll(self, client):
+        """
+        Pulls the seconds recorded since the last poll for every watched
+        deployment. Only settled seconds are taken: a second still being
+        reported would be pushed with a partial sum and never re-read.
+        """
+        with self.lock:
+            since = dict(self.last_second)
+        until = steady_state.settled_second()
+        for name, last in since.items():
+            try:
+                points = steady_state.query_per_second_points(client, name, last + 1, metrics=list(METRICS),
+                                                              until=until)
+            except Exception as e:
+                print(f"⚠️ {name}: Failed to tail metrics: {e}")
+                continue
+            newest = last
+            for metric_label, series in points.items():
+                for second, value in series:
+                    self.push(name, metric_label, second, value)
+                    newest = max(newest, second)
+            with self.lock:
+                if name in self.last_second:
+                    self.last_second[name] = newest
+
+    def tail(self, client, interval=POLL_SECONDS):
+        def run():
+            while True:
+                self.poll(client)
+                backends.clock.sleep(interval)
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+def serve(live, port=LIVE_PORT):
+    """
+    Serves the live view: / (auto-refreshing page), /text (for a terminal,
+    e.g. `watch curl -s host:port/text`), /metrics.json and
+    /abort?deployment=<name> to end a running cell early.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send(self, body, content_type):
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/metrics.json":
+                self.send(json.dumps(live.snapshot()), "application/json")
+            elif url.path == "/text":
+                self.send(live.render_text() + "\n", "text/plain")
+            elif url.path == "/abort":
+                name = parse_qs(url.query).get("deployment", [""])[0]
+                live.abort(name)
+                self.send(f"Aborting {name}\n", "text/plain")
+            elif url.path == "/":
+                page = f"<html><head><meta http-equiv='refresh' content='{POLL_SECONDS}'></head>" \
+                       f"<body><pre>{html.escape(live.render_text())}</pre></body></html>"
+                self.send(page, "text/html")
+            else:
+                self.send_error(404)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,159 @@
+"""
+Renders the FlinkDeployment of every cell in memory: the base YAML is
+parsed once, and each cell is a structured overlay merged on top of a copy
+of it (resources, slots, parallelism, job args, reporter tags, node
+selectors, Flink settings). Rendered manifests are validated against the
+parts of the FlinkDeployment schema the runner relies on before anything
+is submitted, and can be diffed to show what changes between cells.
+"""
+import copy
+import functools
+import json
+import re
+
+import yaml
+
+API_VERSION = "flink.apache.org/v1beta1"
+KIND = "FlinkDeployment"
+
+# Subset of the FlinkDeployment CRD checked locally: path -> (types, required)
+FIELDS = {
+    "metadata.name": (str, True),
+    "metadata.namespace": (str, False),
+    "spec.image": (str, True),
+    "spec.flinkVersion": (str, True),
+    "spec.serviceAccount": (str, False),
+    "spec.flinkConfiguration": (dict, True),
+    "spec.jobManager.resource.cpu": ((int, float), True),
+    "spec.jobManager.resource.memory": (str, True),
+    "spec.taskManager.resource.cpu": ((int, float), True),
+    "spec.taskManager.resource.memory": (str, True),
+    "spec.taskManager.podTemplate": (dict, False),
+    "spec.job.jarURI": (str, True),
+    "spec.job.args": (list, False),
+    "spec.job.parallelism": (int, True),
+    "spec.job.upgradeMode": (str, False),
+}
+UPGRADE_MODES = {"stateless", "savepoint", "last-state"}
+# Flink's native Kubernetes integration limits cluster ids to 45 characters
+MAX_NAME_LENGTH = 45
+NAME = re.compile(rf"^[a-z]([-a-z0-9]{{0,{MAX_NAME_LENGTH - 2}}}[a-z0-9])?$")
+MEMORY = re.compile(r"^\d+(\.\d+)?\s*([kmgt]i?b?|bytes?)?$", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_base(path):
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+def load_base(path):
+    """
+    Returns: a copy of the base manifest at path, parsed once per process
+    """
+    return copy.deepcopy(_load_base(path))
+
+def merge(base, overlay):
+    """
+    Deep-merges overlay into a copy of base: mappings are merged key by key,
+    anything else (lists included) is replaced.
+    """
+    merged = copy.deepcopy(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+def lookup(manifest, path):
+    node = manifest
+    for key in path.split("."):
+        if not isinstance(node, dict) or key not in node:
+            return None
+        node = node[key]
+    return node
+
+def validate(manifest):
+    """
+    Raises: ValueError listing every problem found
+    """
+    problems = []
+    if manifest.get("apiVersion") != API_VERSION:
+        problems.append(f"apiVersion must be {API_VERSION}")
+    if manifest.get("kind") != KIND:
+        problems.append(f"kind must be {KIND}")
+    for path, (types, required) in FIELDS.items():
+        value = lookup(manifest, path)
+        if value is None:
+            if required:
+                problems.append(f"{path} is required")
+        elif not isinstance(value, types) or isinstance(value, bool):
+            problems.append(f"{path} has the wrong type ({type(value).__name__})")
+
+    name = lookup(manifest, "metadata.name")
+    if isinstance(name, str) and not NAME.match(name):
+        problems.append(f"metadata.name {name!r} is not a DNS-1123 label of at most 45 characters")
+    for path in ["spec.jobManager.resource", "spec.taskManager.resource"]:
+        cpu = lookup(manifest, f"{path}.cpu")
+        memory = lookup(manifest, f"{path}.memory")
+        if isinstance(cpu, (int, float)) and cpu <= 0:
+            problems.append(f"{path}.cpu must be positive")
+        if isinstance(memory, str) and not MEMORY.match(memory):
+            problems.append(f"{path}.memory {memory!r} is not a memory size")
+    parallelism = lookup(manifest, "spec.job.parallelism")
+    if isinstance(parallelism, int) and parallelism <= 0:
+        problems.append("spec.job.parallelism must be positive")
+    args = lookup(manifest, "spec.job.args")
+    if isinstance(args, list) and not all(isinstance(arg, str) for arg in args):
+        problems.append("spec.job.args must be strings")
+    upgrade_mode = lookup(manifest, "spec.job.upgradeMode")
+    if upgrade_mode is not None and upgrade_mode not in UPGRADE_MODES:
+        problems.append(f"spec.job.upgradeMode must be one of {sorted(UPGRADE_MODES)}")
+
+    conf = lookup(manifest, "spec.flinkConfiguration")
+    if isinstance(conf, dict):
+        nested = [key for key, value in conf.items() if isinstance(value, (dict, list))]
+        if nested:
+            problems.append(f"spec.flinkConfiguration values must be scalars ({', '.join(nested)})")
+        slots = conf.get("taskmanager.numberOfTaskSlots")
+        if slots is not None and (not str(slots).isdigit() or int(slots) == 0):
+            problems.append("taskmanager.numberOfTaskSlots must be a positive integer")
+
+    if problems:
+        raise ValueError(f"Invalid {KIND} {name}: " + "; ".join(problems))
+
+def render(base, overlay):
+    """
+    Returns: the validated manifest of base with overlay merged on top
+    """
+    manifest = merge(base, overlay)
+    validate(manifest)
+    return manifest
+
+def flatten(node, prefix=""):
+    """
+    Returns: dict of dotted path -> leaf value (lists are leaves)
+    """
+    if not isinstance(node, dict) or not node:
+        return {prefix: node}
+    leaves = {}
+    for key, value in node.items():
+        leaves.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    return leaves
+
+def diff(before, after):
+    """
+    Returns: dict of dotted path -> (before, after) for every leaf that
+    differs (None when absent on one side)
+    """
+    old, new = flatten(before), flatten(after)
+    return {
+        path: (old.get(path), new.get(path))
+        for path in sorted(old.keys() | new.keys())
+        if old.get(path) != new.get(path)
+    }
+
+def format_diff(changes):
+    return "\n".join(
+        f"  {path}: {json.dumps(old)} -> {json.dumps(new)}" for path, (old, new) in changes.items()
+    )
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+import backends
+
+# On-disk cache of raw InfluxDB series, one Parquet file per
+# (backend, measurement, tags, time chunk). Aggregations are recomputed from it.
+CACHE_DIR = "cache/"
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Run windows are split into aligned chunks so that overlapping or repeated
+# windows share cache entries and only the missing chunks are fetched
+CHUNK_SECONDS = 300
+
+_lock = threading.Lock()
+
+
+def to_epoch_seconds(timestamp):
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+
+def window_chunks(start, end):
+    """
+    Splits a [start, end] window of ISO timestamps into aligned chunks.
+    Returns: list of (chunk_start, chunk_end) epoch seconds, end exclusive
+    """
+    first = int(to_epoch_seconds(start)) // CHUNK_SECONDS * CHUNK_SECONDS
+    last = int(to_epoch_seconds(end))
+    return [(t, t + CHUNK_SECONDS) for t in range(first, last + 1, CHUNK_SECONDS)]
+
+def backend_id(client):
+    """
+    Returns: host:port/database of the database a client queries (of
+    backends.metrics without a client), so that InfluxDB and the
+    line-protocol sink never share cache entries
+    """
+    if client is None:
+        target = backends.metrics
+        return f"{getattr(target, 'host', None)}:{getattr(target, 'port', None)}/{getattr(target, 'database', None)}"
+    # InfluxDBClient keeps its connection settings private
+    return f"{getattr(client, '_host', None)}:{getattr(client, '_port', None)}/{getattr(client, '_database', None)}"
+
+def cache_key(backend, measurement, tags, chunk_start, chunk_end):
+    spec = json.dumps([backend, measurement, sorted((tags or {}).items()), chunk_start, chunk_end])
+    return hashlib.sha256(spec.encode()).hexdigest()
+
+def cache_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, key[:2], key + ".parquet")
+
+def chunk_statement(measurement, tags, chunk_start, chunk_end):
+    query = f"""SELECT * FROM "{measurement}" WHERE time >= {chunk_start}s AND time < {chunk_end}s"""
+    for tag, value in sorted((tags or {}).items()):
+        query += f""" AND "{tag}" = '{value}'"""
+    return query
+
+def read_chunk(path):
+    frame = pd.read_parquet(path)
+    # Reading counts as a use for LRU eviction
+    os.utime(path)
+    return frame
+
+def write_chunk(frame, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Removes least recently used chunks until the cache fits in max_bytes.
+    """
+    with _lock:
+        files = []
+        for root, _, names in os.walk(cache_dir):
+            for name in names:
+                if name.endswith(".parquet"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def query_statements(client, statements, epoch):
+    """
+    Sends statements as one multi-statement query.
+    Returns: list of ResultSets, one per statement
+    """
+    results = client.query(";\n".join(statements), epoch=epoch)
+    # The client only returns a list when the query has more than one statement
+    if not isinstance(results, list):
+        results = [results]
+    return results
+
+def fetch_chunks(client, missing):
+    """
+    Fetches all missing (measurement, tags, chunk) entries with one
+    multi-statement query.
+    Returns: list of DataFrames, in the order of missing
+    """
+    statements = [chunk_statement(m, tags, cs, ce) for m, tags, cs, ce in missing]
+    return [pd.DataFrame(list(result.get_points())) for result in query_statements(client, statements, "ms")]
+
+def load_series(client, measurements, start, end, tags=None, offline=False, refresh=False,
+                cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """
+    Loads the raw series of every measurement over [start, end], reading
+    cached chunks from disk and fetching only the missing ones.
+    With offline=True (or no client) missing chunks are left out; with
+    refresh=True every chunk is fetched again and replaces the cached one.
+    Returns: dict of measurement -> DataFrame with an epoch-ms "time" column
+    """
+    now = backends.clock.now()
+    chunks = window_chunks(start, end)
+    backend = backend_id(client)
+
+    frames = {m: [] for m in measurements}
+    missing = []
+    for measurement in measurements:
+        for chunk_start, chunk_end in chunks:
+            path = cache_path(cache_key(backend, measurement, tags, chunk_start, chunk_end), cache_dir)
+            try:
+                if refresh:
+                    raise FileNotFoundError(path)
+                frames[measurement].append(read_chunk(path))
+            except FileNotFoundError:
+                missing.append((measurement, tags, chunk_start, chunk_end))
+
+    if missing and client is not None and not offline:
+        for (measurement, _, chunk_start, chunk_end), frame in zip(missing, fetch_chunks(client, missing)):
+            frames[measurement].append(frame)
+            # A chunk still being written to is not final yet, and an empty
+            # one may only not have received its points yet
+            if chunk_end <= now and not frame.empty:
+                write_chunk(frame, cache_path(cache_key(backend, measurement, tags, chunk_start, chunk_end),
+                                              cache_dir))
+        evict(cache_dir, max_bytes)
+
+    start_ms = to_epoch_seconds(start) * 1000
+    end_ms = to_epoch_seconds(end) * 1000
+    series = {}
+    for measurement, parts in frames.items():
+        parts = [p for p in parts if not p.empty]
+        if not parts:
+            series[measurement] = pd.DataFrame({"time": pd.Series(dtype="int64")})
+            continue
+        frame = pd.concat(parts, ignore_index=True)
+        series[measurement] = frame[(frame["time"] >= start_ms) & (frame["time"] <= end_ms)]
+    return series
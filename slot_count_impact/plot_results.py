@@ -1,345 +1,242 @@
 import pandas as pd
-import glob
+import hashlib
+import json
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-
-LOG_DIR = "logs/"
-
-# Path to your CSV files
-csv_files = glob.glob(os.path.join(LOG_DIR, "*.csv"))  # or replace with the full path if needed
-
-all_data = []
-
-for file in csv_files:
-    filename = os.path.basename(file)
-    match = re.match(r'(.+?)_(.+?)_(.+?)_results\.csv', filename)
-    
-    if match:
-        app, config, input_type = match.groups()
-        df = pd.read_csv(file)
-        df['app'] = app
-        df['config'] = config
-        df['input'] = input_type
-        # print filename and input
-        print(f"Processing file: {filename} with input type: {input_type}")
-        all_data.append(df)
-    else:
-        print(f"Filename did not match expected pattern: {filename}")
-
-# Combine into a single DataFrame
-combined_df = pd.concat(all_data, ignore_index=True)
-
-# Optional: Save to CSV for verification
-combined_df.to_csv("combined_results.csv", index=False)
-
-# convert input column to numeric
-combined_df['input'] = combined_df['input'].str.replace('k', '').astype(int)
-
-# select specific inputs for app==windowjoin
-combined_df = combined_df[((combined_df['app'] == 'WindowJoin') & (combined_df['input'].isin([50, 100, 200, 500, 1000]))) |
-                          (combined_df['app'] == 'StateMachine')]
-
-print(combined_df[['input', 'app', 'config']].drop_duplicates())
-# exit()
-
-# sort per app and input
-combined_df.sort_values(by=['app', 'input', 'config'], inplace=True)
-hue_order = ['tm2x4', 'tm8x1']
-
-
-fig, ax = plt.subplots(1, 2, figsize=(7, 3))
-for idx, app in enumerate(combined_df['app'].unique()):
-    app_data = combined_df[combined_df['app'] == app]
-    if idx ==0:
-        hasLegend = False
-    else:
-        hasLegend = True
-    s = sns.barplot(
-        data=app_data,
-        x='input',
-        y='throughput',
-        hue='config',
-        ax=ax[idx],
-        ci=None,
-        palette='husl',
-        edgecolor='black',
-        width=0.8, 
-        hue_order=hue_order
-        # legend=hasLegend,
-    )
-    
-    if hasLegend:
-        s.legend(title='Config', fontsize=7, title_fontsize=8)
-    else:
-        s.get_legend().remove()
-
-    s.tick_params(axis='both', labelsize=7)
-    s.set_title(app, fontsize=8)
-    s.set_xlabel('In Rate', fontsize=7)
-    s.set_ylabel('Out Rate', fontsize=7)
-
-plt.subplots_adjust(
-    top=0.8, 
-    bottom=0.24, 
-    left=0.12, 
-    right=0.98, 
-    hspace=0.3, 
-    wspace=0.35
-)
-plt.savefig("plots/throughput.pdf")
-
-
-fig, ax = plt.subplots(1, 2, figsize=(7, 3))
-for idx, app in enumerate(combined_df['app'].unique()):
-    app_data = combined_df[combined_df['app'] == app]
-    if idx ==0:
-        hasLegend = False
+import repeat_analysis
+import results_store
+
+
+PLOT_DIR = "plots/"
+
+# Hashes of the inputs each figure was last rendered from
+MANIFEST_PATH = os.path.join(PLOT_DIR, ".manifest.json")
+
+# Configs drawn first, in this order; others (e.g. checkpointing variants) follow sorted
+HUE_ORDER = ['tm2x4', 'tm8x1']
+
+# One bar chart per entry: metric on the y axis, input rate on the x axis,
+# one subplot per app and one bar per config. Entries of kind
+# "latency_curve" draw the <metric>_<quantile> columns against the rate, one
+# line per config and quantile. Entries of kind "checkpoint_timeline" draw
+# the metric of every checkpoint over the run window, for each app's highest
+# rate. Entries marked "rate_of_counter" plot a metric stored as a per-second
+# rate since it was a cumulative counter before: only runs extracted from
+# InfluxDB are drawn, runs imported from the old CSVs (or stored before the
+# store recorded their source) still hold the counter values.
+PLOTS = [
+    {"metric": "throughput", "ylabel": "Out Rate", "file": "throughput.pdf"},
+    {"kind": "latency_curve", "metric": "latency", "quantiles": ["p50", "p95", "p99", "p999"],
+     "ylabel": "End-to-end Latency (ms)", "file": "latency_results.pdf"},
+    {"metric": "jvm_cpu_time", "ylabel": "JVM CPU time (ns/s)", "file": "jvm_cpu_time_results.pdf",
+     "rate_of_counter": True},
+    {"metric": "jvm_gc_time", "ylabel": "JVM GC Time (ms/s)", "file": "jvm_gc_time_results.pdf",
+     "rate_of_counter": True},
+    {"metric": "cpu_ns_per_record", "ylabel": "CPU ns / Record", "file": "cpu_per_record_results.pdf"},
+    {"metric": "gc_ms_per_1k_records", "ylabel": "GC ms / 1k Records", "file": "gc_per_record_results.pdf"},
+    {"metric": "jvm_heap_used", "ylabel": "JVM Heap (bytes)", "file": "jvm_heap_results.pdf"},
+    {"metric": "jvm_threads", "ylabel": "Avg. Live JVM Threads", "file": "jvm_threads_results.pdf"},
+    {"metric": "shuffle_netty_used_segments", "ylabel": "Shuffle Netty Used Segments", "file": "shuffle_segments_results.pdf"},
+    {"metric": "remote_bytes_per_sec", "ylabel": "Bytes from Remote", "file": "remote_bytes_results.pdf"},
+    {"metric": "pod_cpu_usage", "ylabel": "Pod CPU (cores)", "file": "pod_cpu_results.pdf"},
+    {"metric": "pod_cpu_throttled_ratio", "ylabel": "Throttled CFS Periods", "file": "pod_throttling_results.pdf"},
+    {"metric": "pod_memory_working_set", "ylabel": "Pod Working Set (bytes)", "file": "pod_memory_results.pdf"},
+    {"metric": "checkpoint_duration_p99", "ylabel": "Checkpoint p99 (ms)", "file": "checkpoint_p99_results.pdf"},
+    {"metric": "checkpoint_bytes", "ylabel": "Bytes to Checkpoint Storage", "file": "checkpoint_bytes_results.pdf"},
+    {"metric": "checkpoint_state_size", "ylabel": "State Size (bytes)", "file": "checkpoint_state_results.pdf"},
+    {"kind": "checkpoint_timeline", "metric": "duration_ms", "ylabel": "Checkpoint Duration (ms)",
+     "file": "checkpoint_timelines.pdf"},
+]
+
+# Rates shown per app (all rates when an app is not listed)
+RATE_FILTER = {
+    "WindowJoin": [50, 100, 200, 500, 1000],
+}
+
+
+def select_rates(combined_df):
+    keep = pd.Series(True, index=combined_df.index)
+    for app, rates in RATE_FILTER.items():
+        keep &= (combined_df['app'] != app) | combined_df['rate'].isin(rates)
+    return combined_df[keep].sort_values(by=['app', 'rate', 'config'])
+
+def plot_inputs(spec, combined_df):
+    """
+    Returns: the slice of the results a figure is drawn from (None when the
+    results have no such metric)
+    """
+    if spec.get('kind') == 'checkpoint_timeline':
+        top = combined_df[combined_df['rate'] == combined_df.groupby('app', observed=True)['rate'].transform('max')]
+        data = results_store.load_checkpoints(run_id=list(top['run_id']))
+        if data.empty:
+            return None
+        data['seconds'] = (data['time'] - data['time_start']).dt.total_seconds()
+        data = data[['app', 'rate', 'config', 'run_id', 'seconds', spec['metric']]]
+    elif spec.get('kind') == 'latency_curve':
+        columns = {f"{spec['metric']}_{q}": q for q in spec['quantiles'] if f"{spec['metric']}_{q}" in combined_df}
+        if not columns:
+            return None
+        data = combined_df[['app', 'rate', 'config', *columns]].melt(
+            id_vars=['app', 'rate', 'config'], var_name='quantile', value_name=spec['metric'])
+        data = data.assign(quantile=data['quantile'].map(columns)).dropna(subset=[spec['metric']])
+    elif spec['metric'] in combined_df:
+        if spec.get('rate_of_counter'):
+            combined_df = combined_df[combined_df['source'] == results_store.SOURCE_INFLUX]
+        data = combined_df[['app', 'rate', 'config', spec['metric']]]
+        if data.empty:
+            return None
     else:
-        hasLegend = True
+        return None
+    return data.assign(app=data['app'].astype(str), config=data['config'].astype(str))
+
+def config_order(data):
+    configs = set(data['config'])
+    return [c for c in HUE_ORDER if c in configs] + sorted(configs - set(HUE_ORDER))
+
+def input_hash(spec, data):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(spec, sort_keys=True).encode())
+    digest.update(data.to_csv(index=False).encode())
+    # Changing how figures are drawn invalidates them too
+    with open(os.path.abspath(__file__), "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+def draw_bars(spec, app_data, ax, hue_order):
     s = sns.barplot(
         data=app_data,
-        x='input',
-        y='jvm_cpu_time',
+        x='rate',
+        y=spec['metric'],
         hue='config',
-        ax=ax[idx],
-        ci=None,
+        ax=ax,
+        # Bootstrap interval over a cell's repeated runs (none for a single run)
+        errorbar=('ci', repeat_analysis.CI_LEVEL),
+        n_boot=repeat_analysis.BOOTSTRAP_SAMPLES,
+        seed=repeat_analysis.SEED,
+        err_kws={'linewidth': 0.8},
+        capsize=0.15,
         palette='husl',
         edgecolor='black',
-        width=0.8, 
+        width=0.8,
         hue_order=hue_order,
-        # legend=hasLegend,
     )
-    
-    if hasLegend:
-        s.legend(title='Config', fontsize=7, title_fontsize=8)
-    else:
-        s.get_legend().remove()
-
-    s.tick_params(axis='both', labelsize=7)
-    s.set_title(app, fontsize=8)
     s.set_xlabel('In Rate', fontsize=7)
-    s.set_ylabel('JVM CPU time (ns)', fontsize=7)
-
-plt.subplots_adjust(
-    top=0.8, 
-    bottom=0.24, 
-    left=0.12, 
-    right=0.98, 
-    hspace=0.3, 
-    wspace=0.35
-)
-plt.savefig("plots/jvm_cpu_time_results.pdf")
+    return s
 
-fig, ax = plt.subplots(1, 2, figsize=(7, 3))
-for idx, app in enumerate(combined_df['app'].unique()):
-    app_data = combined_df[combined_df['app'] == app]
-    if idx ==0:
-        hasLegend = False
-    else:
-        hasLegend = True
-    s = sns.barplot(
+def draw_latency(spec, app_data, ax, hue_order):
+    s = sns.lineplot(
         data=app_data,
-        x='input',
-        y='jvm_gc_time',
+        x='rate',
+        y=spec['metric'],
         hue='config',
-        ax=ax[idx],
-        ci=None,
+        style='quantile',
+        style_order=spec['quantiles'],
+        ax=ax,
+        errorbar=('ci', repeat_analysis.CI_LEVEL),
+        n_boot=repeat_analysis.BOOTSTRAP_SAMPLES,
+        seed=repeat_analysis.SEED,
+        err_style='bars',
+        err_kws={'linewidth': 0.8},
         palette='husl',
-        edgecolor='black',
-        width=0.8, 
+        markers=True,
+        markersize=4,
+        linewidth=0.8,
         hue_order=hue_order,
-        # legend=hasLegend,
     )
-    
-    if hasLegend:
-        s.legend(title='Config', fontsize=7, title_fontsize=8)
-    else:
-        s.get_legend().remove()
-
-    s.tick_params(axis='both', labelsize=7)
-    s.set_title(app, fontsize=8)
+    s.set_xscale('log')
+    s.set_yscale('log')
     s.set_xlabel('In Rate', fontsize=7)
-    s.set_ylabel('JVM GC Time', fontsize=7)
-
-plt.subplots_adjust(
-    top=0.8, 
-    bottom=0.24, 
-    left=0.12, 
-    right=0.98, 
-    hspace=0.3, 
-    wspace=0.35
-)
-plt.savefig("plots/jvm_gc_time_results.pdf")
+    return s
 
-fig, ax = plt.subplots(1, 2, figsize=(7, 3))
-for idx, app in enumerate(combined_df['app'].unique()):
-    app_data = combined_df[combined_df['app'] == app]
-    if idx ==0:
-        hasLegend = False
-    else:
-        hasLegend = True
-    s = sns.barplot(
+def draw_timeline(spec, app_data, ax, hue_order):
+    s = sns.lineplot(
         data=app_data,
-        x='input',
-        y='jvm_heap_used',
+        x='seconds',
+        y=spec['metric'],
         hue='config',
-        ax=ax[idx],
-        ci=None,
+        units='run_id',
+        estimator=None,
+        ax=ax,
         palette='husl',
-        edgecolor='black',
-        width=0.8, 
+        marker='o',
+        markersize=3,
+        linewidth=0.8,
         hue_order=hue_order,
-        # legend=hasLegend,
     )
-    
-    if hasLegend:
-        s.legend(title='Config', fontsize=7, title_fontsize=8)
-    else:
-        s.get_legend().remove()
-
-    s.tick_params(axis='both', labelsize=7)
-    s.set_title(app, fontsize=8)
-    s.set_xlabel('In Rate', fontsize=7)
-    s.set_ylabel('JVM Heap (bytes)', fontsize=7)
-
-plt.subplots_adjust(
-    top=0.8, 
-    bottom=0.24, 
-    left=0.12, 
-    right=0.98, 
-    hspace=0.3, 
-    wspace=0.35
-)
-plt.savefig("plots/jvm_heap_results.pdf")
-
-fig, ax = plt.subplots(1, 2, figsize=(7, 3))
-for idx, app in enumerate(combined_df['app'].unique()):
-    app_data = combined_df[combined_df['app'] == app]
-    if idx ==0:
-        hasLegend = False
-    else:
-        hasLegend = True
-    s = sns.barplot(
-        data=app_data,
-        x='input',
-        y='jvm_threads',
-        hue='config',
-        ax=ax[idx],
-        ci=None,
-        palette='husl',
-        edgecolor='black',
-        width=0.8, 
-        hue_order=hue_order,
-        # legend=hasLegend,
+    s.set_xlabel(f"Seconds into Run (rate {app_data['rate'].iloc[0]})", fontsize=7)
+    return s
+
+def render(spec, data):
+    draw = {'checkpoint_timeline': draw_timeline, 'latency_curve': draw_latency}.get(spec.get('kind'), draw_bars)
+    hue_order = config_order(data)
+    apps = list(dict.fromkeys(data['app']))
+    fig, ax = plt.subplots(1, len(apps), figsize=(3.5 * len(apps), 3), squeeze=False)
+    for idx, app in enumerate(apps):
+        app_data = data[data['app'] == app]
+        hasLegend = idx == len(apps) - 1
+        s = draw(spec, app_data, ax[0][idx], hue_order)
+
+        if hasLegend:
+            s.legend(title='Config', fontsize=7, title_fontsize=8)
+        else:
+            s.get_legend().remove()
+
+        s.tick_params(axis='both', labelsize=7)
+        s.set_title(app, fontsize=8)
+        s.set_ylabel(spec['ylabel'], fontsize=7)
+
+    plt.subplots_adjust(
+        top=0.8,
+        bottom=0.24,
+        left=0.12,
+        right=0.98,
+        hspace=0.3,
+        wspace=0.35
     )
-    
-    if hasLegend:
-        s.legend(title='Config', fontsize=7, title_fontsize=8)
-    else:
-        s.get_legend().remove()
-
-    s.tick_params(axis='both', labelsize=7)
-    s.set_title(app, fontsize=8)
-    s.set_xlabel('In Rate', fontsize=7)
-    s.set_ylabel('Avg. Live JVM Threads', fontsize=7)
-
-plt.subplots_adjust(
-    top=0.8, 
-    bottom=0.24, 
-    left=0.12, 
-    right=0.98, 
-    hspace=0.3, 
-    wspace=0.35
-)
-plt.savefig("plots/jvm_threads_results.pdf")
-
-
-fig, ax = plt.subplots(1, 2, figsize=(7, 3))
-for idx, app in enumerate(combined_df['app'].unique()):
-    app_data = combined_df[combined_df['app'] == app]
-    if idx ==0:
-        hasLegend = False
-    else:
-        hasLegend = True
-    s = sns.barplot(
-        data=app_data,
-        x='input',
-        y='shuffle_netty_used_segments',
-        hue='config',
-        ax=ax[idx],
-        ci=None,
-        palette='husl',
-        edgecolor='black',
-        width=0.8, 
-        hue_order=hue_order,
-        # legend=hasLegend,
-    )
-    
-    if hasLegend:
-        s.legend(title='Config', fontsize=7, title_fontsize=8)
-    else:
-        s.get_legend().remove()
-
-    s.tick_params(axis='both', labelsize=7)
-    s.set_title(app, fontsize=8)
-    s.set_xlabel('In Rate', fontsize=7)
-    s.set_ylabel('Shuffle Netty Used Segments', fontsize=7)
-
-plt.subplots_adjust(
-    top=0.8, 
-    bottom=0.24, 
-    left=0.12, 
-    right=0.98, 
-    hspace=0.3, 
-    wspace=0.35
-)
-plt.savefig("plots/shuffle_segments_results.pdf")
-
-
-fig, ax = plt.subplots(1, 2, figsize=(7, 3))
-for idx, app in enumerate(combined_df['app'].unique()):
-    app_data = combined_df[combined_df['app'] == app]
-    if idx ==0:
-        hasLegend = False
-    else:
-        hasLegend = True
-    s = sns.barplot(
-        data=app_data,
-        x='input',
-        y='remote_bytes_per_sec',
-        hue='config',
-        ax=ax[idx],
-        ci=None,
-        palette='husl',
-        edgecolor='black',
-        width=0.8, 
-        hue_order=hue_order,
-        # legend=hasLegend,
-    )
-    
-    if hasLegend:
-        s.legend(title='Config', fontsize=7, title_fontsize=8)
-    else:
-        s.get_legend().remove()
-
-    s.tick_params(axis='both', labelsize=7)
-    s.set_title(app, fontsize=8)
-    s.set_xlabel('In Rate', fontsize=7)
-    s.set_ylabel('Bytes from Remote', fontsize=7)
-
-plt.subplots_adjust(
-    top=0.8, 
-    bottom=0.24, 
-    left=0.12, 
-    right=0.98, 
-    hspace=0.3, 
-    wspace=0.35
-)
-plt.savefig("plots/remote_bytes_results.pdf")
-
-# remove the combined CSV file
-if os.path.exists("combined_results.csv"):
-    os.remove("combined_results.csv")
\ No newline at end of file
+    fig.savefig(os.path.join(PLOT_DIR, spec['file']))
+    plt.close(fig)
+    return spec['file']
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH) as f:
+        return json.load(f)
+
+def main():
+    combined_df = select_rates(results_store.load())
+    print(f"Loaded {len(combined_df)} runs from {results_store.STORE_PATH}")
+    print(combined_df[['rate', 'app', 'config']].drop_duplicates())
+
+    os.makedirs(PLOT_DIR, exist_ok=True)
+    manifest = load_manifest()
+    jobs = []
+    for spec in PLOTS:
+        data = plot_inputs(spec, combined_df)
+        if data is None:
+            print(f"No {spec['metric']} in the results, skipping {spec['file']}")
+            continue
+        digest = input_hash(spec, data)
+        path = os.path.join(PLOT_DIR, spec['file'])
+        if manifest.get(spec['file']) == digest and os.path.exists(path):
+            print(f"Up to date: {path}")
+            continue
+        jobs.append((spec, data, digest))
+
+    with ProcessPoolExecutor() as pool:
+        futures = [(pool.submit(render, spec, data), digest) for spec, data, digest in jobs]
+        for future, digest in futures:
+            file = future.result()
+            manifest[file] = digest
+            print(f"Rendered: {os.path.join(PLOT_DIR, file)}")
+
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+if __name__ == "__main__":
+    main()
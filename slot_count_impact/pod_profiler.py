@@ -0,0 +1,207 @@
+"""
+Samples cgroup-level resource usage of the TaskManager pods of running
+deployments (cAdvisor metrics, as exposed by every kubelet) and writes it
+to the same InfluxDB database as the Flink metrics. Points are tagged with
+deployment=<name> and tm_id=<pod name> (the TaskManager resource id under
+Flink's native Kubernetes integration), so get_metrics.py aggregates and
+breaks them down exactly like the reporter's series.
+
+By default every node's kubelet is scraped through the cluster backend
+(`kubectl get --raw`, see backends.py). Set PROFILER_ENDPOINT to scrape one Prometheus text
+endpoint instead, e.g. a cAdvisor DaemonSet or the stand-in served by
+`python pod_profiler.py serve <canned metrics file> [port]`.
+"""
+import os
+import re
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import backends
+
+PROFILER_ENDPOINT = os.environ.get("PROFILER_ENDPOINT")
+SAMPLE_SECONDS = 5
+STANDIN_PORT = 8766
+
+# Container of the Flink process in the TaskManager pods
+FLINK_CONTAINER = "flink-main-container"
+
+# cAdvisor series -> measurement written. Network counters are per pod
+# (reported on the pause container), everything else per Flink container.
+CADVISOR_SERIES = {
+    "container_cpu_usage_seconds_total": "k8s_pod_cpu_usage_seconds",
+    "container_cpu_cfs_periods_total": "k8s_pod_cpu_cfs_periods",
+    "container_cpu_cfs_throttled_periods_total": "k8s_pod_cpu_cfs_throttled_periods",
+    "container_memory_working_set_bytes": "k8s_pod_memory_working_set_bytes",
+    "container_network_receive_bytes_total": "k8s_pod_network_receive_bytes",
+    "container_network_transmit_bytes_total": "k8s_pod_network_transmit_bytes",
+}
+POD_LEVEL_SERIES = {"container_network_receive_bytes_total", "container_network_transmit_bytes_total"}
+
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)(?:\s+(\d+))?$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_exposition(text):
+    """
+    Parses the Prometheus text exposition format.
+    Yields: (metric name, labels dict, value)
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE_LINE.match(line)
+        if not match:
+            continue
+        name, labels, value, _ = match.groups()
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        yield name, dict(LABEL.findall(labels or "")), value
+
+def pod_samples(text, pods):
+    """
+    Picks the CADVISOR_SERIES of the given pods out of a scrape.
+    pods: pod name -> deployment name
+    Returns: dict of (measurement, pod) -> value
+    """
+    samples = {}
+    for name, labels, value in parse_exposition(text):
+        measurement = CADVISOR_SERIES.get(name)
+        pod = labels.get("pod") or labels.get("pod_name")
+        if measurement is None or pod not in pods:
+            continue
+        if name in POD_LEVEL_SERIES:
+            # One series per interface: sum them
+            if labels.get("container") not in ("", "POD", None):
+                continue
+            samples[(measurement, pod)] = samples.get((measurement, pod), 0.0) + value
+        elif labels.get("container", labels.get("container_name")) == FLINK_CONTAINER:
+            samples[(measurement, pod)] = value
+    return samples
+
+def endpoint_scrapes(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        yield response.read().decode()
+
+
+class PodProfiler:
+    """
+    Periodically scrapes the resource usage of the TaskManager pods of the
+    deployments being measured and writes it to InfluxDB.
+    """
+
+    def __init__(self, endpoint=PROFILER_ENDPOINT, interval=SAMPLE_SECONDS):
+        self.endpoint = endpoint
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.deployments = {}
+
+    def watch(self, name, namespace=None):
+        with self.lock:
+            self.deployments[name] = namespace
+
+    def unwatch(self, name):
+        with self.lock:
+            self.deployments.pop(name, None)
+
+    def scrapes(self):
+        if self.endpoint:
+            return endpoint_scrapes(self.endpoint)
+        return backends.cluster.cadvisor_scrapes()
+
+    def sample(self, client):
+        """
+        Takes one sample of every watched deployment. All points of a sample
+        share its timestamp, so per-second sums across pods line up.
+        Returns: number of points written
+        """
+        with self.lock:
+            deployments = dict(self.deployments)
+        if not deployments:
+            return 0
+        pods = {}
+        for name, namespace in deployments.items():
+            for pod in backends.cluster.taskmanager_pods(name, namespace):
+                pods[pod] = name
+
+        now = int(backends.clock.now() * 1000)
+        points = []
+        for text in self.scrapes():
+            for (measurement, pod), value in pod_samples(text, pods).items():
+                points.append({
+                    "measurement": measurement,
+                    "tags": {"deployment": pods[pod], "tm_id": pod},
+                    "time": now,
+                    "fields": {"value": value},
+                })
+        if points:
+            client.write_points(points, time_precision="ms")
+        return len(points)
+
+    def run(self, client):
+        def loop():
+            while True:
+                try:
+                    self.sample(client)
+                except Exception as e:
+                    print(f"⚠️ Failed to sample pod resources: {e}")
+                backends.clock.sleep(self.interval)
+
+        threading.Thread(target=loop, daemon=True).start()
+
+
+def serve_canned(path, port=STANDIN_PORT):
+    """
+    Stand-in metrics endpoint serving a canned exposition file at /metrics.
+    Counters (names ending in _total) advance at their canned value per
+    second since the server started, so they yield constant rates.
+    """
+    with open(path) as f:
+        canned = f.read()
+    started = time.time()
+
+    def render():
+        elapsed = time.time() - started
+        lines = []
+        for line in canned.splitlines():
+            match = SAMPLE_LINE.match(line.strip())
+            if match and match.group(1).endswith("_total"):
+                value = float(match.group(3)) * elapsed
+                labels = f"{{{match.group(2)}}}" if match.group(2) is not None else ""
+                line = f"{match.group(1)}{labels} {value}"
+            lines.append(line)
+        return "\n".join(lines) + "\n"
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "serve":
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else STANDIN_PORT
+        serve_canned(sys.argv[2], port)
+        print(f"Serving {sys.argv[2]} on http://0.0.0.0:{port}/metrics")
+        threading.Event().wait()
+    else:
+        print("Usage: python pod_profiler.py serve <canned metrics file> [port]")
@@ -0,0 +1,137 @@
+import json
+import queue
+import subprocess
+import threading
+import time
+
+
+def pod_ready(pod):
+    status = pod.get("status", {})
+    if status.get("phase") != "Running":
+        return False
+    return any(
+        c.get("type") == "Ready" and c.get("status") == "True"
+        for c in status.get("conditions", [])
+    )
+
+def deployment_state(deployment):
+    """
+    Returns: (JobManager deployment status, job state) of a FlinkDeployment
+    """
+    status = deployment.get("status", {})
+    return status.get("jobManagerDeploymentStatus"), status.get("jobStatus", {}).get("state")
+
+def parse_json_stream(lines):
+    """
+    Decodes the concatenated (pretty-printed) JSON objects that
+    `kubectl get -w -o json` writes, yielding each as soon as it is complete.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    for line in lines:
+        buffer += line
+        # An object can only be complete on a line closing a brace
+        if not line.rstrip().endswith("}"):
+            continue
+        while True:
+            buffer = buffer.lstrip()
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break
+            buffer = buffer[end:]
+            yield obj
+
+def start_watch(kubectl, args, namespace, events):
+    """
+    Starts `kubectl get <args> -w -o json --output-watch-events` and forwards
+    its watch events into the events queue from a reader thread.
+    Returns: the kubectl process
+    """
+    command = [kubectl, "get", *args, "-w", "-o", "json", "--output-watch-events"]
+    if namespace:
+        command += ["-n", namespace]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+
+    def read():
+        for event in parse_json_stream(process.stdout):
+            events.put(event)
+
+    threading.Thread(target=read, daemon=True).start()
+    return process
+
+def drain(events, deadline):
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            yield events.get(timeout=remaining)
+        except queue.Empty:
+            return
+
+def replay_events(path):
+    """
+    Reads a recorded watch stream (one event per line, as written by
+    record_events) to stand in for a live cluster.
+    """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def record_events(events, path):
+    with open(path, "a") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+            yield event
+
+def wait_until_ready(kubectl, name, replicas, namespace=None, timeout=300, events=None, spec_applied=None):
+    """
+    Waits until `replicas` TaskManager pods of the FlinkDeployment are Ready,
+    its JobManager is READY and its job is RUNNING, reacting to watch events
+    as they arrive. By default the pod and FlinkDeployment streams come from
+    kubectl; a recorded stream can be passed as events instead.
+    spec_applied: optional predicate on the FlinkDeployment that must also
+    hold, e.g. that an in-place spec change has been reconciled.
+    Returns: True when ready, False on timeout or end of the stream
+    """
+    processes = []
+    if events is None:
+        live = queue.Queue()
+        processes = [
+            start_watch(kubectl, ["pods", "-l", f"component=taskmanager,app={name}"], namespace, live),
+            start_watch(kubectl, ["flinkdeployment", name], namespace, live),
+        ]
+        events = drain(live, time.monotonic() + timeout)
+
+    pods = {}
+    state = (None, None)
+    applied = spec_applied is None
+    started = time.monotonic()
+    try:
+        for event in events:
+            obj = event.get("object", {})
+            kind = obj.get("kind")
+            if kind == "Pod":
+                pod_name = obj["metadata"]["name"]
+                if event.get("type") == "DELETED":
+                    pods.pop(pod_name, None)
+                else:
+                    pods[pod_name] = pod_ready(obj)
+            elif kind == "FlinkDeployment":
+                new_state = deployment_state(obj)
+                if new_state != state:
+                    print(f"  {name}: JobManager {new_state[0]}, job {new_state[1]} "
+                          f"(+{time.monotonic() - started:.1f}s)")
+                    state = new_state
+                if spec_applied is not None:
+                    applied = spec_applied(obj)
+
+            if sum(pods.values()) >= replicas and state == ("READY", "RUNNING") and applied:
+                return True
+        return False
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
@@ -0,0 +1,125 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import results_store
+
+# Repeated runs of a cell (see the runner's --repeats) are summarized with
+# bootstrap confidence intervals, and every pair of configs is compared at
+# each app and rate with a permutation test. With 3 runs per config the
+# smallest possible p-value is 0.1, so use at least 4 repeats to reach ALPHA.
+BOOTSTRAP_SAMPLES = 10000
+PERMUTATIONS = 10000
+CI_LEVEL = 95
+ALPHA = 0.05
+SEED = 0
+
+COMPARE_METRICS = ["throughput", "latency_p50", "latency_p99", "cpu_ns_per_record", "gc_ms_per_1k_records",
+                   "jvm_heap_used"]
+
+CELLS_PATH = "logs/repeats.csv"
+COMPARISONS_PATH = "logs/comparisons.csv"
+
+
+def bootstrap_means(values, rng, samples=BOOTSTRAP_SAMPLES):
+    """
+    Returns: the means of `samples` resamples (with replacement) of values
+    """
+    idx = rng.integers(0, len(values), size=(samples, len(values)))
+    return values[idx].mean(axis=1)
+
+def bootstrap_ci(values, rng, samples=BOOTSTRAP_SAMPLES, level=CI_LEVEL):
+    """
+    Returns: (low, high) percentile bootstrap interval of the mean, or
+    (None, None) with fewer than two runs
+    """
+    if len(values) < 2:
+        return None, None
+    means = bootstrap_means(values, rng, samples)
+    tail = (100 - level) / 2
+    low, high = np.percentile(means, [tail, 100 - tail])
+    return float(low), float(high)
+
+def permutation_p_value(a, b, rng, permutations=PERMUTATIONS):
+    """
+    Two-sided permutation test of the difference in means of a and b, all
+    permutations drawn at once.
+    """
+    pooled = np.concatenate([a, b])
+    observed = abs(a.mean() - b.mean())
+    order = np.argsort(rng.random((permutations, len(pooled))), axis=1)
+    shuffled = pooled[order]
+    diffs = np.abs(shuffled[:, :len(a)].mean(axis=1) - shuffled[:, len(a):].mean(axis=1))
+    # Counting the observed split keeps the p-value above zero
+    return float((np.sum(diffs >= observed - 1e-12) + 1) / (permutations + 1))
+
+def summarize_cells(runs, metrics=COMPARE_METRICS, seed=SEED):
+    """
+    Returns: one row per (app, config, rate, metric) with the mean over the
+    cell's runs, its bootstrap interval and the number of runs
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for (app, config, rate), cell in runs.groupby(["app", "config", "rate"], observed=True, sort=True):
+        for metric in metrics:
+            if metric not in cell:
+                continue
+            values = cell[metric].dropna().to_numpy()
+            if not len(values):
+                continue
+            low, high = bootstrap_ci(values, rng)
+            rows.append({"app": app, "config": config, "rate": rate, "metric": metric,
+                         "mean": values.mean(), "ci_low": low, "ci_high": high, "runs": len(values)})
+    return pd.DataFrame(rows)
+
+def compare_configs(runs, metrics=COMPARE_METRICS, seed=SEED):
+    """
+    Compares every pair of configs at each app and rate. A difference is
+    flagged as within noise when either side has fewer than two runs, the
+    bootstrap interval of the difference covers zero, or the permutation
+    test is not significant at ALPHA.
+    Returns: one row per (app, rate, metric, config pair)
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for (app, rate), group in runs.groupby(["app", "rate"], observed=True, sort=True):
+        by_config = {config: cell for config, cell in group.groupby("config", observed=True)}
+        for (config_a, cell_a), (config_b, cell_b) in itertools.combinations(sorted(by_config.items()), 2):
+            for metric in metrics:
+                if metric not in group:
+                    continue
+                a = cell_a[metric].dropna().to_numpy()
+                b = cell_b[metric].dropna().to_numpy()
+                if not len(a) or not len(b):
+                    continue
+                row = {"app": app, "rate": rate, "metric": metric, "config_a": config_a, "config_b": config_b,
+                       "mean_a": a.mean(), "mean_b": b.mean(), "diff": a.mean() - b.mean(),
+                       "runs_a": len(a), "runs_b": len(b),
+                       "diff_ci_low": None, "diff_ci_high": None, "p_value": None}
+                if len(a) >= 2 and len(b) >= 2:
+                    diffs = bootstrap_means(a, rng) - bootstrap_means(b, rng)
+                    tail = (100 - CI_LEVEL) / 2
+                    row["diff_ci_low"], row["diff_ci_high"] = np.percentile(diffs, [tail, 100 - tail])
+                    row["p_value"] = permutation_p_value(a, b, rng)
+                row["within_noise"] = row["p_value"] is None or row["p_value"] >= ALPHA \
+                    or row["diff_ci_low"] <= 0 <= row["diff_ci_high"]
+                rows.append(row)
+    return pd.DataFrame(rows)
+
+def main():
+    runs = results_store.load()
+    cells = summarize_cells(runs)
+    comparisons = compare_configs(runs)
+    cells.to_csv(CELLS_PATH, index=False)
+    comparisons.to_csv(COMPARISONS_PATH, index=False)
+
+    for _, c in comparisons.iterrows():
+        verdict = "within noise" if c["within_noise"] else f"significant (p={c['p_value']:.4f})"
+        print(f"{'⚖️' if c['within_noise'] else '✅'} {c['app']} @ {c['rate']} {c['metric']}: "
+              f"{c['config_a']} {c['mean_a']:.2f} vs {c['config_b']} {c['mean_b']:.2f} "
+              f"({c['runs_a']} vs {c['runs_b']} runs) -> {verdict}")
+    print(f"📄 {CELLS_PATH}, {COMPARISONS_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+import glob
+import os
+import re
+import sqlite3
+import sys
+
+import pandas as pd
+
+import aggregation
+import experiment
+
+# Single results store for every extracted run (replaces the per-cell
+# *_results.csv files). Runs are keyed by run_id and indexed by cell;
+# metrics are stored long so new metrics and stats need no migration.
+STORE_PATH = "logs/results.db"
+SCHEMA_VERSION = 5
+
+# Where a run's values came from (the runs.source column): extracted from
+# InfluxDB by get_metrics.py, or imported from the per-cell CSVs, which hold
+# the JVM CPU/GC time as cumulative counters rather than rates. Runs stored
+# before the column existed have no source.
+SOURCE_INFLUX = "influxdb"
+SOURCE_CSV = "csv"
+
+# Per-second series of each run broken down by TaskManager, one Parquet file
+# per run (too many points to keep in the store itself)
+SERIES_DIR = "logs/tm_series/"
+
+SCHEMA = """
+CREATE TABLE runs (
+    run_id TEXT PRIMARY KEY,
+    app TEXT NOT NULL,
+    config TEXT NOT NULL,
+    rate INTEGER NOT NULL,
+    num_tms INTEGER,
+    slots_per_tm INTEGER,
+    deployment TEXT,
+    time_start TEXT NOT NULL,
+    time_end TEXT NOT NULL
+);
+CREATE INDEX runs_cell ON runs (app, config, rate, run_id);
+CREATE TABLE run_metrics (
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    metric TEXT NOT NULL,
+    stat TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, metric, stat)
+) WITHOUT ROWID;
+"""
+
+# Statements upgrading a store from version N to N + 1
+MIGRATIONS = {
+    1: """
+CREATE TABLE run_breakdowns (
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    metric TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    stat TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, metric, scope, group_key, stat)
+) WITHOUT ROWID;
+""",
+    2: """
+ALTER TABLE runs ADD COLUMN checkpoint_interval TEXT;
+ALTER TABLE runs ADD COLUMN state_backend TEXT;
+CREATE TABLE run_checkpoints (
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    checkpoint INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    duration_ms REAL,
+    size_bytes REAL,
+    full_size_bytes REAL,
+    PRIMARY KEY (run_id, checkpoint, time)
+) WITHOUT ROWID;
+""",
+    3: """
+ALTER TABLE runs ADD COLUMN total_slots INTEGER;
+ALTER TABLE runs ADD COLUMN parallelism INTEGER;
+ALTER TABLE runs ADD COLUMN tm_cpu REAL;
+ALTER TABLE runs ADD COLUMN tm_memory_mb REAL;
+UPDATE runs SET total_slots = num_tms * slots_per_tm;
+""",
+    4: """
+ALTER TABLE runs ADD COLUMN source TEXT;
+""",
+}
+
+RUN_COLUMNS = ["run_id", "app", "config", "rate", "num_tms", "slots_per_tm", "deployment", "time_start", "time_end",
+               "checkpoint_interval", "state_backend", "total_slots", "parallelism", "tm_cpu", "tm_memory_mb",
+               "source"]
+
+
+def connect(path=STORE_PATH):
+    """
+    Opens the store, creating it on first use and migrating older versions.
+    Raises: RuntimeError when the store was written by a newer schema version
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        conn.close()
+        raise RuntimeError(f"{path} has schema version {version}, expected at most {SCHEMA_VERSION}")
+    if version == 0:
+        conn.executescript(SCHEMA)
+        version = 1
+    while version < SCHEMA_VERSION:
+        conn.executescript(MIGRATIONS[version])
+        version += 1
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+    return conn
+
+def run_id(app, config, rate, time_start):
+    return f"{app}/{config}/{rate}/{time_start}"
+
+def series_path(rid, series_dir=SERIES_DIR):
+    return os.path.join(series_dir, re.sub(r"[^\w.-]", "_", rid) + ".parquet")
+
+def write_series(rid, frame, series_dir=SERIES_DIR):
+    """
+    frame: per-second values with columns metric, tm_id, second, value
+    """
+    os.makedirs(series_dir, exist_ok=True)
+    frame = frame.astype({"metric": "category", "tm_id": "category"})
+    frame.to_parquet(series_path(rid, series_dir), index=False, compression="zstd")
+
+def load_series(rid, series_dir=SERIES_DIR):
+    return pd.read_parquet(series_path(rid, series_dir))
+
+def metric_rows(rid, values):
+    """
+    values: DataFrame indexed by metric label with one column per stat, as
+    returned by get_metrics.query_run_metrics ("value" is the window mean)
+    """
+    for metric_label, stats in values.iterrows():
+        for stat, value in stats.items():
+            yield rid, metric_label, stat, None if pd.isna(value) else float(value)
+
+def breakdown_rows(rid, scope, breakdown):
+    """
+    breakdown: DataFrame indexed by (metric, *group tags) with one column per stat
+    """
+    for key, stats in breakdown.iterrows():
+        metric_label, group = key[0], "/".join(str(k) for k in key[1:])
+        for stat, value in stats.items():
+            yield rid, metric_label, scope, group, stat, None if pd.isna(value) else float(value)
+
+def append(conn, runs):
+    """
+    Appends extracted runs in one transaction. Re-extracting a run window
+    replaces what was stored for it.
+    runs: iterable of (run, values, breakdowns, checkpoints) where run is a
+    dict of RUN_COLUMNS (without run_id), values is the metrics DataFrame of
+    the window, breakdowns maps a scope (e.g. "tm") to its per-group
+    DataFrame and checkpoints is the window's checkpoint timeline (or None)
+    """
+    with conn:
+        for run, values, breakdowns, checkpoints in runs:
+            rid = run_id(run["app"], run["config"], run["rate"], run["time_start"])
+            conn.execute(
+                f"INSERT OR REPLACE INTO runs ({', '.join(RUN_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(RUN_COLUMNS))})",
+                [rid] + [run.get(c) for c in RUN_COLUMNS[1:]]
+            )
+            conn.execute("DELETE FROM run_metrics WHERE run_id = ?", (rid,))
+            conn.executemany("INSERT INTO run_metrics VALUES (?, ?, ?, ?)", metric_rows(rid, values))
+            conn.execute("DELETE FROM run_breakdowns WHERE run_id = ?", (rid,))
+            for scope, breakdown in breakdowns.items():
+                conn.executemany("INSERT INTO run_breakdowns VALUES (?, ?, ?, ?, ?, ?)",
+                                 breakdown_rows(rid, scope, breakdown))
+            conn.execute("DELETE FROM run_checkpoints WHERE run_id = ?", (rid,))
+            if checkpoints is not None:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO run_checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+                    ((rid, int(c.checkpoint), int(c.time), *(None if pd.isna(v) else float(v)
+                      for v in (c.duration_ms, c.size_bytes, c.full_size_bytes)))
+                     for c in checkpoints.itertuples())
+                )
+
+def filter_clause(filters):
+    where, params = [], []
+    for column, wanted in filters.items():
+        if column not in RUN_COLUMNS:
+            raise ValueError(f"Cannot filter on {column}")
+        wanted = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+        where.append(f"{column} IN ({', '.join('?' * len(wanted))})")
+        params += list(wanted)
+    clause = f" WHERE {' AND '.join(where)}" if where else ""
+    return clause, params
+
+def typed_runs(runs):
+    runs = runs.astype({"app": "category", "config": "category", "rate": "int64",
+                        "num_tms": "Int64", "slots_per_tm": "Int64", "total_slots": "Int64",
+                        "parallelism": "Int64", "tm_cpu": "float64", "tm_memory_mb": "float64"})
+    runs["time_start"] = pd.to_datetime(runs["time_start"], utc=True, format="ISO8601")
+    runs["time_end"] = pd.to_datetime(runs["time_end"], utc=True, format="ISO8601")
+    return runs
+
+def load(path=STORE_PATH, **filters):
+    """
+    Loads runs with their metrics as one typed frame: one row per run, a
+    column per metric (its window mean) and per metric_stat.
+    filters: app/config/rate/run_id -> value or list of values
+    """
+    clause, params = filter_clause(filters)
+    conn = connect(path)
+    try:
+        runs = pd.read_sql_query(f"SELECT * FROM runs{clause} ORDER BY app, config, rate, run_id", conn, params=params)
+        metrics = pd.read_sql_query(
+            f"SELECT run_id, metric, stat, value FROM run_metrics WHERE run_id IN (SELECT run_id FROM runs{clause})",
+            conn, params=params
+        )
+    finally:
+        conn.close()
+
+    metrics["column"] = metrics["metric"].where(metrics["stat"] == "value", metrics["metric"] + "_" + metrics["stat"])
+    wide = metrics.pivot(index="run_id", columns="column", values="value")
+    wide.columns.name = None
+
+    return typed_runs(runs).join(wide.astype("float64"), on="run_id")
+
+def load_breakdowns(path=STORE_PATH, scope="tm", **filters):
+    """
+    Loads the per-group statistics of one breakdown scope: one row per run,
+    metric and group, with the run's cell columns and a column per stat.
+    filters: app/config/rate/run_id -> value or list of values
+    """
+    clause, params = filter_clause(filters)
+    conn = connect(path)
+    try:
+        runs = pd.read_sql_query(f"SELECT * FROM runs{clause}", conn, params=params)
+        rows = pd.read_sql_query(
+            "SELECT run_id, metric, group_key, stat, value FROM run_breakdowns "
+            f"WHERE scope = ? AND run_id IN (SELECT run_id FROM runs{clause})",
+            conn, params=[scope] + params
+        )
+    finally:
+        conn.close()
+
+    wide = rows.pivot(index=["run_id", "metric", "group_key"], columns="stat", values="value")
+    wide.columns.name = None
+    wide = wide.reset_index()
+    return typed_runs(runs).merge(wide, on="run_id").sort_values(["app", "config", "rate", "run_id", "metric", "group_key"])
+
+def load_checkpoints(path=STORE_PATH, **filters):
+    """
+    Loads the checkpoint timelines of the matching runs: one row per
+    checkpoint with the run's cell columns.
+    filters: app/config/rate/run_id -> value or list of values
+    """
+    clause, params = filter_clause(filters)
+    conn = connect(path)
+    try:
+        runs = pd.read_sql_query(f"SELECT * FROM runs{clause}", conn, params=params)
+        checkpoints = pd.read_sql_query(
+            f"SELECT * FROM run_checkpoints WHERE run_id IN (SELECT run_id FROM runs{clause})",
+            conn, params=params
+        )
+    finally:
+        conn.close()
+    checkpoints["time"] = pd.to_datetime(checkpoints["time"], unit="ms", utc=True)
+    return typed_runs(runs).merge(checkpoints, on="run_id").sort_values(["app", "config", "rate", "run_id", "time"])
+
+def import_csvs(conn, log_dir):
+    """
+    Imports per-cell <app>_<config>_<rate>_results.csv files written before
+    the store existed.
+    Returns: number of runs imported
+    """
+    runs = []
+    for file in sorted(glob.glob(os.path.join(log_dir, "*_results.csv"))):
+        match = re.match(r'(.+?)_(.+?)_(.+?)_results\.csv', os.path.basename(file))
+        if not match:
+            print(f"Filename did not match expected pattern: {file}")
+            continue
+        app, config, rate = match.groups()
+        df = pd.read_csv(file)
+        for _, row in df.iterrows():
+            run = {"app": app, "config": config, "rate": int(rate.replace('k', '')),
+                   "time_start": row["time_start"], "time_end": row["time_end"], "source": SOURCE_CSV}
+            run.update(experiment.parse_config_label(config))
+            if run["num_tms"] is not None:
+                run["total_slots"] = run["num_tms"] * run["slots_per_tm"]
+            values = {}
+            for column, value in row.items():
+                if column in RUN_COLUMNS or column in ("input", "time_start", "time_end"):
+                    continue
+                metric, _, stat = column.rpartition("_")
+                if stat not in aggregation.STATS:
+                    metric, stat = column, "value"
+                values.setdefault(metric, {})[stat] = value
+            runs.append((run, pd.DataFrame.from_dict(values, orient="index"), {}, None))
+    append(conn, runs)
+    return len(runs)
+
+
+if __name__ == "__main__":
+    # python results_store.py import [log_dir]
+    if len(sys.argv) >= 2 and sys.argv[1] == "import":
+        conn = connect()
+        print(f"Imported {import_csvs(conn, sys.argv[2] if len(sys.argv) > 2 else 'logs/')} runs into {STORE_PATH}")
+        conn.close()
+    else:
+        print("Usage: python results_store.py import [log_dir]")
@@ -0,0 +1,136 @@
+import os
+
+import get_metrics
+import steady_state
+
+# A probe is sustainable when backpressure stays low and both the achieved
+# input and output rates keep scaling with the requested rate, relative to
+# the lowest non-backpressured probe
+MAX_BACKPRESSURE = 100.0  # ms per second
+LAG_TOLERANCE = 0.05
+
+# Step up by GROWTH until a probe is unsustainable, then bisect until the
+# knee is bracketed within RESOLUTION (relative) or MAX_PROBES are spent
+GROWTH = 2.0
+RESOLUTION = 0.1
+MAX_PROBES = 8
+
+RESULTS_PATH = "logs/saturation.csv"
+
+
+def keeps_up(probe, baseline):
+    """
+    Returns: whether the achieved input and output rates of a probe scale
+    with its requested rate ("rps") as they do at the baseline probe
+    """
+    for metric in ["input_rate", "throughput"]:
+        expected = baseline[metric] / baseline["rps"] * probe["rps"]
+        if probe[metric] < (1 - LAG_TOLERANCE) * expected:
+            return False
+    return True
+
+
+class SaturationSearch:
+    """
+    Finds the highest rate one benchmark sustains on one config. Rates are
+    drawn from rates() while record() feeds back each probe's outcome.
+    """
+
+    def __init__(self, benchmark, config, start_rate, max_probes=MAX_PROBES):
+        self.benchmark = benchmark
+        self.config = config
+        self.max_probes = max_probes
+        self.next_rate = start_rate
+        self.lo = None
+        self.hi = None
+        self.baseline = None
+        self.probes = []
+
+    def rates(self):
+        while self.next_rate is not None and len(self.probes) < self.max_probes:
+            yield self.next_rate
+
+    def sustainable(self, probe):
+        if probe["backpressure"] is None or probe["backpressure"] > MAX_BACKPRESSURE:
+            return False
+        return keeps_up(probe, self.baseline)
+
+    def record(self, rps, name, start, end, throughput, half_width):
+        if start is None:
+            # The deployment never became ready: count the rate as saturated,
+            # so the search moves on instead of drawing it again
+            self.probes.append({"rps": rps, "throughput": None, "input_rate": None, "backpressure": None,
+                                "throughput_ci": None, "sustainable": False})
+            print(f"🔎 {self.benchmark} {self.config['label']} @ {rps}: not ready -> saturated")
+            self.update(rps, False)
+            return
+        client = steady_state.influx_client()
+        try:
+            values = get_metrics.query_run_metrics(client, start, end, tags={"deployment": name})["value"]
+        finally:
+            client.close()
+        probe = {
+            "rps": rps,
+            "throughput": float(values["throughput"] or 0),
+            "input_rate": float(values["input_rate"] or 0),
+            "backpressure": values["backpressure"],
+            "throughput_ci": half_width,
+        }
+        # Calibrate records/s per unit of rate on the lowest healthy probe
+        healthy = probe["backpressure"] is not None and probe["backpressure"] <= MAX_BACKPRESSURE
+        if healthy and (self.baseline is None or rps < self.baseline["rps"]):
+            self.baseline = probe
+        probe["sustainable"] = self.baseline is not None and self.sustainable(probe)
+        self.probes.append(probe)
+        print(f"🔎 {self.benchmark} {self.config['label']} @ {rps}: throughput {probe['throughput']:.2f}, "
+              f"input {probe['input_rate']:.2f}, backpressure {probe['backpressure']} -> "
+              f"{'sustainable' if probe['sustainable'] else 'saturated'}")
+        self.update(rps, probe["sustainable"])
+
+    def update(self, rps, sustainable):
+        """
+        Narrows the bracket with a probe's outcome and picks the next rate.
+        """
+        if sustainable:
+            self.lo = rps if self.lo is None else max(self.lo, rps)
+        else:
+            self.hi = rps if self.hi is None else min(self.hi, rps)
+
+        if self.lo is None:
+            self.next_rate = max(int(rps / GROWTH), 1) if rps > 1 else None
+        elif self.hi is None:
+            self.next_rate = int(self.lo * GROWTH)
+        elif (self.hi - self.lo) / self.lo <= RESOLUTION or self.hi - self.lo <= 1:
+            self.next_rate = None
+        else:
+            self.next_rate = (self.lo + self.hi) // 2
+
+    def report(self):
+        """
+        Returns: dict with the knee (highest sustainable rate), the lowest
+        saturated rate bounding it, and the throughput measured at the knee
+        """
+        at_knee = next((p for p in self.probes if p["rps"] == self.lo), None)
+        return {
+            "benchmark": self.benchmark,
+            "config": self.config["label"],
+            "knee_rps": self.lo,
+            "upper_bound_rps": self.hi,
+            "throughput": at_knee["throughput"] if at_knee else None,
+            "throughput_ci": at_knee["throughput_ci"] if at_knee else None,
+            "probes": len(self.probes),
+        }
+
+
+def write_reports(reports, path=RESULTS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    new_file = not os.path.exists(path)
+    columns = ["benchmark", "config", "knee_rps", "upper_bound_rps", "throughput", "throughput_ci", "probes"]
+    with open(path, "a") as f:
+        if new_file:
+            f.write(",".join(columns) + "\n")
+        for report in reports:
+            f.write(",".join("" if report[c] is None else str(report[c]) for c in columns) + "\n")
+            print(f"📍 {report['benchmark']} {report['config']}: sustains {report['knee_rps']} "
+                  f"(saturated at {report['upper_bound_rps']}), throughput {report['throughput']} "
+                  f"± {report['throughput_ci']} after {report['probes']} runs")
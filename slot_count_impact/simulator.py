@@ -0,0 +1,486 @@
+"""
+Deterministic stand-in for the cluster and the metrics database, to run
+and time the runner and the extractor without Kubernetes or InfluxDB.
+
+SimulatedCluster plays the Flink operator for the FlinkDeployments the
+runner applies: TaskManager pods come up after seeded startup delays, an
+in-place rate change restarts the job, a deletion takes a teardown delay.
+SimulatedStore synthesizes the reporter's per-second series of every
+deployment when queried. Each benchmark has a throughput knee per slot
+(KNEES): past it the job lags the target rate, backpressure builds up and
+latency grows with the backlog. Runs of a results store can be replayed
+instead (recorded=). Queries are answered by line_protocol_sink.execute,
+so they go through the same InfluxQL subset as the local sink.
+
+Time runs SPEEDUP times faster than the wall clock. Delays and series are
+functions of SEED and of the seconds since each deployment started, so
+the same sweep yields the same metrics; only the poll instants vary with
+thread scheduling.
+"""
+import math
+import os
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+from influxdb.resultset import ResultSet
+
+import backends
+import experiment
+import get_metrics
+import line_protocol_sink
+import manifests
+import results_store
+
+SPEEDUP = 600
+SEED = 0
+
+# Seconds until a deployment runs: JobManager, then the slowest of its
+# TaskManager pods (fixed part plus an exponential jitter), then the job
+JOBMANAGER_SECONDS = 15
+TASKMANAGER_SECONDS = 10
+TASKMANAGER_JITTER = 5
+JOB_START_SECONDS = 5
+# In-place upgrade (savepoint and restart from it) and teardown
+UPGRADE_SECONDS = 20
+TEARDOWN_SECONDS = 8
+# Throughput ramps up to its level over the first seconds of a job
+RAMP_SECONDS = 20
+NOISE = 0.01
+
+# Records/s one slot sustains per benchmark, and the capacity gained per
+# additional slot sharing a TaskManager (exchanges stay in the JVM)
+KNEES = {
+    "StateMachine": 30000,
+    "WindowJoin": 150,
+}
+DEFAULT_KNEE = 10000
+LOCALITY_GAIN = 0.05
+
+CPU_NS_PER_RECORD = 20000
+IDLE_CPU_NS = 5 * 10 ** 7  # per TaskManager and second
+GC_MS_PER_1K_RECORDS = 0.5
+HEAP_BYTES_PER_SLOT = 256 * 1024 ** 2
+JVM_THREADS = 40
+THREADS_PER_SLOT = 12
+LATENCY_BASE_MS = 5.0
+LATENCY_QUANTILES = {"latency_p50": 1.0, "latency_p95": 1.8, "latency_p99": 2.5, "latency_p999": 4.0}
+MAX_LATENCY_MS = 60000.0
+
+# Metrics reported per subtask (the others per TaskManager JVM)
+TASK_METRICS = {"throughput", "input_rate", "backpressure", *LATENCY_QUANTILES}
+JVM_METRICS = {"jvm_cpu_load", "jvm_cpu_time", "jvm_gc_time", "jvm_heap_used", "jvm_threads"}
+
+
+class ScaledClock(backends.Clock):
+    """
+    Clock running `speedup` times faster than the wall clock, from now.
+    """
+
+    def __init__(self, speedup=SPEEDUP):
+        self.speedup = speedup
+        self.origin = time.monotonic()
+        self.start = time.time()
+
+    def monotonic(self):
+        return (time.monotonic() - self.origin) * self.speedup
+
+    def now(self):
+        return self.start + self.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(max(seconds, 0) / self.speedup)
+
+
+def noise(seed, n, *keys):
+    """
+    Returns: n multiplicative noise factors, the same for the same keys
+    """
+    rng = np.random.default_rng([seed, *(zlib.crc32(str(key).encode()) for key in keys)])
+    return 1 + NOISE * rng.standard_normal(n)
+
+
+def job_rate(job):
+    """
+    Returns: the target rate argument of a job, 0 for jobs reading from the
+    workload generator (which the simulated jobs do not connect to)
+    """
+    args = job.get("args") or []
+    return int(args[1]) if len(args) > 1 and args[1].isdigit() else 0
+
+
+class SimulatedDeployment:
+    """
+    One applied FlinkDeployment and the history of its job: the target rate
+    over time and the windows the job was restarting in.
+    """
+
+    def __init__(self, manifest, benchmarks, applied, rng):
+        conf = manifest["spec"]["flinkConfiguration"]
+        job = manifest["spec"]["job"]
+        variables = conf.get("metrics.reporter.influxdb.scope.variables.additional", "")
+        tags = dict(pair.split(":", 1) for pair in variables.split(",") if ":" in pair)
+        self.name = manifest["metadata"]["name"]
+        self.label = tags.get("config", self.name)
+        self.benchmark = benchmarks.get(job["jarURI"], job["jarURI"].rsplit("/", 1)[-1])
+        self.slots_per_tm = int(conf["taskmanager.numberOfTaskSlots"])
+        self.parallelism = int(job["parallelism"])
+        self.tms = math.ceil(self.parallelism / self.slots_per_tm)
+        self.cpu = float(manifest["spec"]["taskManager"]["resource"]["cpu"])
+
+        startup = JOBMANAGER_SECONDS + max(
+            TASKMANAGER_SECONDS + rng.expovariate(1 / TASKMANAGER_JITTER) for _ in range(self.tms)
+        )
+        self.started = applied + startup + JOB_START_SECONDS
+        self.ready_at = self.started
+        self.deleted_at = None
+        self.rates = [(applied, job_rate(job))]
+        self.restarts = []
+
+    def tm_ids(self):
+        return [f"{self.name}-taskmanager-1-{i + 1}" for i in range(self.tms)]
+
+    def capacity(self):
+        gain = 1 + LOCALITY_GAIN * (self.slots_per_tm - 1)
+        return KNEES.get(self.benchmark, DEFAULT_KNEE) * self.parallelism * gain
+
+    def change_rate(self, now, rps):
+        self.rates.append((now, rps))
+        self.restarts.append((now, now + UPGRADE_SECONDS))
+        self.ready_at = now + UPGRADE_SECONDS
+
+    def seconds(self, now):
+        """
+        Returns: every second the deployment has reported metrics in so far
+        """
+        end = now if self.deleted_at is None else min(now, self.deleted_at)
+        return np.arange(math.ceil(self.started), math.floor(end) + 1, dtype="int64")
+
+    def model(self, seconds):
+        """
+        Returns: dict of per-second arrays over seconds: target rate, records/s
+        achieved, backpressure (ms/s), latency (ms), ramp (0 to 1 since the
+        job last started), running (job not restarting) and job start time
+        """
+        changes = np.array([since for since, _ in self.rates])
+        target = np.array([rps for _, rps in self.rates], dtype="float64")[
+            np.searchsorted(changes, seconds, side="right") - 1]
+        running = np.ones(len(seconds), dtype=bool)
+        started = np.full(len(seconds), self.started)
+        for restart_start, restart_end in self.restarts:
+            running &= (seconds < restart_start) | (seconds >= restart_end)
+            started = np.where(seconds >= restart_end, restart_end, started)
+        since_start = np.maximum(seconds - started, 0)
+        ramp = np.clip(since_start / RAMP_SECONDS, 0, 1)
+
+        capacity = self.capacity()
+        achieved = np.minimum(target, capacity) * ramp * running
+        backlog = np.maximum(target - capacity, 0) * since_start
+        utilization = np.minimum(achieved / capacity, 0.95)
+        return {
+            "target": target,
+            "achieved": achieved,
+            "backpressure": 1000 * (1 - capacity / np.maximum(target, capacity)) * ramp * running,
+            "latency": np.minimum(LATENCY_BASE_MS / (1 - utilization) + backlog / capacity * 1000, MAX_LATENCY_MS),
+            "ramp": ramp,
+            "running": running,
+            "started": started,
+        }
+
+    def series(self, labels, now, seed):
+        """
+        Synthesizes the series of the given metric labels.
+        Returns: list of (tags, seconds, {label: values})
+        """
+        seconds = self.seconds(now)
+        if not len(seconds):
+            return []
+        state = self.model(seconds)
+        base = {"deployment": self.name, "config": self.label}
+        tm_ids = self.tm_ids()
+        result = []
+
+        task_labels = [label for label in labels if label in TASK_METRICS]
+        if task_labels:
+            running = state["running"]
+            for i in range(self.parallelism):
+                tags = dict(base, tm_id=tm_ids[i // self.slots_per_tm], task_name="Source", subtask_index=str(i))
+                values = {}
+                for label in task_labels:
+                    factor = noise(seed, len(seconds), self.name, i, label)
+                    if label in ("throughput", "input_rate"):
+                        values[label] = state["achieved"] / self.parallelism * factor
+                    elif label == "backpressure":
+                        values[label] = state["backpressure"] * factor
+                    else:
+                        values[label] = state["latency"] * LATENCY_QUANTILES[label] * factor
+                # Task metrics are gone while the job restarts
+                result.append((tags, seconds[running], {k: v[running] for k, v in values.items()}))
+
+        jvm_labels = [label for label in labels if label in JVM_METRICS]
+        for j, tm_id in enumerate(tm_ids if jvm_labels else []):
+            slots = min(self.slots_per_tm, self.parallelism - j * self.slots_per_tm)
+            records = state["achieved"] * slots / self.parallelism
+            cpu_ns = records * CPU_NS_PER_RECORD * noise(seed, len(seconds), self.name, tm_id, "cpu") + IDLE_CPU_NS
+            values = {}
+            for label in jvm_labels:
+                if label == "jvm_cpu_time":
+                    values[label] = np.cumsum(cpu_ns)
+                elif label == "jvm_cpu_load":
+                    values[label] = np.minimum(cpu_ns / 1e9 / self.cpu, 1)
+                elif label == "jvm_gc_time":
+                    values[label] = np.cumsum(records / 1000 * GC_MS_PER_1K_RECORDS)
+                elif label == "jvm_heap_used":
+                    heap = HEAP_BYTES_PER_SLOT * self.slots_per_tm * (0.5 + 0.5 * state["ramp"])
+                    values[label] = heap * noise(seed, len(seconds), self.name, tm_id, label)
+                else:
+                    values[label] = np.full(len(seconds), float(JVM_THREADS + THREADS_PER_SLOT * self.slots_per_tm))
+            result.append((dict(base, tm_id=tm_id), seconds, values))
+        return result
+
+    def replayed(self, labels, now, recordings):
+        """
+        Replays recorded per-TaskManager series (see results_store.load_series),
+        one recording per rate, each looped from the start of the job.
+        recordings: rps -> DataFrame indexed by second offset with (metric,
+        tm_id) columns
+        Returns: like series()
+        """
+        seconds = self.seconds(now)
+        if not len(seconds):
+            return []
+        state = self.model(seconds)
+        offsets = (seconds - state["started"]).astype("int64")
+        tm_ids = self.tm_ids()
+        result = []
+        for j, tm_id in enumerate(tm_ids):
+            values = {label: np.full(len(seconds), np.nan) for label in labels}
+            for rps, recording in recordings.items():
+                in_segment = state["target"] == rps
+                recorded_tms = sorted(recording.columns.get_level_values("tm_id").unique())
+                if not in_segment.any() or j >= len(recorded_tms):
+                    continue
+                for label in labels:
+                    if (label, recorded_tms[j]) not in recording:
+                        continue
+                    column = recording[(label, recorded_tms[j])].to_numpy()
+                    values[label][in_segment] = column[offsets[in_segment] % len(column)]
+            for label in labels:
+                if label in get_metrics.COUNTER_METRICS:
+                    # Stored as rates: integrate back into a running total
+                    values[label] = np.nancumsum(values[label])
+            tags = {"deployment": self.name, "config": self.label, "tm_id": tm_id,
+                    "task_name": "Source", "subtask_index": str(j)}
+            result.append((tags, seconds, values))
+        return result
+
+
+class SimulatedCluster:
+    """
+    Cluster backend (see backends.KubectlCluster) whose deployments only
+    exist in memory. Every deployment ever applied is kept, so its metrics
+    can still be queried after it was deleted.
+    """
+
+    def __init__(self, seed=SEED):
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.deployments = {}
+        self.history = []
+        self.applied = 0
+        _, benchmarks, _, _ = experiment.load_matrix()
+        self.benchmarks = {jar: benchmark for benchmark, jar in benchmarks.items()}
+
+    def apply(self, resources, dry_run=False):
+        resources = list(resources)
+        for manifest in resources:
+            manifests.validate(manifest)
+        if dry_run:
+            return
+        with self.lock:
+            for manifest in resources:
+                name = manifest["metadata"]["name"]
+                existing = self.deployments.get(name)
+                if existing is not None:
+                    # Changed job spec: the operator upgrades the job in place
+                    existing.change_rate(backends.clock.now(), job_rate(manifest["spec"]["job"]))
+                    continue
+                rng = random.Random(f"{self.seed}:{name}:{self.applied}")
+                deployment = SimulatedDeployment(manifest, self.benchmarks, backends.clock.now(), rng)
+                self.deployments[name] = deployment
+                self.history.append(deployment)
+                self.applied += 1
+
+    def delete(self, name, namespace=None):
+        with self.lock:
+            deployment = self.deployments.pop(name)
+            deployment.deleted_at = backends.clock.now()
+        backends.clock.sleep(TEARDOWN_SECONDS)
+
+    def wait_until_ready(self, name, replicas, namespace=None, timeout=300, spec_applied=None):
+        with self.lock:
+            ready_at = self.deployments[name].ready_at
+        wait = ready_at - backends.clock.now()
+        backends.clock.sleep(min(wait, timeout))
+        return wait <= timeout
+
+    def taskmanager_pods(self, name, namespace=None):
+        with self.lock:
+            deployment = self.deployments.get(name)
+        return deployment.tm_ids() if deployment else []
+
+    def cadvisor_scrapes(self):
+        return iter(())
+
+    def deployed(self):
+        with self.lock:
+            return list(self.history)
+
+
+class SimulatedStore:
+    """
+    Answers line_protocol_sink.execute scans from the simulated deployments.
+    recorded: results store whose runs (and their per-TaskManager series,
+    next to it) are replayed for the cells they cover
+    """
+
+    def __init__(self, cluster, recorded=None):
+        self.cluster = cluster
+        self.recorded = recorded
+        if recorded:
+            # Laid out like the default store: logs/results.db, logs/tm_series/
+            series_dir = os.path.relpath(results_store.SERIES_DIR, os.path.dirname(results_store.STORE_PATH))
+            self.series_dir = os.path.join(os.path.dirname(recorded), series_dir)
+        self.lock = threading.Lock()
+        self.tagsets = {}
+        self.tagset_list = []
+        self.recordings = {}
+
+    def tagset_id(self, tags):
+        key = tuple(sorted(tags.items()))
+        with self.lock:
+            if key not in self.tagsets:
+                self.tagsets[key] = len(self.tagset_list)
+                self.tagset_list.append(dict(key))
+            return self.tagsets[key]
+
+    def recording(self, benchmark, label, rps):
+        """
+        Returns: the first recorded run of a cell as a DataFrame indexed by
+        second offset with (metric, tm_id) columns, or None
+        """
+        key = (benchmark, label, rps)
+        if key not in self.recordings:
+            self.recordings[key] = None
+            runs = results_store.load(self.recorded, app=benchmark, config=label, rate=rps)
+            for rid in runs["run_id"]:
+                if os.path.exists(results_store.series_path(rid, self.series_dir)):
+                    frame = results_store.load_series(rid, self.series_dir)
+                    frame = frame.assign(second=frame["second"] - frame["second"].min())
+                    self.recordings[key] = frame.pivot_table(
+                        index="second", columns=["metric", "tm_id"], values="value", observed=True)
+                    break
+        return self.recordings[key]
+
+    def deployment_series(self, deployment, labels, now):
+        if self.recorded:
+            recordings = {rps: self.recording(deployment.benchmark, deployment.label, rps)
+                          for _, rps in deployment.rates}
+            if all(r is not None for r in recordings.values()):
+                return deployment.replayed(labels, now, recordings)
+        return deployment.series(labels, now, self.cluster.seed)
+
+    def scan(self, measurement, start_ns, end_ns, tag_filter):
+        """
+        Same contract as line_protocol_sink.ColumnStore.scan.
+        """
+        labels = [label for label, m in get_metrics.METRICS.items() if m == measurement]
+        fields = {label: get_metrics.METRIC_TO_FIELD[label] for label in labels}
+        now = backends.clock.now()
+        parts = []
+        for deployment in self.cluster.deployed():
+            if any(tag == "deployment" and value != deployment.name for tag, value in tag_filter):
+                continue
+            for tags, seconds, values in self.deployment_series(deployment, labels, now):
+                if any(tags.get(tag) != value for tag, value in tag_filter):
+                    continue
+                times = seconds * 10 ** 9
+                keep = (times >= start_ns) & (times < end_ns)
+                if not keep.any():
+                    continue
+                ids = np.full(keep.sum(), self.tagset_id(tags), dtype="i4")
+                parts.append((times[keep], ids, {fields[label]: v[keep] for label, v in values.items()}))
+
+        if not parts:
+            return np.empty(0, "i8"), np.empty(0, "i4"), {}
+        names = sorted({name for _, _, f in parts for name in f})
+        times = np.concatenate([t for t, _, _ in parts])
+        order = np.argsort(times, kind="stable")
+        columns = {
+            name: np.concatenate([f.get(name, np.full(len(t), np.nan)) for t, _, f in parts])[order]
+            for name in names
+        }
+        return times[order], np.concatenate([ids for _, ids, _ in parts])[order], columns
+
+
+class SimulatedClient:
+    """
+    The part of InfluxDBClient the scripts use, over a SimulatedStore.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.queries = 0
+        self.points_written = 0
+
+    def query(self, query, epoch=None):
+        statements = [s for s in query.split(";") if s.strip()]
+        self.queries += len(statements)
+        results = []
+        for statement in statements:
+            result = line_protocol_sink.execute(self.store, statement, epoch)
+            if "error" in result:
+                raise ValueError(result["error"])
+            results.append(ResultSet(result))
+        return results if len(results) > 1 else results[0]
+
+    def write_points(self, points, time_precision=None):
+        self.points_written += len(points)
+        return True
+
+    def close(self):
+        pass
+
+
+class SimulatedMetrics:
+    """
+    Metrics backend (see backends.InfluxMetrics) over a SimulatedStore.
+    Keeps the clients it hands out, to count the queries of a sweep.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.clients = []
+
+    def client(self, pool_size=10):
+        client = SimulatedClient(self.store)
+        self.clients.append(client)
+        return client
+
+    def queries(self):
+        return sum(client.queries for client in self.clients)
+
+
+def install(speedup=SPEEDUP, seed=SEED, recorded=None):
+    """
+    Switches this process to a fresh simulated cluster and metrics database.
+    recorded: path of a results store to replay (see SimulatedStore)
+    Returns: (cluster, metrics) backends
+    """
+    cluster = SimulatedCluster(seed)
+    metrics = SimulatedMetrics(SimulatedStore(cluster, recorded))
+    backends.use(clock=ScaledClock(speedup), cluster=cluster, metrics=metrics)
+    print(f"🧪 Simulated cluster and metrics, {speedup}x time, seed {seed}")
+    return cluster, metrics
@@ -0,0 +1,172 @@
+import math
+import statistics
+
+import backends
+import metrics_cache
+from get_metrics import METRICS, METRIC_TO_FIELD, AGG_METRICS_MEAN, AGG_METRICS_MAX
+
+# Metrics watched while a job warms up
+STEADY_METRICS = ["throughput", "backpressure", "jvm_heap_used"]
+
+# Steady state: every watched metric's coefficient of variation over the
+# last CV_WINDOW_SECONDS stays below CV_THRESHOLD. Metrics that sit around
+# zero (e.g. no backpressure) are compared against an absolute tolerance.
+CV_WINDOW_SECONDS = 30
+CV_THRESHOLD = 0.05
+ABS_TOLERANCE = {
+    "backpressure": 50.0,  # ms per second
+}
+# Metrics that swing by design (the heap's GC sawtooth) are stable once
+# their floor stops moving instead: the minimums of the two halves of the
+# last FLOOR_WINDOW_SECONDS differ by less than this share
+FLOOR_WINDOW_SECONDS = 60
+FLOOR_TOLERANCE = {
+    "jvm_heap_used": 0.10,
+}
+
+# Recording: stop once the 95% confidence interval of throughput (over
+# BATCH_SECONDS batch means) is within CI_RELATIVE_WIDTH of the mean
+BATCH_SECONDS = 10
+CI_RELATIVE_WIDTH = 0.02
+Z_95 = 1.96
+
+POLL_SECONDS = 5
+# Seconds still being reported to: per-second sums over them are incomplete
+SETTLE_SECONDS = 2
+MAX_WARMUP_SECONDS = 10 * 60
+MIN_RECORD_SECONDS = 60
+MAX_RECORD_SECONDS = 10 * 60
+
+
+def influx_client():
+    return backends.metrics.client()
+
+def now_iso():
+    return backends.clock.now_iso()
+
+def settled_second():
+    """
+    Returns: epoch second before which every second is completely reported
+    """
+    return int(backends.clock.now()) - SETTLE_SECONDS
+
+def per_second_aggregate(metric_label):
+    if metric_label in AGG_METRICS_MEAN:
+        return "mean"
+    if metric_label in AGG_METRICS_MAX:
+        return "max"
+    return "sum"
+
+def query_per_second_points(client, name, since, metrics=STEADY_METRICS, until=None):
+    """
+    Fetches the per-second series of the given metrics of one deployment
+    since an ISO timestamp (or epoch seconds), with a single multi-statement
+    query. until: epoch second the series stops before (e.g. settled_second())
+    Returns: dict of metric label -> list of (epoch second, value)
+    """
+    since = f"'{since}'" if isinstance(since, str) else f"{int(since)}s"
+    bound = f" AND time < {int(until)}s" if until is not None else ""
+    statements = []
+    for metric_label in metrics:
+        agg = per_second_aggregate(metric_label).upper()
+        statements.append(
+            f"""SELECT {agg}("{METRIC_TO_FIELD[metric_label]}") FROM "{METRICS[metric_label]}" """
+            f"""WHERE time >= {since}{bound} AND "deployment" = '{name}' GROUP BY time(1s) fill(none)"""
+        )
+    series = {}
+    for metric_label, result in zip(metrics, metrics_cache.query_statements(client, statements, "s")):
+        column = per_second_aggregate(metric_label)
+        series[metric_label] = [
+            (p["time"], p[column]) for p in result.get_points() if p.get(column) is not None
+        ]
+    return series
+
+def query_per_second(client, name, since, metrics=STEADY_METRICS):
+    """
+    Returns: dict of metric label -> list of per-second values, up to the
+    last settled second (the one in progress would bias sums low)
+    """
+    points = query_per_second_points(client, name, since, metrics, until=settled_second())
+    return {metric_label: [value for _, value in series] for metric_label, series in points.items()}
+
+def has_stable_floor(values, tolerance):
+    if len(values) < FLOOR_WINDOW_SECONDS:
+        return False
+    window = values[-FLOOR_WINDOW_SECONDS:]
+    half = len(window) // 2
+    first, second = min(window[:half]), min(window[half:])
+    highest = max(first, second)
+    return highest > 0 and abs(second - first) / highest < tolerance
+
+def is_stable(metric_label, values):
+    if metric_label in FLOOR_TOLERANCE:
+        return has_stable_floor(values, FLOOR_TOLERANCE[metric_label])
+    if len(values) < CV_WINDOW_SECONDS:
+        return False
+    window = values[-CV_WINDOW_SECONDS:]
+    mean = statistics.fmean(window)
+    stdev = statistics.pstdev(window)
+    if stdev <= ABS_TOLERANCE.get(metric_label, 0.0):
+        return True
+    return mean != 0 and stdev / abs(mean) < CV_THRESHOLD
+
+def confidence_half_width(values):
+    """
+    95% confidence half-width of the mean, computed over batch means so that
+    autocorrelated per-second samples do not make it look too narrow.
+    """
+    batches = [
+        statistics.fmean(values[i:i + BATCH_SECONDS])
+        for i in range(0, len(values) - BATCH_SECONDS + 1, BATCH_SECONDS)
+    ]
+    if len(batches) < 2:
+        return math.inf
+    return Z_95 * statistics.stdev(batches) / math.sqrt(len(batches))
+
+def wait_for_steady_state(client, name, since, stop=None):
+    """
+    Blocks until the deployment's watched metrics are stable, or for at most
+    MAX_WARMUP_SECONDS. stop: optional callable that ends the wait early.
+    Returns: True if steady state was reached
+    """
+    deadline = backends.clock.monotonic() + MAX_WARMUP_SECONDS
+    while backends.clock.monotonic() < deadline:
+        backends.clock.sleep(POLL_SECONDS)
+        if stop is not None and stop():
+            return False
+        try:
+            series = query_per_second(client, name, since)
+        except Exception as e:
+            print(f"⚠️ {name}: Failed to query metrics: {e}")
+            continue
+        if all(is_stable(m, series[m]) for m in STEADY_METRICS):
+            return True
+    return False
+
+def record_until_confident(client, name, start, stop=None):
+    """
+    Blocks while a run window is recorded, until throughput is known within
+    CI_RELATIVE_WIDTH (after at least MIN_RECORD_SECONDS) or for at most
+    MAX_RECORD_SECONDS. stop: optional callable that ends the recording early.
+    Returns: (mean throughput, confidence half-width) of the recorded window
+    """
+    began = backends.clock.monotonic()
+    mean, half_width = None, math.inf
+    while backends.clock.monotonic() - began < MAX_RECORD_SECONDS:
+        backends.clock.sleep(POLL_SECONDS)
+        if stop is not None and stop():
+            break
+        if backends.clock.monotonic() - began < MIN_RECORD_SECONDS:
+            continue
+        try:
+            values = query_per_second(client, name, start, metrics=["throughput"])["throughput"]
+        except Exception as e:
+            print(f"⚠️ {name}: Failed to query metrics: {e}")
+            continue
+        if not values:
+            continue
+        mean = statistics.fmean(values)
+        half_width = confidence_half_width(values)
+        if mean and half_width / abs(mean) < CI_RELATIVE_WIDTH:
+            break
+    return mean, half_width
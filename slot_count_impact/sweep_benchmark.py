@@ -0,0 +1,115 @@
+"""
+Times full sweeps of the experiment matrix on the simulator (see
+simulator.py), once per orchestration strategy, then extracts them with
+get_metrics.py. Each sweep runs in a scratch directory, so the logs and
+results store of real sweeps are left alone.
+
+Reported per strategy: the cluster time the sweep would take (simulated
+seconds), and the wall-clock cost of the tooling itself for orchestrating
+and extracting it (with the simulated waits SPEEDUP times shorter).
+
+Usage: python sweep_benchmark.py [--repeats N] [--speedup N] [--replay <results.db>]
+"""
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import backends
+import flink_benchmark_runner as runner
+import get_metrics
+import simulator
+
+REPORT_PATH = "logs/sweep_benchmark.csv"
+
+# Room for every deployment of a config at once
+PACKED_CAPACITY = {
+    "cpu": 36,
+    "memory": "73728m",
+}
+
+STRATEGIES = {
+    "cold-start": {"in_place": False, "capacity": runner.CLUSTER_CAPACITY},
+    "in-place": {"in_place": True, "capacity": runner.CLUSTER_CAPACITY},
+    "cold-start-packed": {"in_place": False, "capacity": PACKED_CAPACITY},
+    "in-place-packed": {"in_place": True, "capacity": PACKED_CAPACITY},
+}
+
+
+def sweep_cells(repeats):
+    return [
+        (benchmark, config, rps, repeat)
+        for repeat in range(repeats)
+        for benchmark in runner.BENCHMARKS
+        for config in runner.CONFIGS
+        for rps in runner.RPS[benchmark]
+    ]
+
+def run_strategy(strategy, repeats, speedup, recorded=None):
+    """
+    Runs and extracts one full sweep in a scratch directory.
+    Returns: dict of timings and counts
+    """
+    options = STRATEGIES[strategy]
+    base_yaml_path = os.path.abspath(runner.YAML_PATH)
+    recorded = os.path.abspath(recorded) if recorded else None
+    cwd = os.getcwd()
+    scratch = tempfile.mkdtemp(prefix=f"sweep_{strategy}_")
+    os.chdir(scratch)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            cluster, metrics = simulator.install(speedup, simulator.SEED, recorded)
+            cells = sweep_cells(repeats)
+            rng = random.Random(runner.SEED) if repeats > 1 else None
+
+            started, simulated = time.monotonic(), backends.clock.monotonic()
+            runner.schedule(cells, capacity=options["capacity"], base_yaml_path=base_yaml_path,
+                            in_place=options["in_place"], rng=rng)
+            sweep_wall = time.monotonic() - started
+            sweep_simulated = backends.clock.monotonic() - simulated
+            sweep_queries = metrics.queries()
+
+            started = time.monotonic()
+            get_metrics.main()
+            extract_wall = time.monotonic() - started
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "strategy": strategy,
+        "cells": len(cells),
+        "deployments": len(cluster.deployed()),
+        "cluster_hours": sweep_simulated / 3600,
+        "sweep_wall_s": sweep_wall,
+        "sweep_queries": sweep_queries,
+        "extract_wall_s": extract_wall,
+        "extract_queries": metrics.queries() - sweep_queries,
+    }
+
+def main():
+    repeats = int(sys.argv[sys.argv.index("--repeats") + 1]) if "--repeats" in sys.argv else 1
+    speedup = float(sys.argv[sys.argv.index("--speedup") + 1]) if "--speedup" in sys.argv else simulator.SPEEDUP
+    recorded = sys.argv[sys.argv.index("--replay") + 1] if "--replay" in sys.argv else None
+
+    rows = []
+    for strategy in STRATEGIES:
+        row = run_strategy(strategy, repeats, speedup, recorded)
+        print(f"⏱️ {strategy}: {row['cells']} cells on {row['deployments']} deployments, "
+              f"{row['cluster_hours']:.2f} h of cluster time; tooling {row['sweep_wall_s']:.1f}s sweep "
+              f"({row['sweep_queries']} queries) + {row['extract_wall_s']:.1f}s extraction "
+              f"({row['extract_queries']} queries)")
+        rows.append(row)
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    pd.DataFrame(rows).to_csv(REPORT_PATH, index=False)
+    print(f"📄 {REPORT_PATH}")
+
+if __name__ == "__main__":
+    main()
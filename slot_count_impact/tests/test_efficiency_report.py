@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+import efficiency_report
+
+MATRIX = [{"label": "tm2x4", "replicas": 2, "task_slots": 4, "cpu": 4, "memory": "8192m"}]
+
+
+def test_resources_come_from_the_stored_runs():
+    runs = pd.DataFrame({
+        "run_id": ["a", "b", "c"],
+        "app": ["A", "A", "A"],
+        # A config dropped from the matrix, a legacy import and an unknown one
+        "config": ["tm4x2", "tm2x4", "tm16x1"],
+        "rate": [100, 100, 100],
+        "num_tms": pd.array([4, 2, 16], dtype="Int64"),
+        "total_slots": pd.array([8, 8, 16], dtype="Int64"),
+        "tm_cpu": [2.0, None, None],
+        "tm_memory_mb": [4096.0, None, None],
+        "throughput": [800.0, 800.0, 800.0],
+        "input_rate": [800.0, 800.0, 800.0],
+        "backpressure": [0.0, 0.0, 0.0],
+    })
+
+    runs = runs.join(efficiency_report.run_resources(runs, MATRIX))
+    cells = efficiency_report.cell_efficiency(runs).set_index("config")
+
+    assert list(cells.index) == ["tm2x4", "tm4x2"]
+    assert cells.loc["tm4x2", "vcpu"] == pytest.approx(8)
+    assert cells.loc["tm4x2", "memory_gib"] == pytest.approx(16)
+    assert cells.loc["tm2x4", "per_vcpu"] == pytest.approx(100)
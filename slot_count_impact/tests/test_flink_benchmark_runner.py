@@ -0,0 +1,93 @@
+import json
+import os
+import random
+
+import pytest
+
+import backends
+import flink_benchmark_runner as runner
+import manifests
+import simulator
+
+BASE_YAML = os.path.join(os.path.dirname(__file__), "..", "..", "example", "basic.yaml")
+CELLS = [("StateMachine", config, rps, 0) for config in runner.CONFIGS for rps in (100000, 400000)]
+
+
+@pytest.fixture
+def cluster(tmp_path, monkeypatch):
+    """
+    Simulated cluster (see simulator.py), with the runner's logs in tmp_path.
+    """
+    monkeypatch.chdir(tmp_path)
+    for name in ("clock", "cluster", "metrics"):
+        monkeypatch.setattr(backends, name, getattr(backends, name))
+    cluster, _ = simulator.install()
+    return cluster
+
+
+def capacity(deployments):
+    jobmanager = manifests.load_base(BASE_YAML)["spec"]["jobManager"]["resource"]
+    demand = runner.deployment_demand(runner.CONFIGS[0], jobmanager)
+    return {"cpu": deployments * demand["cpu"], "memory": f"{deployments * demand['memory']:.0f}m"}
+
+
+def most_concurrent(deployments):
+    events = sorted([(d.rates[0][0], 1) for d in deployments] + [(d.deleted_at, -1) for d in deployments])
+    running = peak = 0
+    for _, change in events:
+        running += change
+        peak = max(peak, running)
+    return peak
+
+
+def test_deployment_names_fit_the_cluster_id_limit():
+    config = {"label": "tm8x1-profiled-ckpt10s-rocksdb"}
+
+    names = {runner.deployment_name("StateMachine", config, 400000, repeat) for repeat in (0, 1, 12)}
+    names.add(runner.deployment_name("StateMachine", dict(config, label="tm8x1-profiled-ckpt10s-hashmap"), 400000))
+
+    assert len(names) == 4
+    assert all(manifests.NAME.match(name) for name in names)
+    assert runner.deployment_name("StateMachine", {"label": "tm2x4"}, 100000, 1) == "statemachine-tm2x4-100000-r1"
+
+
+def test_reconciled_waits_for_the_upgrade_to_be_deployed():
+    check = runner.reconciled({"spec": {"job": {"args": ["--rps", "200"], "parallelism": 4}}})
+
+    def deployment(state, args):
+        spec = json.dumps({"spec": {"job": {"args": args, "parallelism": 4}}})
+        return {"status": {"reconciliationStatus": {"state": state, "lastReconciledSpec": spec}}}
+
+    assert not check(deployment("DEPLOYED", ["--rps", "100"]))
+    assert not check(deployment("UPGRADING", ["--rps", "200"]))
+    assert check(deployment("DEPLOYED", ["--rps", "200"]))
+
+
+def test_schedule_packs_deployments_into_the_capacity(cluster):
+    runner.schedule(CELLS, capacity=capacity(2), base_yaml_path=BASE_YAML, in_place=False)
+
+    assert len(cluster.deployed()) == len(CELLS)
+    assert most_concurrent(cluster.deployed()) == 2
+
+
+def test_schedule_starts_chains_in_order_when_one_fits(cluster):
+    runner.schedule(CELLS, capacity=capacity(1), base_yaml_path=BASE_YAML, in_place=False)
+
+    assert [d.name for d in cluster.deployed()] == [chain[3] for chain in runner.chains(CELLS, in_place=False)]
+    assert most_concurrent(cluster.deployed()) == 1
+
+
+def test_schedule_runs_shuffled_chains_and_rates_in_order(cluster):
+    cells = CELLS + [(benchmark, config, rps, 1) for benchmark, config, rps, _ in CELLS]
+    expected = runner.chains(cells, in_place=True, rng=random.Random(3))
+
+    runner.schedule(cells, capacity=capacity(1), base_yaml_path=BASE_YAML, in_place=True, rng=random.Random(3))
+
+    assert [(d.name, [rps for _, rps in d.rates]) for d in cluster.deployed()] == \
+        [(name, rates) for _, _, rates, name, _, _ in expected]
+
+
+def test_schedule_skips_chains_that_do_not_fit(cluster):
+    runner.schedule(CELLS, capacity={"cpu": 1, "memory": "1024m"}, base_yaml_path=BASE_YAML, in_place=False)
+
+    assert cluster.deployed() == []
@@ -0,0 +1,112 @@
+import pytest
+
+import backends
+import get_metrics
+import line_protocol_sink
+
+START = "2024-01-01T00:00:00Z"
+END = "2024-01-01T00:02:00Z"
+T0 = 1704067200  # START in epoch seconds
+SECONDS = 120
+
+
+def reporter_lines(deployment, tm_id, throughput, backpressure, p99, cpu_ns_per_second):
+    task = f"deployment={deployment},task_name=Source,subtask_index={tm_id[-1]},tm_id={tm_id}"
+    for t in range(T0, T0 + SECONDS):
+        yield f"taskmanager_job_task_numRecordsOutPerSecond,{task} rate={throughput} {t}"
+        yield f"taskmanager_job_task_backPressuredTimeMsPerSecond,{task} value={backpressure} {t}"
+        yield f"{get_metrics.LATENCY_MEASUREMENT},{task} p50=1,p95=2,p99={p99},p999=20 {t}"
+        yield (f"taskmanager_Status_JVM_CPU_Time,deployment={deployment},tm_id={tm_id} "
+               f"value={(t - T0) * cpu_ns_per_second} {t}")
+
+
+@pytest.fixture
+def influx(tmp_path, monkeypatch):
+    """
+    Local InfluxDB 1.x stand-in (line_protocol_sink) holding two TaskManagers
+    of deployment "d" and one of another deployment, and a client counting
+    its /query requests.
+    """
+    monkeypatch.chdir(tmp_path)
+    store = line_protocol_sink.ColumnStore(str(tmp_path / "sink"))
+    lines = [
+        *reporter_lines("d", "tm1", 100, 10, 5, 10 ** 9),
+        *reporter_lines("d", "tm2", 300, 30, 9, 10 ** 9),
+        *reporter_lines("other", "tm3", 1000, 900, 500, 10 ** 9),
+    ]
+    store.append(line_protocol_sink.parse_lines("\n".join(lines), precision="s"))
+    server = line_protocol_sink.serve(store, port=0)
+    client = backends.InfluxMetrics(host="127.0.0.1", port=server.server_address[1]).client()
+    queries = []
+    query = client.query
+    monkeypatch.setattr(client, "query", lambda q, **kwargs: queries.append(q) or query(q, **kwargs))
+    yield client, queries
+    client.close()
+    server.shutdown()
+
+
+def test_query_run_metrics_splits_the_batched_response(influx):
+    client, queries = influx
+
+    values = get_metrics.query_run_metrics(client, START, END, tags={"deployment": "d"})["value"]
+
+    # Throughput sums the TaskManagers every second, backpressure averages
+    # every point, latency takes the slowest path
+    assert values["throughput"] == pytest.approx(400)
+    assert values["backpressure"] == pytest.approx(20)
+    assert values["latency_p99"] == pytest.approx(9)
+    # CPU time is a counter: rates per TaskManager, summed
+    assert values["jvm_cpu_time"] == pytest.approx(2e9)
+    assert values["cpu_ns_per_record"] == pytest.approx(5e6)
+    # Every measurement of the window in one multi-statement request
+    assert len(queries) == 1
+    assert queries[0].count(";") >= 1
+
+
+def test_query_run_metrics_reads_the_cache_the_second_time(influx):
+    client, queries = influx
+    first = get_metrics.query_run_metrics(client, START, END, tags={"deployment": "d"})["value"]
+
+    second = get_metrics.query_run_metrics(client, START, END, tags={"deployment": "d"})["value"]
+    offline = get_metrics.query_run_metrics(client, START, END, tags={"deployment": "d"}, offline=True)["value"]
+
+    # Only the measurements without points (not cached) are queried again
+    assert len(queries) == 2
+    assert "numRecordsOutPerSecond" in queries[0]
+    assert "numRecordsOutPerSecond" not in queries[1]
+    assert second["throughput"] == first["throughput"]
+    assert offline["throughput"] == first["throughput"]
+
+
+def test_query_run_metrics_without_data_has_no_mean_values(influx):
+    client, _ = influx
+
+    values = get_metrics.query_run_metrics(client, START, END, tags={"deployment": "missing"})["value"]
+
+    assert values["backpressure"] is None
+    assert values["latency_p99"] is None
+
+
+def test_query_run_metrics_leaves_uncollected_metrics_empty(influx):
+    client, _ = influx
+
+    values = get_metrics.query_run_metrics(client, START, END, tags={"deployment": "d"})["value"]
+
+    # No pod profiler or workload generator ran: unknown rather than zero
+    assert values["pod_cpu_usage"] is None
+    assert values["pod_memory_working_set"] is None
+    assert values["offered_load"] is None
+    assert values["achieved_load"] is None
+
+
+def test_parse_log_file_skips_runs_without_a_window(tmp_path):
+    log = tmp_path / "cell_log.txt"
+    log.write_text(
+        f"{START} - Starting config: tm2x4 deployment=d\n{END} - Finished config: tm2x4 deployment=d\n"
+        f"-1 - Starting config: tm2x4 deployment=d\n{END} - Finished config: tm2x4 deployment=d\n"
+    )
+
+    entries, invalid = get_metrics.parse_log_file(str(log))
+
+    assert [(e["start"], e["deployment"]) for e in entries] == [(START, "d")]
+    assert invalid == ["-1 - Starting config: tm2x4 deployment=d"]
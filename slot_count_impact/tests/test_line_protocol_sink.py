@@ -0,0 +1,82 @@
+import json
+import os
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+import line_protocol_sink
+
+HOUR_NS = 3600 * 10 ** 9
+
+
+def query(store, statement):
+    return line_protocol_sink.execute(store, statement, epoch="s")
+
+
+def test_write_and_query_per_second(tmp_path):
+    store = line_protocol_sink.ColumnStore(str(tmp_path))
+    store.append(line_protocol_sink.parse_lines(
+        "m,deployment=a,tm_id=1 rate=1 3600000000000\n"
+        "m,deployment=a,tm_id=2 rate=2 3600100000000\n"
+        "m,deployment=b,tm_id=1 rate=10 3600000000000\n"
+        "m,deployment=a,tm_id=1 rate=4 3601000000000\n"
+    ))
+
+    result = query(store, """SELECT SUM("rate") FROM "m" WHERE time >= 3600s AND "deployment" = 'a' """
+                          """GROUP BY time(1s) fill(none)""")
+
+    assert result["series"][0]["values"] == [[3600, 3.0], [3601, 4.0]]
+
+
+def test_time_upper_bound_is_exclusive(tmp_path):
+    store = line_protocol_sink.ColumnStore(str(tmp_path))
+    store.append(line_protocol_sink.parse_lines("m rate=1 3600000000000\nm rate=2 3601000000000\n"))
+
+    result = query(store, 'SELECT MEAN("rate") FROM "m" WHERE time >= 3600s AND time < 3601s GROUP BY time(1s) fill(none)')
+
+    assert result["series"][0]["values"] == [[3600, 1.0]]
+
+
+def test_missing_field_reads_as_null(tmp_path):
+    store = line_protocol_sink.ColumnStore(str(tmp_path))
+    store.append(line_protocol_sink.parse_lines("m a=1 3600000000000\nm b=2 3601000000000\n"))
+
+    result = query(store, 'SELECT * FROM "m" WHERE time >= 3600s')
+
+    series = result["series"][0]
+    assert series["columns"] == ["time", "a", "b"]
+    assert series["values"] == [[3600, 1.0, None], [3601, None, 2.0]]
+
+
+def test_restart_after_interrupted_append_keeps_rows_aligned(tmp_path):
+    store = line_protocol_sink.ColumnStore(str(tmp_path))
+    store.append(line_protocol_sink.parse_lines("m rate=1 3600000000000\n"))
+    # A crash after the field and tag columns were written, before time.i8
+    directory = store.partition_dir("m", 1)
+    with open(os.path.join(directory, "fields", "rate.f8"), "ab") as f:
+        np.array([999.0], dtype="f8").tofile(f)
+    with open(os.path.join(directory, "tags.i4"), "ab") as f:
+        np.array([0], dtype="i4").tofile(f)
+
+    restarted = line_protocol_sink.ColumnStore(str(tmp_path))
+    restarted.append(line_protocol_sink.parse_lines("m rate=7 3601000000000\n"))
+
+    result = query(restarted, 'SELECT * FROM "m" WHERE time >= 3600s')
+    assert result["series"][0]["values"] == [[3600, 1.0], [3601, 7.0]]
+
+
+def test_http_write_and_query(tmp_path):
+    server = line_protocol_sink.serve(line_protocol_sink.ColumnStore(str(tmp_path)), port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        request = urllib.request.Request(f"{base}/write?db=flink_metrics&precision=s", data=b"m rate=5 3600\n")
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 204
+        params = urllib.parse.urlencode({"q": 'SELECT MEAN("rate") FROM "m" WHERE time >= 3600s', "epoch": "s"})
+        with urllib.request.urlopen(f"{base}/query?{params}") as response:
+            body = json.load(response)
+    finally:
+        server.shutdown()
+
+    assert body["results"][0]["series"][0]["values"] == [[3600, 5.0]]
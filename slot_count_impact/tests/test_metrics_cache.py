@@ -0,0 +1,63 @@
+import metrics_cache
+
+START = "2024-01-01T00:00:00Z"
+END = "2024-01-01T00:01:00Z"
+
+
+class Result:
+    def __init__(self, points):
+        self.points = points
+
+    def get_points(self):
+        return iter(self.points)
+
+
+class FakeClient:
+    """
+    Answers every statement with the points it currently holds.
+    """
+
+    def __init__(self, host, points=()):
+        self._host, self._port, self._database = host, 8086, "flink"
+        self.points = list(points)
+        self.queries = 0
+
+    def query(self, query, epoch=None):
+        self.queries += 1
+        results = [Result(self.points) for s in query.split(";") if s.strip()]
+        return results if len(results) > 1 else results[0]
+
+
+def load(client, cache_dir, **kwargs):
+    return metrics_cache.load_series(client, ["m"], START, END, cache_dir=str(cache_dir), **kwargs)["m"]
+
+
+def test_empty_chunks_are_fetched_again(tmp_path):
+    client = FakeClient("influx")
+    assert load(client, tmp_path).empty
+
+    # The points arrive after the first query
+    client.points = [{"time": 1704067210000, "value": 1.0}]
+
+    assert len(load(client, tmp_path)) == 1
+    assert len(load(client, tmp_path)) == 1
+    assert client.queries == 2
+
+
+def test_backends_do_not_share_chunks(tmp_path):
+    load(FakeClient("influx", [{"time": 1704067210000, "value": 1.0}]), tmp_path)
+
+    sink = FakeClient("sink", [{"time": 1704067210000, "value": 2.0}])
+
+    assert list(load(sink, tmp_path)["value"]) == [2.0]
+    assert sink.queries == 1
+
+
+def test_refresh_replaces_cached_chunks(tmp_path):
+    client = FakeClient("influx", [{"time": 1704067210000, "value": 1.0}])
+    load(client, tmp_path)
+    client.points = [{"time": 1704067210000, "value": 3.0}]
+
+    assert list(load(client, tmp_path, refresh=True)["value"]) == [3.0]
+    assert list(load(client, tmp_path)["value"]) == [3.0]
+    assert client.queries == 2
@@ -0,0 +1,21 @@
+import pandas as pd
+
+import plot_results
+import results_store
+
+
+def spec(metric):
+    return next(s for s in plot_results.PLOTS if s.get("metric") == metric)
+
+
+def test_counter_rate_plots_draw_only_extracted_runs():
+    runs = pd.DataFrame({
+        "app": ["A", "A", "A"], "rate": [100, 100, 100], "config": ["tm2x4", "tm8x1", "tm8x1"],
+        "source": [results_store.SOURCE_INFLUX, results_store.SOURCE_CSV, None],
+        "deployment": [None, None, None],
+        "jvm_cpu_time": [2e9, 5e12, 6e12], "throughput": [100.0, 100.0, 100.0],
+    })
+
+    assert list(plot_results.plot_inputs(spec("jvm_cpu_time"), runs)["jvm_cpu_time"]) == [2e9]
+    assert len(plot_results.plot_inputs(spec("throughput"), runs)) == 3
+    assert plot_results.plot_inputs(spec("jvm_cpu_time"), runs.iloc[1:]) is None
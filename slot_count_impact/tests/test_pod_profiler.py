@@ -0,0 +1,80 @@
+import os
+import types
+
+import pytest
+
+import backends
+import get_metrics
+import line_protocol_sink
+import pod_profiler
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "cadvisor_sample.prom")
+PODS = ["basic-example-taskmanager-1-1", "basic-example-taskmanager-1-2"]
+START = "2024-01-01T00:00:00Z"
+END = "2024-01-01T00:02:00Z"
+T0 = 1704067200  # START in epoch seconds
+
+
+class Clock:
+    def __init__(self, now):
+        self.seconds = now
+
+    def now(self):
+        return self.seconds
+
+
+class Cluster:
+    def taskmanager_pods(self, name, namespace=None):
+        return PODS if name == "d" else []
+
+
+@pytest.fixture
+def profiled(tmp_path, monkeypatch):
+    """
+    The canned cAdvisor endpoint and a line-protocol sink, both on a clock
+    the test advances, and a profiler watching deployment "d".
+    """
+    monkeypatch.chdir(tmp_path)
+    clock = Clock(T0)
+    monkeypatch.setattr(backends, "clock", clock)
+    monkeypatch.setattr(backends, "cluster", Cluster())
+    monkeypatch.setattr(pod_profiler, "time", types.SimpleNamespace(time=clock.now))
+    canned = pod_profiler.serve_canned(SAMPLE, port=0)
+    sink = line_protocol_sink.serve(line_protocol_sink.ColumnStore(str(tmp_path / "sink")), port=0)
+    client = backends.InfluxMetrics(host="127.0.0.1", port=sink.server_address[1]).client()
+    profiler = pod_profiler.PodProfiler(endpoint=f"http://127.0.0.1:{canned.server_address[1]}/metrics")
+    profiler.watch("d")
+    yield profiler, client, clock
+    client.close()
+    sink.shutdown()
+    canned.shutdown()
+
+
+def test_profiler_writes_the_flink_container_and_pod_network_series(profiled):
+    profiler, client, _ = profiled
+
+    # Six series for each of the two pods (not the pause container's memory)
+    assert profiler.sample(client) == 12
+
+    points = list(client.query(
+        f'SELECT * FROM "k8s_pod_memory_working_set_bytes" WHERE time >= {T0}s AND time < {T0 + 1}s').get_points())
+    assert sorted((p["tm_id"], p["value"]) for p in points) == [(PODS[0], 1.6e9), (PODS[1], 1.2e9)]
+    assert all(p["deployment"] == "d" for p in points)
+
+
+def test_canned_counters_yield_constant_rates_and_throttled_ratio(profiled):
+    profiler, client, clock = profiled
+    for seconds in range(0, 121, 5):
+        clock.seconds = T0 + seconds
+        profiler.sample(client)
+
+    series = get_metrics.load_run_series(client, START, END, tags={"deployment": "d"})
+    values = get_metrics.aggregate_run(series, START)["value"]
+    per_tm = get_metrics.aggregate_run(series, START, by=("tm_id",))["value"]
+
+    assert values["pod_cpu_usage"] == pytest.approx(1.35)
+    # 6 of 10 periods throttled on the first pod, none on the second
+    assert values["pod_cpu_throttled_ratio"] == pytest.approx(0.3)
+    assert per_tm[("pod_cpu_throttled_ratio", PODS[0])] == pytest.approx(0.6)
+    assert per_tm[("pod_cpu_throttled_ratio", PODS[1])] == pytest.approx(0)
+    assert values["pod_network_rx_bytes"] == pytest.approx(4e6)
@@ -0,0 +1,59 @@
+import itertools
+import json
+import os
+import sys
+import time
+
+import backends
+import readiness
+
+NAME = "statemachine-tm2x4-100000"
+RECORDING = os.path.join(os.path.dirname(__file__), "fixtures", "watch_ready.jsonl")
+
+
+def test_recorded_deployment_becomes_ready():
+    cluster = backends.KubectlCluster(kubectl="false", replay=RECORDING)
+
+    assert cluster.wait_until_ready(NAME, 2)
+
+
+def test_deleted_pod_no_longer_counts_as_ready():
+    # Up to the job running: one TaskManager was deleted and its
+    # replacement is not Ready yet
+    events = itertools.islice(readiness.replay_events(RECORDING), 9)
+
+    assert not readiness.wait_until_ready("false", NAME, 2, events=events)
+
+
+def test_spec_applied_must_hold_too():
+    events = readiness.replay_events(RECORDING)
+
+    assert not readiness.wait_until_ready("false", NAME, 2, events=events, spec_applied=lambda deployment: False)
+
+
+def test_times_out_when_not_enough_pods_become_ready(tmp_path):
+    # Fake kubectl streaming the recording of the watched kind, then idling
+    kubectl = tmp_path / "kubectl"
+    kubectl.write_text(
+        f"#!{sys.executable}\n"
+        "import json, sys, time\n"
+        "kind = 'Pod' if 'pods' in sys.argv else 'FlinkDeployment'\n"
+        f"for line in open({RECORDING!r}):\n"
+        "    event = json.loads(line)\n"
+        "    if event['object']['kind'] == kind:\n"
+        "        print(json.dumps(event, indent=2), flush=True)\n"
+        "time.sleep(60)\n"
+    )
+    kubectl.chmod(0o755)
+
+    started = time.monotonic()
+    ready = readiness.wait_until_ready(str(kubectl), NAME, 3, timeout=1)
+
+    assert not ready
+    assert 1 <= time.monotonic() - started < 10
+
+
+def test_parse_json_stream_splits_pretty_printed_objects():
+    text = json.dumps({"a": {"b": 1}}, indent=2) + "\n" + json.dumps({"c": "}"}, indent=2) + "\n"
+
+    assert list(readiness.parse_json_stream(text.splitlines(keepends=True))) == [{"a": {"b": 1}}, {"c": "}"}]
@@ -0,0 +1,23 @@
+import steady_state
+
+
+def sawtooth(seconds, low, high, period, growth=0.0):
+    return [low + (high - low) * (t % period) / period + growth * t for t in range(seconds)]
+
+
+def test_heap_sawtooth_is_stable():
+    # GC every 10s to 25s between 1 and 3 GB: far above the CV threshold
+    for period in (10, 17, 25):
+        assert steady_state.is_stable("jvm_heap_used", sawtooth(120, 1e9, 3e9, period))
+
+
+def test_growing_heap_is_not_stable():
+    heap = sawtooth(120, 1e9, 3e9, 10, growth=1e7)
+
+    assert not steady_state.is_stable("jvm_heap_used", heap)
+
+
+def test_throughput_uses_the_coefficient_of_variation():
+    assert steady_state.is_stable("throughput", [1000.0, 1010.0] * 20)
+    assert not steady_state.is_stable("throughput", [1000.0, 1300.0] * 20)
+    assert not steady_state.is_stable("throughput", [1000.0] * (steady_state.CV_WINDOW_SECONDS - 1))
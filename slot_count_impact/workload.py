@@ -0,0 +1,284 @@
+"""
+Rate-controlled workload generator for benchmarks reading their input from
+a socket (Flink's SocketWindowWordCount example) instead of generating it
+inside the job from a --rps/--rate argument. The generator listens on a TCP
+port, the job's socket source connects to it, and it writes newline-
+delimited records following a rate profile scaled to the cell's rate:
+
+    constant                                  the cell's rate
+    step   levels: [0.25, 0.5, 1.0], hold: 60 each level for hold seconds, then the last
+    ramp   start: 0.1, end: 1.0, duration: 300 linearly, then the end level
+    burst  base: 0.5, period: 60, width: 10  the full rate for width seconds of every period
+    trace  path: <file>                      one rate per line and second, looped,
+                                              scaled so its peak is the cell's rate
+
+Levels are fractions of the cell's rate, and profile time starts when the
+job first connects. Records the job does not take in time (TCP
+backpressure) are queued, as a broker would keep them, and sent first.
+
+Every second is written to the metrics database as the workload_generator
+measurement, tagged deployment=<name>: offered (records the profile
+produced), achieved (records the job took in) and backlog. get_metrics.py
+stores them with each run as offered_load, achieved_load and
+generator_backlog. Achieved below offered with a growing backlog means the
+pipeline is the limit, not the source.
+
+`python workload.py serve <rate> [profile JSON] [port]` runs a generator on
+its own, e.g. to feed a job started by hand.
+"""
+import json
+import os
+import random
+import socket
+import sys
+import threading
+
+import backends
+
+MEASUREMENT = "workload_generator"
+
+# Address the TaskManager pods reach this machine at (by default the InfluxDB
+# host, usually the machine the runner runs on), and the first port tried.
+# Concurrent deployments each get their own port, the next free one.
+WORKLOAD_HOST = os.environ.get("WORKLOAD_HOST", backends.INFLUX_HOST)
+WORKLOAD_PORT = int(os.environ.get("WORKLOAD_PORT", 9900))
+PORT_RANGE = 100
+
+# Records are WORDS_PER_RECORD words of a VOCABULARY-word dictionary, all of
+# the same length so sent bytes convert to whole records
+VOCABULARY = 1000
+WORDS_PER_RECORD = 4
+SEED = 0
+
+# Sends are paced in slices of a second; points are written every FLUSH_SECONDS
+SLICE_SECONDS = 0.1
+FLUSH_SECONDS = 5
+
+
+def load_trace(path):
+    """
+    Returns: the per-second rates of a trace file, one per line (a CSV's
+    last column; lines that are not numbers are skipped)
+    """
+    rates = []
+    with open(path) as f:
+        for line in f:
+            try:
+                rates.append(float(line.strip().split(",")[-1]))
+            except ValueError:
+                continue
+    if not rates or max(rates) <= 0:
+        raise ValueError(f"Trace {path} has no positive rates")
+    return rates
+
+def rate_function(profile, rps):
+    """
+    Returns: function of the seconds since the profile started giving the
+    records/s to offer
+    Raises: ValueError on an unknown profile kind
+    """
+    profile = profile or {"kind": "constant"}
+    kind = profile.get("kind", "constant")
+    if kind == "constant":
+        return lambda t: rps
+    if kind == "step":
+        levels, hold = profile["levels"], profile.get("hold", 60)
+        return lambda t: rps * levels[min(int(t // hold), len(levels) - 1)]
+    if kind == "ramp":
+        start, end, duration = profile.get("start", 0.0), profile.get("end", 1.0), profile.get("duration", 300)
+        return lambda t: rps * (start + (end - start) * min(t / duration, 1.0))
+    if kind == "burst":
+        base, period, width = profile.get("base", 0.5), profile.get("period", 60), profile.get("width", 10)
+        return lambda t: rps if t % period < width else rps * base
+    if kind == "trace":
+        rates = load_trace(profile["path"])
+        peak = max(rates)
+        return lambda t: rps * rates[int(t) % len(rates)] / peak
+    raise ValueError(f"Unknown rate profile: {kind}")
+
+def record_block(seed=SEED, records=10 * VOCABULARY):
+    """
+    Returns: (bytes of `records` newline-terminated records, bytes per record)
+    """
+    rng = random.Random(seed)
+    width = len(str(VOCABULARY - 1))
+    lines = [
+        " ".join(f"w{rng.randrange(VOCABULARY):0{width}d}" for _ in range(WORDS_PER_RECORD)) + "\n"
+        for _ in range(records)
+    ]
+    return "".join(lines).encode(), len(lines[0])
+
+def listen(port=WORKLOAD_PORT):
+    """
+    Returns: a listening socket on the first free port from `port` on
+    """
+    for candidate in range(port, port + PORT_RANGE):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            server.bind(("0.0.0.0", candidate))
+        except OSError:
+            server.close()
+            continue
+        server.listen(1)
+        return server
+    raise RuntimeError(f"No free port in {port}-{port + PORT_RANGE - 1}")
+
+
+class SocketGenerator:
+    """
+    Feeds one deployment's socket source at a rate profile, and writes what
+    it offered and what the job took in to the metrics database.
+    """
+
+    def __init__(self, name, profile, rps, port=WORKLOAD_PORT):
+        self.name = name
+        self.profile = profile
+        self.server = listen(port)
+        self.port = self.server.getsockname()[1]
+        self.block, self.record_bytes = record_block()
+        self.lock = threading.Lock()
+        self.connection = None
+        self.stopped = threading.Event()
+        self.set_rate(rps)
+
+    def address(self):
+        return WORKLOAD_HOST, self.port
+
+    def set_rate(self, rps):
+        """
+        Switches to a new cell rate: the profile restarts from the beginning
+        (or once the job connects).
+        """
+        with self.lock:
+            self.rate = rate_function(self.profile, rps)
+            self.profile_start = None if self.connection is None else backends.clock.monotonic()
+
+    def accept(self):
+        # The job reconnects after every restart: the latest connection wins
+        while not self.stopped.is_set():
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                if self.connection is not None:
+                    self.connection.close()
+                self.connection = connection
+                if self.profile_start is None:
+                    self.profile_start = backends.clock.monotonic()
+
+    def send(self, data, deadline):
+        """
+        Sends as much of data as the connection takes before the deadline
+        (clock.monotonic()).
+        Returns: number of bytes sent
+        """
+        with self.lock:
+            connection = self.connection
+        written = 0
+        while connection is not None and written < len(data):
+            remaining = deadline - backends.clock.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                connection.settimeout(remaining)
+                written += connection.send(data[written:])
+            except socket.timeout:
+                break
+            except OSError:
+                with self.lock:
+                    if self.connection is connection:
+                        self.connection = None
+                connection.close()
+                break
+        return written
+
+    def generate(self, client):
+        points = []
+        # Records the profile produced but the job did not take in yet, and
+        # bytes sent so far (records count once their last byte is out)
+        backlog, due, sent_bytes = 0, 0.0, 0
+        connection = None
+        second = int(backends.clock.now())
+        offered = achieved = 0
+        flushed = last = backends.clock.monotonic()
+        while not self.stopped.is_set():
+            started = backends.clock.monotonic()
+            with self.lock:
+                since = None if self.profile_start is None else started - self.profile_start
+                rate = self.rate
+                if self.connection is not connection:
+                    # A new connection starts on a record boundary
+                    connection = self.connection
+                    sent_bytes = -(-sent_bytes // self.record_bytes) * self.record_bytes
+            if since is not None:
+                # Records due since the last slice, however long it took
+                due += rate(since) * (started - last)
+                new = int(due)
+                due -= new
+                backlog += new
+                offered += new
+            last = started
+
+            done = sent_bytes // self.record_bytes
+            deadline = started + SLICE_SECONDS
+            while backends.clock.monotonic() < deadline:
+                # Up to the end of the record block at a time
+                offset = sent_bytes % len(self.block)
+                wanted = min((done + backlog) * self.record_bytes - sent_bytes, len(self.block) - offset)
+                if wanted <= 0:
+                    break
+                written = self.send(self.block[offset:offset + wanted], deadline)
+                sent_bytes += written
+                if written < wanted:
+                    break
+            taken = sent_bytes // self.record_bytes - done
+            backlog -= taken
+            achieved += taken
+
+            now = backends.clock.now()
+            if int(now) != second:
+                points.append({
+                    "measurement": MEASUREMENT,
+                    "tags": {"deployment": self.name},
+                    "time": second * 1000,
+                    "fields": {"offered": float(offered), "achieved": float(achieved), "backlog": float(backlog)},
+                })
+                second, offered, achieved = int(now), 0, 0
+            if points and backends.clock.monotonic() - flushed >= FLUSH_SECONDS:
+                try:
+                    client.write_points(points, time_precision="ms")
+                except Exception as e:
+                    print(f"⚠️ {self.name}: Failed to write generator points: {e}")
+                points, flushed = [], backends.clock.monotonic()
+            backends.clock.sleep(max(started + SLICE_SECONDS - backends.clock.monotonic(), 0))
+        if points:
+            client.write_points(points, time_precision="ms")
+
+    def start(self, client):
+        threading.Thread(target=self.accept, daemon=True).start()
+        self.thread = threading.Thread(target=self.generate, args=(client,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.server.close()
+        self.thread.join()
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "serve":
+        profile = json.loads(sys.argv[3]) if len(sys.argv) > 3 else None
+        generator = SocketGenerator("standalone", profile, float(sys.argv[2]),
+                                    port=int(sys.argv[4]) if len(sys.argv) > 4 else WORKLOAD_PORT)
+        generator.start(backends.metrics.client())
+        print(f"Feeding {generator.name} on port {generator.port}")
+        threading.Event().wait()
+    else:
+        print("Usage: python workload.py serve <rate> [profile JSON] [port]")